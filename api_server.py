@@ -1,23 +1,72 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+from datetime import datetime
 import sys
 import os
 
 # Add parent directory to path to import local modules
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from modern_etl import ETLLogger
+import config
+from harvest_planner import HarvestPlanner, iter_chunks
 
 # Initialize App
 app = FastAPI(title="PPC Data Ingestion API", version="1.0.0")
-logger = ETLLogger("api_server.log")
+
+# Polars/Arrow/fastexcel load on first use, not at worker boot (/health stays instant)
+_logger = None
+_reader = None
+
+
+def get_logger():
+    global _logger
+    if _logger is None:
+        from modern_etl import ETLLogger
+        _logger = ETLLogger("api_server.log")
+    return _logger
+
+
+def get_reader():
+    # One reader per worker: its query cache is shared across requests
+    global _reader
+    if _reader is None:
+        from lake_reader import LakeReader
+        _reader = LakeReader(config.SILVER_DATA_DIR)
+    return _reader
+
+
+def run_scrape_job(start_date, end_date, step, force=False):
+    """
+    Background task of /trigger/scrape: logs in, then harvests the range.
+    fetch_data re-plans itself unless force=True, so overlapping triggers stay cheap.
+    """
+    from dotenv import load_dotenv
+    from scrape_bot import AutoLogin, PPCHarvester
+
+    load_dotenv()
+    token = AutoLogin(os.getenv("PPC_USER"), os.getenv("PPC_PASS")).get_token()
+    if not token:
+        get_logger().log_error("API", "Scrape Job", RuntimeError("Login failed, no token: job aborted"))
+        return
+    harvester = PPCHarvester(token, logger=get_logger())
+    if harvester.fetch_data(start_date, end_date, step, force=force) is False:
+        get_logger().log_error("API", "Scrape Job", RuntimeError("Token rejected (401): job stopped"))
+
+
+QUERY_MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
 
 # --- Pydantic Models ---
 class ScrapeRequest(BaseModel):
     start_date: str
     end_date: str
     step: Optional[str] = "day" # day, month, year, total
+    force: Optional[bool] = False # True = ignore what the lake already has
 
 # --- Endpoints ---
 
@@ -32,19 +81,127 @@ def trigger_scrape(request: ScrapeRequest, background_tasks: BackgroundTasks):
     Triggers the scraper bot to run in background.
     Recommended for both First Run (Backfill) and Daily Schedule.
     """
-    # TODO: Import PPCHarvester logic here (lazy import to avoid circular dependency issues if any)
-    # from scrape_bot import PPCHarvester
-    
-    # TODO: Define the background task function wrapper
-    # def run_scraper_task(start, end, step):
-    #     bot = PPCHarvester(...)
-    #     bot.fetch_data(...)
-    
-    # TODO: Add task to background_tasks
-    # background_tasks.add_task(run_scraper_task, request.start_date, request.end_date, request.step)
-    
-    logger.log_success("API", "Trigger", f"Received scrape request: {request}")
-    return {"status": "accepted", "message": "Scrape job started in background", "params": request}
+    try:
+        if request.force:
+            planned = [{"start": s, "end": e, "reason": "forced"}
+                       for s, e in iter_chunks(request.start_date, request.end_date, request.step)]
+        else:
+            planner = HarvestPlanner(
+                config.SILVER_DATA_DIR,
+                settle_days=config.HARVEST_SETTLE_DAYS,
+                min_refresh_hours=config.HARVEST_MIN_REFRESH_HOURS,
+            )
+            planned = planner.plan(request.start_date, request.end_date, request.step)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {e}")
+
+    get_logger().log_success("API", "Trigger", f"Received scrape request: {request} | planned chunks: {len(planned)}")
+    if not planned:
+        return {"status": "skipped", "message": "Lake already holds fresh data for this range", "params": request, "planned": []}
+
+    # Runs after the response is sent (the login + harvest take minutes)
+    background_tasks.add_task(run_scrape_job, request.start_date, request.end_date, request.step, request.force)
+    return {"status": "accepted", "message": "Scrape job started in background", "params": request, "planned": planned}
+
+@app.get("/query")
+def query_lake(
+    start_date: str,
+    end_date: str,
+    skus: Optional[List[str]] = Query(None, description="Repeat or comma-separate: ?skus=A&skus=B"),
+    columns: Optional[List[str]] = Query(None, description="Projection, repeat or comma-separate"),
+    format: str = "arrow",
+    latest_only: bool = False,
+    limit: Optional[int] = Query(None, gt=0, description="Rows per page"),
+    cursor: Optional[str] = None,
+    batch_size: int = Query(50_000, gt=0),
+    as_of: Optional[str] = Query(None, description="Time travel: only ingestions up to this ISO time/date"),
+):
+    """
+    Streams Silver rows for a Report_Date range (chunked transfer).
+    format: 'arrow' (IPC record batches), 'ndjson' or 'csv'.
+    Pagination: pass back the 'X-Next-Cursor' response header as ?cursor=...
+    (absent on the last page).
+    as_of + latest_only: the report as it looked at that time.
+    """
+    if format not in QUERY_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+    # Dates are compared as text against Report_Date: anything but YYYY-MM-DD silently matches nothing
+    try:
+        first, last = (datetime.strptime(d, "%Y-%m-%d") for d in (start_date, end_date))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {e}")
+    if first > last:
+        raise HTTPException(status_code=400, detail="start_date is after end_date")
+
+    skus = _split_multi(skus)
+    columns = _split_multi(columns)
+    reader = get_reader()
+    try:
+        plan = reader.plan_stream(start_date, end_date, skus=skus, columns=columns,
+                                  latest_only=latest_only, cursor=cursor, limit=limit,
+                                  as_of=as_of)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    headers = {"X-Next-Cursor": plan["next_cursor"]} if plan["next_cursor"] else {}
+    get_logger().log_success("API", "Query", f"{start_date}..{end_date} files={len(plan['files'])} format={format}")
+    return StreamingResponse(
+        _serialize_batches(reader.iter_batches(plan, batch_size), plan["schema"], format),
+        media_type=QUERY_MEDIA_TYPES[format],
+        headers=headers,
+    )
+
+
+def _split_multi(values):
+    if not values:
+        return None
+    return [v.strip() for value in values for v in value.split(",") if v.strip()]
+
+
+class _ChunkSink:
+    """Write-only file object that hands back what the IPC writer produced so far."""
+    closed = False
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _serialize_batches(batches, schema, format):
+    if format == "arrow":
+        import polars as pl
+        import pyarrow as pa
+        sink = _ChunkSink()
+        arrow_schema = pl.DataFrame(schema=schema).to_arrow().schema
+        with pa.ipc.new_stream(sink, arrow_schema) as writer:
+            yield sink.drain()  # schema first: clients can start decoding immediately
+            for batch in batches:
+                for record_batch in batch.to_arrow().to_batches():
+                    writer.write_batch(record_batch.cast(arrow_schema))
+                yield sink.drain()
+        yield sink.drain()  # end-of-stream marker
+    elif format == "ndjson":
+        for batch in batches:
+            yield batch.write_ndjson().encode("utf-8")
+    else:
+        header = True
+        for batch in batches:
+            yield batch.write_csv(include_header=header).encode("utf-8")
+            header = False
+        if header:
+            yield (",".join(schema) + "\n").encode("utf-8")
+
 
 # --- TODO: FUTURE EXPANSION ---
 # Endpoint: POST /ingest/memory
@@ -0,0 +1,77 @@
+"""
+Benchmark: cold start of the CLI and the API worker.
+
+Each scenario runs in a fresh interpreter (no warm module cache) in a
+scratch working directory, so import-time side effects are visible too.
+
+Run: uv run python benchmarks/bench_cold_start.py --repeat 5
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+SCENARIOS = {
+    "import config": "import config",
+    "import scrape_bot": "import scrape_bot",
+    "import api_server": "import api_server",
+    "import modern_etl (reference)": "import modern_etl",
+    "api /health": (
+        "from fastapi.testclient import TestClient; import api_server; "
+        "assert TestClient(api_server.app).get('/health').status_code == 200"
+    ),
+}
+
+# Modules that must NOT be loaded by a light entry point
+HEAVY_MODULES = ["polars", "pyarrow", "fastexcel", "playwright", "requests", "dotenv", "modern_etl"]
+
+
+def run_once(code, work_dir):
+    env = dict(os.environ, PYTHONPATH=REPO_DIR, PYTHONDONTWRITEBYTECODE="1")
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=work_dir, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def loaded_heavy_modules(code, work_dir):
+    probe = (
+        f"{code}\n"
+        "import sys\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    env = dict(os.environ, PYTHONPATH=REPO_DIR)
+    out = subprocess.run([sys.executable, "-c", probe], cwd=work_dir, env=env, check=True,
+                         capture_output=True, text=True).stdout.strip().splitlines()
+    return out[-1] if out else ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start benchmark")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    baseline = run_once("pass", REPO_DIR)
+    print(f"{'scenario':<32} {'median':>9} {'min':>9}  heavy modules loaded")
+    print(f"{'python -c pass':<32} {baseline * 1000:8.0f}ms")
+    for label, code in SCENARIOS.items():
+        work_dir = tempfile.mkdtemp(prefix="bench_cold_")
+        try:
+            timings = [run_once(code, work_dir) for _ in range(args.repeat)]
+            heavy = loaded_heavy_modules(code, work_dir)
+            side_effects = sorted(os.listdir(work_dir))
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        print(f"{label:<32} {statistics.median(timings) * 1000:8.0f}ms {min(timings) * 1000:8.0f}ms  {heavy or '-'}")
+        if side_effects:
+            print(f"{'':<32} ⚠️ created on import: {side_effects}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark: legacy xlsx parsing vs. cached parse plans (+ parallel sheets).
+
+Generates N synthetic exports shaped like the PPC daily export, then times:
+  1. legacy   -> fastexcel.read_excel(p).load_sheet(0).to_arrow(), one file at a time
+  2. planned  -> ExcelParsePlanner.load(), one file at a time
+  3. parallel -> ExcelParsePlanner.load() in a thread pool
+
+Run: uv run python benchmarks/bench_excel_parse.py --files 8 --rows 20000 --workers 4
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import fastexcel
+import openpyxl
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modern_etl import ExcelParsePlanner
+
+TEXT_COLUMNS = ["SKU", "ASIN", "Product Name", "Product Type", "Main Niche", "Hint"]
+METRIC_COLUMNS = [
+    "FBA Stock", "Price", "Phase", "Unit sold (Actual)", "Revenue (Actual)", "TACOS",
+    "CR (Actual)", "CR (Avg)", "CPC (Actual)", "CPC (Avg)", "ORG (Actual)", "ORG (Avg)",
+    "Price Plan", "Refund", "Ads Spend (Actual)", "Priority Score", "Listing Score",
+]
+
+
+def make_export(path, rows, seed):
+    rng = random.Random(seed)
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    # Blank trailing header cell, like the real export's spacer column
+    ws.append(TEXT_COLUMNS + METRIC_COLUMNS + [None])
+    for i in range(rows):
+        ws.append(
+            [f"SKU-{i:06d}", f"B0{i:08d}", f"Product {i}", "FBA", "Niche", "keep"]
+            + [round(rng.uniform(0, 500), 2) for _ in METRIC_COLUMNS]
+            + [None]
+        )
+    wb.save(path)
+
+
+def legacy_load(path):
+    return fastexcel.read_excel(path).load_sheet(0).to_arrow()
+
+
+def planned_load(path):
+    return ExcelParsePlanner.load(path, ("bench", "day"))
+
+
+def timed(label, fn, paths, workers=1):
+    start = time.perf_counter()
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            rows = sum(t.num_rows for t in pool.map(fn, paths))
+    else:
+        rows = sum(fn(p).num_rows for p in paths)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} {elapsed:8.3f}s  {rows / elapsed:12,.0f} rows/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="xlsx parse benchmark")
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_xlsx_")
+    try:
+        print(f"Generating {args.files} exports x {args.rows:,} rows in {work_dir}...")
+        paths = []
+        for i in range(args.files):
+            path = os.path.join(work_dir, f"raw_ppc_{i:03d}.xlsx")
+            make_export(path, args.rows, seed=i)
+            paths.append(path)
+
+        # Warm the plan cache the way the first file of a harvest would
+        ExcelParsePlanner.clear_cache()
+        planned_load(paths[0])
+
+        base = timed("legacy", legacy_load, paths)
+        planned = timed("planned", planned_load, paths)
+        parallel = timed("parallel", planned_load, paths, workers=args.workers)
+        print(f"Speedup planned: {base / planned:.2f}x | parallel ({args.workers} workers): {base / parallel:.2f}x")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
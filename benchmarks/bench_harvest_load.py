@@ -0,0 +1,183 @@
+"""
+Benchmark: end-to-end harvest (HTTP -> raw xlsx -> silver parquet + sidecars)
+against the local mock export server, at several worker counts.
+
+Each level runs in a fresh scratch directory: the mock serves one export per
+chunk, PPCHarvester workers (threads) share one LeaseStore and drain the backfill.
+Random 401s end a worker like an expired token would; the harness logs it in
+again (counted as re-logins).
+
+p50/p99: latency of one chunk, from the first request to the silver file
+(all pages, retries and ingestion included).
+
+Run: uv run python benchmarks/bench_harvest_load.py --workers 1,2,4 --days 30 --skus 2000 \
+        --latency-ms 200 --jitter-ms 100 --error-rate 0.02 --throttle-rate 0.05 --page-size 1000
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pyarrow.parquet as pq
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import config
+from coordination import LeaseStore
+from harvest_planner import iter_chunks
+from lake_layout import list_partition_files
+from mock_export_server import MockExportServer
+from modern_etl import ETLLogger, RawToSilverIngester
+from scrape_bot import PPCHarvester
+
+TOKEN = "bench-token"
+
+
+class WriteMeter:
+    """Times RawToSilverIngester._process_and_write (stamp + parquet write + sidecars)."""
+    def __init__(self):
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+        self._original = RawToSilverIngester._process_and_write
+
+    def __enter__(self):
+        meter, original = self, self._original
+
+        def timed(ingester, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(ingester, *args, **kwargs)
+            finally:
+                with meter._lock:
+                    meter.seconds += time.perf_counter() - start
+
+        RawToSilverIngester._process_and_write = timed
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        RawToSilverIngester._process_and_write = self._original
+
+
+def run_level(n_workers, chunks, step, server, retry_backoff, verbose):
+    store = LeaseStore(config.HARVEST_COORDINATOR_DB, lease_seconds=60)
+    store.enqueue(chunks, step)
+    logger = ETLLogger("bench_harvest.log")
+    if not verbose:
+        logger.logger.setLevel(logging.WARNING)  # one INFO line per chunk; errors still show
+
+    latencies = []
+    relogins = [0]
+    lock = threading.Lock()
+
+    def worker(i):
+        worker_id = f"bench-{i}"
+        while True:
+            harvester = PPCHarvester(TOKEN, logger=logger, base_url=server.url,
+                                     request_delay=0, retry_backoff=retry_backoff)
+            fetch = harvester._fetch_chunk
+
+            def timed_fetch(*args, **kwargs):
+                start = time.perf_counter()
+                status = fetch(*args, **kwargs)
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+                return status
+
+            harvester._fetch_chunk = timed_fetch
+            if harvester.run_worker(store, worker_id, poll_interval=0.05) is not False:
+                return
+            with lock:
+                relogins[0] += 1  # token "expired": log in again and keep going
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n_workers)]
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    with WriteMeter() as meter, output:
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - start
+
+    files = list_partition_files(config.SILVER_DATA_DIR)
+    rows = sum(pq.ParquetFile(p).metadata.num_rows for p in files)
+    silver_bytes = sum(os.path.getsize(p) for p in files)
+    return {
+        "wall": wall, "latencies": latencies, "relogins": relogins[0],
+        "rows": rows, "silver_bytes": silver_bytes, "write_seconds": meter.seconds,
+        "done": store.stats().get("done", 0), "failed": store.stats().get("failed", 0),
+    }
+
+
+def percentile(values, q):
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end harvester load test (mock export API)")
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts")
+    parser.add_argument("--days", type=int, default=30, help="Backfill length (chunks with --step day)")
+    parser.add_argument("--start", default="2025-09-01")
+    parser.add_argument("--step", choices=["day", "month", "year", "total"], default="day")
+    parser.add_argument("--skus", type=int, default=2000, help="Rows per export")
+    parser.add_argument("--page-size", type=int, help="Rows per page (default: no pagination)")
+    parser.add_argument("--latency-ms", type=float, default=100)
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--unauthorized-rate", type=float, default=0.0)
+    parser.add_argument("--retry-backoff", type=float, default=0.1, help="Seconds (doubled per retry)")
+    parser.add_argument("--verbose", action="store_true", help="Keep the harvester's per-chunk output")
+    args = parser.parse_args()
+
+    end = (datetime.strptime(args.start, "%Y-%m-%d") + timedelta(days=args.days - 1)).strftime("%Y-%m-%d")
+    chunks = list(iter_chunks(args.start, end, args.step))
+    levels = [int(n) for n in args.workers.split(",")]
+
+    server = MockExportServer(
+        token=TOKEN, n_skus=args.skus, page_size=args.page_size,
+        latency_ms=args.latency_ms, latency_jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, unauthorized_rate=args.unauthorized_rate, retry_after=0,
+    )
+    server.start()
+    print(f"Mock export API on {server.url}: {len(chunks)} chunks x {args.skus:,} rows, "
+          f"{server.total_pages} page(s)/chunk, latency {args.latency_ms:.0f}±{args.jitter_ms:.0f}ms")
+    print(f"{'workers':>7} {'wall':>8} {'chunks/s':>9} {'rows/s':>10} {'p50':>8} {'p99':>8} "
+          f"{'silver MB/s':>12} {'write MB/s':>11}  outcome")
+
+    repo_cwd = os.getcwd()
+    try:
+        for n_workers in levels:
+            work_dir = tempfile.mkdtemp(prefix="bench_harvest_")
+            server.stats.clear()
+            try:
+                # config paths are relative (./raw_data, ./silver_data): isolate each level
+                os.chdir(work_dir)
+                config.ensure_directories()
+                r = run_level(n_workers, chunks, args.step, server, args.retry_backoff, args.verbose)
+            finally:
+                os.chdir(repo_cwd)
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+            mb = r["silver_bytes"] / 1024 / 1024
+            http = ", ".join(f"{code}:{n}" for code, n in sorted(server.stats.items()))
+            print(f"{n_workers:>7} {r['wall']:7.2f}s {r['done'] / r['wall']:9.2f} {r['rows'] / r['wall']:10,.0f} "
+                  f"{percentile(r['latencies'], 50) * 1000:6.0f}ms {percentile(r['latencies'], 99) * 1000:6.0f}ms "
+                  f"{mb / r['wall']:12.2f} {mb / max(r['write_seconds'], 1e-9):11.2f}  "
+                  f"done {r['done']}/{len(chunks)}, failed {r['failed']}, re-logins {r['relogins']}, HTTP {{{http}}}")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
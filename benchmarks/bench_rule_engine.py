@@ -0,0 +1,74 @@
+"""
+Benchmark: vectorized rule evaluation throughput.
+
+Builds N synthetic silver rows and a representative rule set (first-match
+hint, additive priority score, phase, expression-valued listing score),
+then reports compile time and rows/s for eager and lazy evaluation.
+
+Run: uv run python benchmarks/bench_rule_engine.py --rows 5000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import polars as pl
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from rule_engine import RuleEngine
+
+RULES = [
+    {"output": "hint", "condition": "ROAS >= 4 AND [Unit sold (Actual)] > 20", "value": "Scale budget", "mode": "first", "order": 1},
+    {"output": "hint", "condition": "ROAS < 1.5 AND [Ads Spend (Actual)] > 100", "value": "Cut bids", "mode": "first", "order": 2},
+    {"output": "hint", "condition": "[FBA Stock] < 20", "value": "Restock", "mode": "first", "order": 3},
+    {"output": "hint", "condition": "ELSE", "value": "Keep", "mode": "first", "order": 4},
+    {"output": "priorityScore", "condition": "ROAS >= 3", "value": 40, "mode": "sum", "order": 1},
+    {"output": "priorityScore", "condition": "[Revenue (Actual)] > 3000", "value": 30, "mode": "sum", "order": 2},
+    {"output": "priorityScore", "condition": "Phase IN (1, 2)", "value": 20, "mode": "sum", "order": 3},
+    {"output": "priorityScore", "condition": "[FBA Stock] < 20", "value": -50, "mode": "sum", "order": 4},
+    {"output": "phase", "condition": "[Unit sold (Actual)] < 10", "value": "launch", "mode": "first", "order": 1},
+    {"output": "phase", "condition": "[Unit sold (Actual)] < 80", "value": "growth", "mode": "first", "order": 2},
+    {"output": "phase", "condition": "ELSE", "value": "mature", "mode": "first", "order": 3},
+    {"output": "listingScore", "condition": "", "value": "=([Revenue (Actual)] - [Ads Spend (Actual)]) / ([Revenue (Actual)] + 1) * 100", "mode": "first", "order": 1},
+]
+
+
+def make_frame(rows, seed=42):
+    rng = np.random.default_rng(seed)
+    revenue = rng.uniform(100, 6000, rows)
+    spend = revenue * rng.uniform(0.1, 0.8, rows)
+    return pl.DataFrame({
+        "SKU": pl.Series(np.char.add("SKU-", (np.arange(rows) % 100_000).astype(str))),
+        "Revenue (Actual)": revenue,
+        "Ads Spend (Actual)": spend,
+        "Unit sold (Actual)": (revenue / rng.uniform(20, 50, rows)).astype(np.int64),
+        "ROAS": revenue / spend,
+        "Phase": rng.choice([1, 2, 3], rows),
+        "FBA Stock": rng.integers(0, 300, rows),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rule engine throughput benchmark")
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    args = parser.parse_args()
+
+    df = make_frame(args.rows)
+    engine = RuleEngine(RULES)
+
+    start = time.perf_counter()
+    engine.compile(df.columns)
+    print(f"compile      {(time.perf_counter() - start) * 1000:8.2f} ms ({len(RULES)} rules)")
+
+    for label, run in [("eager", lambda: engine.apply(df)), ("lazy", lambda: engine.apply(df.lazy()).collect())]:
+        start = time.perf_counter()
+        result = run()
+        elapsed = time.perf_counter() - start
+        print(f"{label:<12} {elapsed:8.3f} s  {args.rows / elapsed:14,.0f} rows/s")
+    print(result.select(["hint", "priorityScore", "phase", "listingScore"]).head(3))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+import os
+import glob
+
+import polars as pl
+
+from lake_layout import parse_silver_filename, list_partition_files, ingestion_time_utc, to_utc
+
+CDC_DIR_NAME = "_cdc"
+
+
+class ChangeCapture:
+    """
+    Change-data-capture between successive ingestions of the same range.
+    Philosophy: Diff once at write time, so consumers read kilobytes, not days.
+
+    For every new silver file, compares it with the latest prior ingestion of
+    the same (start, end) range and writes YYYY/MM/_cdc/cdc_<start>_<end>_ingest_<ts>.parquet:
+        op                   'I' inserted | 'U' updated | 'D' deleted
+        SKU, Report_Date     the key
+        ingestion_time       of the new file
+        prev_ingestion_time  of the prior file (null for inserts)
+        ...                  new values (I/U) or last known values (D)
+    The first ingestion of a range is emitted as all-inserts (initial snapshot).
+    """
+    KEYS = ["SKU", "Report_Date"]
+    # Stamps that change on every ingestion and must not count as a change
+    IGNORED_COLUMNS = {"ingestion_time", "Date_Start", "Date_End"}
+
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+
+    def capture(self, new_path):
+        """
+        Input: path of a freshly written silver file.
+        Output: path of the CDC file, or None (foreign file name / no key columns).
+        Both files are scanned lazily: only keys + a row hash are held in memory,
+        full rows are read back for the changed keys only.
+        """
+        info = parse_silver_filename(new_path)
+        if info is None:
+            return None
+
+        new_lf = pl.scan_parquet(new_path)
+        if not self._has_keys(new_lf):
+            return None
+
+        prior_path = self._latest_prior(new_path, info)
+        prior_lf = pl.scan_parquet(prior_path) if prior_path else None
+        if prior_lf is not None and not self._has_keys(prior_lf):
+            prior_lf = None
+
+        changes = self.diff_lazy(prior_lf, new_lf)
+
+        cdc_dir = os.path.join(os.path.dirname(new_path), CDC_DIR_NAME)
+        os.makedirs(cdc_dir, exist_ok=True)
+        cdc_path = os.path.join(cdc_dir, "cdc_" + os.path.basename(new_path)[len("ppc_"):])
+        changes.sink_parquet(cdc_path + ".tmp", compression="zstd")
+        os.replace(cdc_path + ".tmp", cdc_path)
+        return cdc_path
+
+    def rebuild(self):
+        """
+        Recomputes every CDC file from the lake (e.g. after files were added
+        outside the ingester or a capture was missed). Each file is diffed
+        against its own prior ingestion, so the order does not matter.
+        Output: Number of CDC files written.
+        """
+        for path in glob.glob(os.path.join(self.base_dir, "[0-9]*", "[0-9]*", CDC_DIR_NAME, "cdc_*.parquet")):
+            os.remove(path)
+        return sum(1 for path in list_partition_files(self.base_dir) if self.capture(path))
+
+    def diff(self, prior, new):
+        """Eager wrapper of diff_lazy (DataFrames or LazyFrames in, DataFrame out)."""
+        return self.diff_lazy(prior, new).collect()
+
+    def diff_lazy(self, prior, new):
+        """
+        Vectorized diff keyed by SKU + Report_Date.
+        A row is updated when any column present in both ingestions (stamps
+        excluded) differs. Values are hashed as text, so schema drift between
+        the two files (Int64 vs Float64) does not by itself mark every row.
+        Returns a LazyFrame; only the (key, row, hash) fingerprints are collected.
+        """
+        new = new.lazy()
+        new_schema = new.collect_schema()
+        new_time = self._ingestion_time(new, new_schema)
+
+        if prior is None:
+            # Initial snapshot: every (deduplicated) row, in file order
+            rows = self._fingerprint(new, {}).select("_row")
+            inserts = self._take(new, rows).with_columns([
+                pl.lit("I").alias("op"),
+                pl.lit(None, dtype=pl.String).alias("prev_ingestion_time"),
+            ])
+            return inserts.select(self._ordered_columns(inserts.collect_schema().names()))
+
+        prior = prior.lazy()
+        prior_schema = prior.collect_schema()
+        prior_time = self._ingestion_time(prior, prior_schema)
+        compared = [c for c in new_schema
+                    if c in prior_schema and c not in self.KEYS and c not in self.IGNORED_COLUMNS]
+        common = {
+            c: pl.Float64 if new_schema[c].is_numeric() and prior_schema[c].is_numeric() else pl.String
+            for c in compared
+        }
+
+        joined = self._fingerprint(new, common).join(
+            self._fingerprint(prior, common), on=self.KEYS, how="full", coalesce=True, suffix="_prior"
+        )
+        inserted = joined.filter(pl.col("_hash_prior").is_null()).select("_row")
+        deleted = joined.filter(pl.col("_hash").is_null()).select(pl.col("_row_prior").alias("_row"))
+        updated = joined.filter(
+            pl.col("_hash").is_not_null() & pl.col("_hash_prior").is_not_null()
+            & (pl.col("_hash") != pl.col("_hash_prior"))
+        ).select("_row")
+
+        frames = [
+            self._take(new, inserted).with_columns(
+                pl.lit("I").alias("op"), pl.lit(None, dtype=pl.String).alias("prev_ingestion_time")),
+            self._take(new, updated).with_columns(
+                pl.lit("U").alias("op"), pl.lit(prior_time, dtype=pl.String).alias("prev_ingestion_time")),
+            self._take(prior, deleted).with_columns(
+                pl.lit("D").alias("op"),
+                pl.lit(prior_time, dtype=pl.String).alias("prev_ingestion_time"),
+                pl.lit(new_time, dtype=pl.String).alias("ingestion_time")),
+        ]
+        changes = pl.concat(frames, how="diagonal_relaxed")
+        return changes.select(self._ordered_columns(changes.collect_schema().names())).sort(self.KEYS)
+
+    def read_changes(self, since=None, start_date=None, end_date=None):
+        """
+        Scenario: Incremental consumer.
+        Input: since = last processed ingestion_time (ISO string, naive = host-local), exclusive.
+        Output: pl.DataFrame of changes ordered by ingestion_time.
+        """
+        paths = []
+        for month_dir in {os.path.dirname(p) for p in list_partition_files(self.base_dir, start_date, end_date)}:
+            paths.extend(glob.glob(os.path.join(month_dir, CDC_DIR_NAME, "cdc_*.parquet")))
+        if not paths:
+            return pl.DataFrame()
+        lf = pl.concat([pl.scan_parquet(p) for p in sorted(paths)], how="diagonal_relaxed")
+        if since:
+            # Compared as UTC instants: stamps may mix offsets and naive host-local values
+            lf = lf.filter(ingestion_time_utc() > pl.lit(to_utc(since)))
+        if start_date:
+            lf = lf.filter(pl.col("Report_Date") >= pl.lit(start_date))
+        if end_date:
+            lf = lf.filter(pl.col("Report_Date") <= pl.lit(end_date))
+        return lf.sort([ingestion_time_utc()] + self.KEYS).collect()
+
+    def _latest_prior(self, new_path, info):
+        candidates = []
+        for path in glob.glob(os.path.join(os.path.dirname(new_path), "ppc_*.parquet")):
+            other = parse_silver_filename(path)
+            if (path != new_path and other
+                    and (other["start_date"], other["end_date"]) == (info["start_date"], info["end_date"])
+                    and other["ingested_at"] < info["ingested_at"]):
+                candidates.append((other["ingested_at"], path))
+        return max(candidates)[1] if candidates else None
+
+    def _has_keys(self, lf):
+        names = lf.collect_schema().names()
+        return all(k in names for k in self.KEYS)
+
+    @staticmethod
+    def _ingestion_time(lf, schema):
+        if "ingestion_time" not in schema:
+            return None
+        return lf.select(pl.col("ingestion_time").cast(pl.String).first()).collect().item()
+
+    def _fingerprint(self, lf, common):
+        """
+        Collected (SKU, Report_Date, _row, _hash): one row per key.
+        A key repeated inside one export: the last row wins, as in the raw file order.
+        """
+        if common:
+            row_hash = pl.struct([pl.col(c).cast(dtype) for c, dtype in common.items()]).hash()
+        else:
+            row_hash = pl.lit(0, dtype=pl.UInt64)
+        return (
+            lf.with_row_index("_row")
+            .select([pl.col(k).cast(pl.String) for k in self.KEYS] + [pl.col("_row"), row_hash.alias("_hash")])
+            .unique(subset=self.KEYS, keep="last", maintain_order=True)
+            .collect()
+        )
+
+    def _take(self, lf, rows):
+        """Full rows of lf at the given _row positions (keys cast to text)."""
+        return (
+            lf.with_row_index("_row")
+            .join(rows.lazy(), on="_row", how="semi")
+            .drop("_row")
+            .with_columns([pl.col(k).cast(pl.String) for k in self.KEYS])
+        )
+
+    def _ordered_columns(self, columns):
+        head = ["op"] + self.KEYS + ["ingestion_time", "prev_ingestion_time"]
+        return [c for c in head if c in columns] + [c for c in columns if c not in head]
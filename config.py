@@ -18,10 +18,25 @@ RAW_DATA_DIR = "./raw_data"
 SILVER_DATA_DIR = "./silver_data"
 OUTPUT_DIR = "./exports"
 
-# Tạo thư mục nếu chưa có
-for folder in [RAW_DATA_DIR, SILVER_DATA_DIR, OUTPUT_DIR]:
-    if not os.path.exists(folder):
-        os.makedirs(folder)
+# Lập kế hoạch harvest: số ngày để số liệu upstream "chốt" (settle) sau ngày báo cáo,
+# và khoảng thời gian tối thiểu giữa 2 lần tải lại cùng một ngày chưa chốt.
+HARVEST_SETTLE_DAYS = 3
+HARVEST_MIN_REFRESH_HOURS = 12
+
+# Harvest nhiều node (--coordinator): file SQLite chứa hàng đợi chunk trên volume dùng chung,
+# và thời hạn lease (giây) trước khi chunk của một node chết được node khác nhận lại.
+HARVEST_COORDINATOR_DB = os.path.join(SILVER_DATA_DIR, "_meta", "harvest_leases.db")
+HARVEST_LEASE_SECONDS = 300
+
+# Số lần thử lại một request bị 429/5xx/lỗi mạng, và thời gian chờ gốc (giây, tăng gấp đôi mỗi lần)
+HARVEST_MAX_RETRIES = 3
+HARVEST_RETRY_BACKOFF_SECONDS = 2
+
+
+# Tạo thư mục nếu chưa có (gọi lúc chạy, không tạo khi import)
+def ensure_directories():
+    for folder in [RAW_DATA_DIR, SILVER_DATA_DIR, OUTPUT_DIR]:
+        os.makedirs(folder, exist_ok=True)
 
 
 # Header mặc định cho Request
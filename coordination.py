@@ -0,0 +1,336 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+
+def default_worker_id():
+    """'<hostname>-<pid>': unique per process across hosts sharing the volume."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class FileLock:
+    """
+    Cross-process, cross-host mutex on a shared volume.
+    Philosophy: A lock file created with O_EXCL, no external services.
+
+    Used around read-modify-write of lake sidecars (rollups, lake version...).
+    A lock older than stale_after seconds is considered left by a dead process
+    and is broken, so stale_after must stay well above the longest critical section.
+    Each acquisition writes a random token: release() only removes a lock file
+    still carrying it, never a lock another process took after breaking ours.
+    """
+    def __init__(self, path, timeout=120, stale_after=600, poll_interval=0.05):
+        self.path = path
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.poll_interval = poll_interval
+        self._token = None
+
+    def acquire(self):
+        """Raises TimeoutError if the lock could not be taken within timeout."""
+        deadline = time.monotonic() + self.timeout
+        token = uuid.uuid4().hex
+        owner = json.dumps({"owner": default_worker_id(), "thread": threading.get_ident(),
+                            "acquired_at": datetime.now().isoformat(), "token": token})
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if self._is_stale():
+                    self._break()
+                    continue
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"Could not acquire {self.path} within {self.timeout}s")
+                time.sleep(self.poll_interval)
+                continue
+            with os.fdopen(fd, "w") as f:
+                f.write(owner)
+            self._token = token
+            return self
+
+    def release(self):
+        token, self._token = self._token, None
+        if token is None or self._read_token() != token:
+            return  # never held, or broken as stale and re-taken: not ours to remove
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _read_token(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f).get("token")
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+    def _is_stale(self):
+        try:
+            return time.time() - os.path.getmtime(self.path) > self.stale_after
+        except FileNotFoundError:
+            return False
+
+    def _break(self):
+        # Rename first: of several processes breaking the same stale lock, only one succeeds
+        broken_path = f"{self.path}.stale.{default_worker_id()}.{threading.get_ident()}"
+        try:
+            os.replace(self.path, broken_path)
+            os.remove(broken_path)
+        except FileNotFoundError:
+            pass
+
+
+class LeaseStore:
+    """
+    Shared chunk queue for several harvester nodes.
+    Philosophy: Lease, don't lock. A dead node only delays its chunk by one lease.
+
+    One SQLite file on the shared volume holds every chunk with its status:
+        pending -> leased (owner, lease_expires) -> done
+                                                 -> pending again on failure (until max_attempts) -> failed
+    A leased chunk whose lease expired (the node died or lost the volume)
+    is handed to the next idle worker, so no chunk is lost.
+    Each acquire is one IMMEDIATE transaction: two workers never get the same live lease.
+    Forced runs carry a run_id: a chunk finished within that run is never re-queued
+    by nodes joining the same run later.
+
+    Note: SQLite locking needs a volume with working POSIX locks (local disk,
+    Docker volume, SMB/NFSv4 with locking enabled).
+    """
+    def __init__(self, db_path, lease_seconds=300, max_attempts=3):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        folder = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(folder, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS chunks (
+                    start_date    TEXT NOT NULL,
+                    end_date      TEXT NOT NULL,
+                    step          TEXT NOT NULL,
+                    status        TEXT NOT NULL DEFAULT 'pending',
+                    owner         TEXT,
+                    lease_expires TEXT,
+                    attempts      INTEGER NOT NULL DEFAULT 0,
+                    last_error    TEXT,
+                    updated_at    TEXT NOT NULL,
+                    run_id        TEXT,
+                    PRIMARY KEY (start_date, end_date)
+                )
+                """
+            )
+            # Databases created before run_id existed
+            columns = [row["name"] for row in conn.execute("PRAGMA table_info(chunks)").fetchall()]
+            if "run_id" not in columns:
+                conn.execute("ALTER TABLE chunks ADD COLUMN run_id TEXT")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return _Transaction(conn)
+
+    @staticmethod
+    def _now():
+        return datetime.now()
+
+    # --- PRODUCER SIDE ---
+
+    def enqueue(self, chunks, step="day", run_id=None):
+        """
+        Input: [(start, end), ...] (typically HarvestPlanner output),
+               run_id: id of a forced run shared by its nodes (None = planner-driven run).
+        Action: Adds new chunks; finished or failed ones are queued again
+                (the planner only re-plans chunks that really need a refetch),
+                except those already finished within the same run_id.
+                Chunks currently leased or pending are left untouched, so every
+                node may enqueue the same plan.
+        Output: Number of chunks (re)queued.
+        """
+        now = self._now().isoformat()
+        queued = 0
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for start, end in chunks:
+                cursor = conn.execute(
+                    """
+                    INSERT INTO chunks (start_date, end_date, step, updated_at, run_id) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (start_date, end_date) DO UPDATE
+                        SET status = 'pending', owner = NULL, lease_expires = NULL, attempts = 0,
+                            last_error = NULL, updated_at = excluded.updated_at, run_id = excluded.run_id
+                        WHERE chunks.status IN ('done', 'failed')
+                          AND (excluded.run_id IS NULL OR chunks.run_id IS NOT excluded.run_id)
+                    """,
+                    (start, end, step, now, run_id),
+                )
+                queued += cursor.rowcount
+                if run_id is not None and cursor.rowcount == 0:
+                    # Already queued or in flight: it now counts as part of this run once done
+                    conn.execute(
+                        """
+                        UPDATE chunks SET run_id = ?
+                        WHERE start_date = ? AND end_date = ? AND status IN ('pending', 'leased')
+                        """,
+                        (run_id, start, end),
+                    )
+        return queued
+
+    # --- WORKER SIDE ---
+
+    def acquire(self, worker_id):
+        """
+        Leases the oldest available chunk: pending, or leased with an expired lease.
+        Output: dict(start, end, step, attempts) or None when nothing is available.
+        """
+        now = self._now()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                """
+                SELECT start_date, end_date, step, attempts FROM chunks
+                WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?)
+                ORDER BY start_date, end_date LIMIT 1
+                """,
+                (now.isoformat(),),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                """
+                UPDATE chunks SET status = 'leased', owner = ?, lease_expires = ?,
+                                  attempts = attempts + 1, updated_at = ?
+                WHERE start_date = ? AND end_date = ?
+                """,
+                (worker_id, (now + timedelta(seconds=self.lease_seconds)).isoformat(), now.isoformat(),
+                 row["start_date"], row["end_date"]),
+            )
+        return {"start": row["start_date"], "end": row["end_date"],
+                "step": row["step"], "attempts": row["attempts"] + 1}
+
+    def heartbeat(self, worker_id, chunk):
+        """Extends the lease. Output: False if the lease was lost (expired and taken over)."""
+        now = self._now()
+        return self._update_owned(
+            worker_id, chunk,
+            "lease_expires = ?, updated_at = ?",
+            ((now + timedelta(seconds=self.lease_seconds)).isoformat(), now.isoformat()),
+        )
+
+    def complete(self, worker_id, chunk):
+        return self._update_owned(
+            worker_id, chunk,
+            "status = 'done', lease_expires = NULL, last_error = NULL, updated_at = ?",
+            (self._now().isoformat(),),
+        )
+
+    def fail(self, worker_id, chunk, error=None, retry=True):
+        """
+        Gives the chunk back. It goes back to 'pending' while attempts remain
+        (retry=False: immediately, without counting the attempt, e.g. expired token),
+        otherwise it is parked as 'failed'.
+        """
+        now = self._now().isoformat()
+        if retry:
+            status = "CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END"
+            params = (self.max_attempts, str(error) if error else None, now)
+            attempts = "attempts"
+        else:
+            status = "?"
+            params = ("pending", str(error) if error else None, now)
+            attempts = "attempts - 1"
+        return self._update_owned(
+            worker_id, chunk,
+            f"status = {status}, owner = NULL, lease_expires = NULL, attempts = {attempts}, "
+            "last_error = ?, updated_at = ?",
+            params,
+        )
+
+    def _update_owned(self, worker_id, chunk, assignments, params):
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"""
+                UPDATE chunks SET {assignments}
+                WHERE start_date = ? AND end_date = ? AND owner = ? AND status = 'leased'
+                """,
+                (*params, chunk["start"], chunk["end"], worker_id),
+            )
+            return cursor.rowcount == 1
+
+    # --- MONITORING ---
+
+    def stats(self):
+        """Output: dict status -> count (e.g. {'pending': 3, 'leased': 2, 'done': 40})."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM chunks GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def outstanding(self):
+        """Chunks not finished yet (pending or leased, live or expired)."""
+        stats = self.stats()
+        return stats.get("pending", 0) + stats.get("leased", 0)
+
+
+class _Transaction:
+    """sqlite3 connection as a context manager that commits/rolls back AND closes."""
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, *args):
+        return self.conn.execute(*args)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self.conn.in_transaction:
+                self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.conn.close()
+
+
+class Heartbeat:
+    """
+    Keeps a lease alive from a background thread while a chunk is processed.
+    Usage:
+        with Heartbeat(store, worker_id, chunk) as hb:
+            ...  # long download + ingest
+        if hb.lost: ...  # another node may have taken the chunk over
+    """
+    def __init__(self, store, worker_id, chunk, interval=None):
+        self.store = store
+        self.worker_id = worker_id
+        self.chunk = chunk
+        self.interval = interval or max(store.lease_seconds / 3, 0.01)
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if not self.store.heartbeat(self.worker_id, self.chunk):
+                    self.lost = True
+                    return
+            except sqlite3.Error:
+                pass  # transient (busy volume): the next beat retries before the lease runs out
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
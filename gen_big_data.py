@@ -1,18 +1,22 @@
+import argparse
 import polars as pl
 import numpy as np
 from datetime import datetime, timedelta
 import os
 
-def generate_million_rows():
-    source_path = "exports/Master_PPC_Data.parquet"
-    output_path = "exports/Big_Master_PPC_Data.parquet"
-    
+from modern_etl import PartitionManager, RawToSilverIngester, SILVER_DATA_DIR
+
+SEED_SOURCE_PATH = "exports/Master_PPC_Data.parquet"
+
+
+def _load_seed_data(source_path=SEED_SOURCE_PATH):
+    """Loads the real export used as distribution seed, or a tiny synthetic stand-in."""
     print(f"Loading seed data from {source_path}...")
     try:
-        seed_df = pl.read_parquet(source_path)
+        return pl.read_parquet(source_path)
     except Exception:
         print("⚠️ Không tìm thấy file gốc. Sẽ dùng data giả lập hoàn toàn.")
-        seed_df = pl.DataFrame({
+        return pl.DataFrame({
             "SKU": ["SKU-A", "SKU-B"],
             "ASIN": ["B001", "B002"],
             "Product Name": ["Prod A", "Prod B"],
@@ -22,6 +26,11 @@ def generate_million_rows():
             "ROAS": [5.0, 3.75]
         })
 
+
+def generate_million_rows():
+    output_path = "exports/Big_Master_PPC_Data.parquet"
+    seed_df = _load_seed_data()
+
     # 1. Analyze Seed Data
     unique_skus = seed_df["SKU"].unique().to_list()
     if len(unique_skus) < 1: unique_skus = ["SKU-GEN-01"]
@@ -128,5 +137,189 @@ def generate_million_rows():
     print(f"📁 Output Size: {file_size:.2f} MB")
     print(f"👉 Use this path in your App: {os.path.abspath(output_path)}")
 
+
+def _daily_block(rng, skus, asins, names, base_rev, revision=1.0):
+    """
+    Builds one harvest of one Report_Date (one row per SKU) in the same
+    shape the ingester writes to Silver, minus the ingestion stamp.
+    """
+    n = len(skus)
+    noise = rng.uniform(0.5, 1.5, size=n)
+    seasonality = rng.uniform(0.8, 1.2, size=n)
+    revenue = base_rev * noise * seasonality * revision
+
+    acos_base = rng.uniform(0.1, 0.6, size=n)
+    spend = revenue * acos_base
+    avg_price = rng.uniform(20, 50, size=n)
+    units = (revenue / avg_price).astype(np.int64)
+    roas = np.divide(revenue, spend, out=np.zeros_like(revenue), where=spend != 0)
+    phases = rng.choice([1, 2, 3], size=n, p=[0.1, 0.3, 0.6])
+
+    return pl.DataFrame({
+        "SKU": skus,
+        "ASIN": asins,
+        "Product Name": names,
+        "Revenue (Actual)": revenue,
+        "Ads Spend (Actual)": spend,
+        "Unit sold (Actual)": units,
+        "ROAS": roas,
+        "Phase": phases,
+    }).with_columns([
+        pl.col("Revenue (Actual)").round(2),
+        pl.col("Ads Spend (Actual)").round(2),
+        pl.col("ROAS").round(2),
+        pl.lit(0.0).alias("Refund"),
+        pl.lit(100).alias("FBA Stock"),
+    ])
+
+
+def _apply_schema_drift(df, rng):
+    """
+    Mimics the export changing shape between harvests:
+    a dropped column, a brand new column, or a column changing dtype.
+    """
+    kind = rng.integers(0, 3)
+    if kind == 0:
+        return df.drop("Refund"), "drop:Refund"
+    if kind == 1:
+        tacos = (df["Ads Spend (Actual)"] / df["Revenue (Actual)"]).fill_nan(0.0).round(4)
+        return df.with_columns(tacos.alias("TACOS")), "add:TACOS"
+    return df.with_columns(pl.col("Phase").cast(pl.String)), "cast:Phase->String"
+
+
+def generate_partitioned_lake(
+    base_dir=SILVER_DATA_DIR,
+    n_skus=100_000,
+    start_date="2024-01-01",
+    end_date="2025-11-30",
+    seed=42,
+    reharvest_rate=0.2,
+    drift_rate=0.05,
+    build_sidecars=True,
+):
+    """
+    Streams a synthetic Silver lake straight into the partitioned layout
+    (base_dir/YYYY/MM/ppc_<start>_<end>_ingest_<ts>.parquet).
+
+    Memory stays constant: only the SKU catalog and one date block are
+    alive at a time. Every block draws from its own RNG seeded by
+    (seed, day, harvest), so the output is reproducible regardless of
+    how far a previous run got.
+
+    - reharvest_rate: share of dates that get a later, revised ingestion
+      of the same date (overlapping files for dedup/compaction testing).
+    - drift_rate: share of ingestions whose schema differs from the norm.
+    - build_sidecars: files bypass the ingester, so the SKU index, rollups,
+      CDC and lake versions are rebuilt once at the end.
+    """
+    seed_df = _load_seed_data()
+    unique_skus = seed_df["SKU"].unique(maintain_order=True).to_list() or ["SKU-GEN-01"]
+    avg_rev = seed_df["Revenue (Actual)"].mean() or 2000
+    std_rev = seed_df["Revenue (Actual)"].std() or 500
+
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d")
+    days = (end - start).days + 1
+
+    print(f"🚀 Lake Plan: {n_skus:,} SKUs x {days} Days = {n_skus * days:,} base rows "
+          f"(+~{reharvest_rate:.0%} re-harvests) -> {base_dir}")
+
+    # SKU catalog is the only state shared across blocks
+    catalog_rng = np.random.default_rng(seed)
+    skus = pl.Series([f"{unique_skus[i % len(unique_skus)]}_V{i:06d}" for i in range(n_skus)])
+    asins = pl.Series([f"ASIN_{i:06d}" for i in range(n_skus)])
+    names = pl.Series([f"Product {unique_skus[i % len(unique_skus)]} Variant {i:06d}" for i in range(n_skus)])
+    base_rev = catalog_rng.normal(avg_rev, std_rev, size=n_skus).clip(min=100)
+
+    total_rows = 0
+    total_files = 0
+    total_bytes = 0
+
+    for day in range(days):
+        report_day = start + timedelta(days=day)
+        date_str = report_day.strftime("%Y-%m-%d")
+        target_dir = PartitionManager.ensure_partition_exists(base_dir, report_day)
+
+        plan_rng = np.random.default_rng([seed, day])
+        harvests = 1 + int(plan_rng.random() < reharvest_rate)
+        # Nightly cron lands the day after, later harvests revise it within a week
+        ingest_at = report_day + timedelta(days=1, hours=2, seconds=float(plan_rng.uniform(0, 3600)))
+
+        for harvest in range(harvests):
+            rng = np.random.default_rng([seed, day, harvest])
+            revision = 1.0 if harvest == 0 else float(rng.uniform(0.95, 1.05))
+            df = _daily_block(rng, skus, asins, names, base_rev, revision)
+
+            drift = None
+            if rng.random() < drift_rate:
+                df, drift = _apply_schema_drift(df, rng)
+
+            df = df.with_columns([
+                pl.lit(ingest_at.isoformat()).alias("ingestion_time"),
+                pl.lit(date_str).alias("Date_Start"),
+                pl.lit(date_str).alias("Date_End"),
+                pl.lit(date_str).alias("Report_Date"),
+            ])
+
+            safe_ts = ingest_at.strftime("%Y%m%d%H%M%S%f")
+            output_path = os.path.join(target_dir, f"ppc_{date_str}_{date_str}_ingest_{safe_ts}.parquet")
+            # Same physical layout as the ingester: SKU-clustered row groups with stats
+            df.sort("SKU").write_parquet(
+                output_path, compression="zstd", statistics=True,
+                row_group_size=RawToSilverIngester.ROW_GROUP_SIZE,
+            )
+
+            total_rows += df.height
+            total_files += 1
+            total_bytes += os.path.getsize(output_path)
+            if drift:
+                print(f"   [DRIFT] {date_str} harvest #{harvest + 1}: {drift}")
+
+            ingest_at += timedelta(days=float(rng.uniform(1, 7)))
+
+        if (day + 1) % 30 == 0 or day + 1 == days:
+            print(f"   ... {day + 1}/{days} days | {total_rows:,} rows | {total_files:,} files")
+
+    print(f"✅ DONE! Generated {total_rows:,} rows in {total_files:,} files.")
+    print(f"📁 Lake Size: {total_bytes / (1024 * 1024):.2f} MB at {os.path.abspath(base_dir)}")
+    if build_sidecars:
+        print("🔧 Rebuilding sidecars (SKU index, rollups, CDC, lake versions)...")
+        months = RawToSilverIngester().rebuild_sidecars(base_dir)
+        print(f"✅ Sidecars rebuilt for {len(months)} partitions.")
+    else:
+        print("👉 Sidecars skipped: call RawToSilverIngester().rebuild_sidecars() before SKU lookups or rollups.")
+    return total_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic PPC data generator")
+    parser.add_argument("--mode", choices=["single", "lake"], default="single",
+                        help="single: one Big_Master parquet | lake: stream into partitioned silver layout")
+    parser.add_argument("--base-dir", default=SILVER_DATA_DIR, help="Lake root (lake mode)")
+    parser.add_argument("--skus", type=int, default=100_000, help="Number of SKUs (lake mode)")
+    parser.add_argument("--start", default="2024-01-01", help="First Report_Date (YYYY-MM-DD)")
+    parser.add_argument("--end", default="2025-11-30", help="Last Report_Date (YYYY-MM-DD)")
+    parser.add_argument("--seed", type=int, default=42, help="RNG seed for reproducible output")
+    parser.add_argument("--reharvest-rate", type=float, default=0.2, help="Share of dates re-ingested later")
+    parser.add_argument("--drift-rate", type=float, default=0.05, help="Share of ingestions with schema drift")
+    parser.add_argument("--skip-sidecars", action="store_true",
+                        help="Do not rebuild index/rollups/CDC after generation (lake mode)")
+    args = parser.parse_args()
+
+    if args.mode == "single":
+        generate_million_rows()
+    else:
+        generate_partitioned_lake(
+            base_dir=args.base_dir,
+            n_skus=args.skus,
+            start_date=args.start,
+            end_date=args.end,
+            seed=args.seed,
+            reharvest_rate=args.reharvest_rate,
+            drift_rate=args.drift_rate,
+            build_sidecars=not args.skip_sidecars,
+        )
+
+
 if __name__ == "__main__":
-    generate_million_rows()
+    main()
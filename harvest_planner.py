@@ -0,0 +1,139 @@
+import calendar
+from datetime import datetime, timedelta
+
+from lake_layout import list_partition_files, parse_silver_filename, to_utc
+
+
+def iter_chunks(start_date_str, end_date_str, step="day"):
+    """
+    Splits a date range into harvest chunks, exactly like the export API is called.
+    step: 'day', 'month', 'year', 'total'
+    Yields: (chunk_start 'YYYY-MM-DD', chunk_end 'YYYY-MM-DD')
+    """
+    start_date = datetime.strptime(start_date_str, "%Y-%m-%d")
+    end_date = datetime.strptime(end_date_str, "%Y-%m-%d")
+
+    current = start_date
+    while current <= end_date:
+        # Determine chunk end date based on step
+        if step == "day":
+            chunk_end = current
+        elif step == "month":
+            _, last_day = calendar.monthrange(current.year, current.month)
+            chunk_end = current.replace(day=last_day)
+        elif step == "year":
+            chunk_end = current.replace(month=12, day=31)
+        else: # total
+            chunk_end = end_date
+
+        # Clamp chunk_end to global end_date
+        if chunk_end > end_date:
+            chunk_end = end_date
+
+        yield current.strftime("%Y-%m-%d"), chunk_end.strftime("%Y-%m-%d")
+
+        if step == "total":
+            break
+        current = chunk_end + timedelta(days=1)
+
+
+class HarvestPlanner:
+    """
+    Decides which chunks actually need a download.
+    Philosophy: The lake already knows what it has.
+
+    A chunk is scheduled when:
+      - missing: no silver file for that exact (start, end) range, or
+      - stale:   its latest ingestion happened before the numbers settled
+                 (less than settle_days after the chunk end) and is at least
+                 min_refresh_hours old (so overlapping triggers don't refetch).
+    Only file names (and, for foreign names, parquet footers) are read.
+    """
+    def __init__(self, base_dir, settle_days=3, min_refresh_hours=12):
+        self.base_dir = base_dir
+        self.settle_days = settle_days
+        self.min_refresh_hours = min_refresh_hours
+
+    def latest_ingestions(self, start_date_str, end_date_str):
+        """
+        Output: dict {(chunk_start, chunk_end): latest ingestion datetime}
+        for silver files partitioned within the range.
+        """
+        latest = {}
+        for path in list_partition_files(self.base_dir, start_date_str, end_date_str):
+            info = parse_silver_filename(path) or self._describe_file(path)
+            if info is None:
+                continue
+            key = (info["start_date"], info["end_date"])
+            if key not in latest or to_utc(info["ingested_at"]) > to_utc(latest[key]):
+                latest[key] = info["ingested_at"]
+        return latest
+
+    def plan(self, start_date_str, end_date_str, step="day", now=None):
+        """
+        Returns:
+            list of dict(start, end, reason) in chronological order,
+            reason in {'missing', 'stale'}. Fresh chunks are left out.
+        """
+        now = now or datetime.now()
+        latest = self.latest_ingestions(start_date_str, end_date_str)
+        planned = []
+        for c_start, c_end in iter_chunks(start_date_str, end_date_str, step):
+            reason = self._reason(c_end, latest.get((c_start, c_end)), now)
+            if reason:
+                planned.append({"start": c_start, "end": c_end, "reason": reason})
+        return planned
+
+    def still_needed(self, c_start, c_end, now=None):
+        """
+        Re-checks one chunk right before its download: another run (e.g. an
+        overlapping /trigger/scrape) may have ingested it since the plan was made.
+        Output: 'missing', 'stale' or None (fresh, skip it).
+        """
+        ingested_at = self.latest_ingestions(c_start, c_end).get((c_start, c_end))
+        return self._reason(c_end, ingested_at, now or datetime.now())
+
+    def _reason(self, c_end, ingested_at, now):
+        if ingested_at is None:
+            return "missing"
+        # File names are naive host-local, foreign files may carry an offset: compare in UTC
+        ingested_at = to_utc(ingested_at)
+        settled_at = to_utc(datetime.strptime(c_end, "%Y-%m-%d") + timedelta(days=self.settle_days))
+        captured_early = ingested_at < settled_at
+        old_enough = to_utc(now) - ingested_at >= timedelta(hours=self.min_refresh_hours)
+        return "stale" if captured_early and old_enough else None
+
+    @staticmethod
+    def _describe_file(path):
+        """
+        Fallback for files not named by the ingester: reads Date_Start/Date_End
+        and max ingestion_time from the parquet statistics.
+        """
+        import pyarrow.parquet as pq  # only needed for foreign files; keeps planning imports light
+
+        try:
+            metadata = pq.ParquetFile(path).metadata
+            names = [metadata.schema.column(i).name for i in range(metadata.num_columns)]
+            if not all(c in names for c in ("Date_Start", "Date_End", "ingestion_time")) or metadata.num_row_groups == 0:
+                return None
+
+            def stat(column, pick):
+                values = []
+                for rg in range(metadata.num_row_groups):
+                    stats = metadata.row_group(rg).column(names.index(column)).statistics
+                    if stats is None or not stats.has_min_max:
+                        return None
+                    values.append(stats.max if pick is max else stats.min)
+                return pick(values)
+
+            ingestion_max = stat("ingestion_time", max)
+            start, end = stat("Date_Start", min), stat("Date_End", max)
+            if None in (ingestion_max, start, end):
+                return None
+            return {
+                "start_date": str(start),
+                "end_date": str(end),
+                "ingested_at": datetime.fromisoformat(str(ingestion_max)),
+            }
+        except Exception:
+            return None
@@ -0,0 +1,223 @@
+import os
+import glob
+import time
+import shutil
+from datetime import datetime
+from itertools import groupby
+
+import polars as pl
+import pyarrow.parquet as pq
+
+from lake_layout import meta_dir, list_partition_files, partition_month, ingestion_time_utc
+
+
+class SkuIndex:
+    """
+    Secondary index: SKU/ASIN -> (silver file, row groups).
+    Philosophy: Small sorted runs per month, merged tier by tier.
+
+    Layout (under <base_dir>/_meta/sku_index):
+        YYYY-MM/L<level>_<ts>_<pid>.parquet   one row per (key, file) with its row_groups
+    Every ingestion writes a level-0 run into the month of its silver file;
+    FANOUT runs of one level are merged into one run of the next level. A merge
+    only touches neighbouring runs of a single month, so its cost (and the time
+    the sidecar lock is held) stays flat while the lake grows. Runs are sorted
+    by key with small row groups: a lookup only decodes the row groups whose
+    min/max stats cover the key.
+    """
+    KEY_COLUMNS = ("SKU", "ASIN")
+    FANOUT = 8
+    RUN_ROW_GROUP_SIZE = 8192
+
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        self.index_dir = meta_dir(base_dir, "sku_index")
+
+    # --- WRITE SIDE ---
+
+    def update(self, parquet_path):
+        """
+        Input: path of a freshly written silver file.
+        Action: Writes a level-0 run with its (key, row_groups) entries, then merges full tiers.
+        Output: Number of index entries (key, file) added.
+        """
+        entries = self._entries_for_file(parquet_path)
+        if entries is None or entries.height == 0:
+            return 0
+        month_dir = meta_dir(self.base_dir, "sku_index", partition_month(parquet_path))
+        self._write_run(entries, month_dir, level=0)
+        self._merge_tiers(month_dir)
+        return entries.height
+
+    def compact(self):
+        """Merges the runs of every month into a single run per month."""
+        for month_dir in self._month_dirs():
+            runs = self._run_paths(month_dir)
+            if len(runs) > 1:
+                top = max(self._level(p) for p in runs)
+                self._merge(runs, month_dir, level=top)
+
+    def rebuild(self):
+        """
+        Full re-index of the lake (e.g. after gen_big_data or a manual copy),
+        one month at a time. Also drops indexes written in an older layout.
+        """
+        for name in os.listdir(self.index_dir):
+            path = os.path.join(self.index_dir, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        # Sorted paths: each YYYY/MM folder is one contiguous group
+        for month, paths in groupby(list_partition_files(self.base_dir), key=partition_month):
+            frames = [e for e in (self._entries_for_file(p) for p in paths) if e is not None]
+            if frames:
+                self._write_run(pl.concat(frames), meta_dir(self.base_dir, "sku_index", month), level=0)
+
+    def _merge_tiers(self, month_dir):
+        level = 0
+        while True:
+            runs = self._run_paths(month_dir, level)
+            if len(runs) < self.FANOUT:
+                return
+            self._merge(runs, month_dir, level + 1)
+            level += 1
+
+    def _merge(self, runs, month_dir, level):
+        # Written before the inputs are removed: a crash in between only leaves duplicates
+        merged = pl.scan_parquet(runs).unique(subset=["key", "file"], keep="last").collect()
+        self._write_run(merged, month_dir, level)
+        for path in runs:
+            os.remove(path)
+
+    def _write_run(self, entries, month_dir, level):
+        safe_ts = datetime.now().strftime("%Y%m%d%H%M%S%f")
+        run_path = os.path.join(month_dir, f"L{level}_{safe_ts}_{os.getpid()}.parquet")
+        entries.sort(["key", "file"]).write_parquet(
+            run_path + ".tmp", statistics=True, row_group_size=self.RUN_ROW_GROUP_SIZE
+        )
+        os.replace(run_path + ".tmp", run_path)
+        return run_path
+
+    def _entries_for_file(self, parquet_path):
+        """One row per (key, file): the row groups holding that key, aggregated."""
+        parquet_file = pq.ParquetFile(parquet_path)
+        key_columns = [c for c in self.KEY_COLUMNS if c in parquet_file.schema_arrow.names]
+        if not key_columns:
+            return None
+
+        # One read of the key columns; row group = position against the row-group offsets
+        table = parquet_file.read(columns=key_columns)
+        if table.num_rows == 0:
+            return None
+        offsets = pl.DataFrame({
+            "row_group": range(parquet_file.num_row_groups),
+            "rows": [parquet_file.metadata.row_group(rg).num_rows for rg in range(parquet_file.num_row_groups)],
+        }, schema={"row_group": pl.Int32, "rows": pl.UInt32})
+        row_group = offsets.select(pl.col("row_group").repeat_by("rows").explode()).to_series()
+        return (
+            pl.from_arrow(table)
+            .select([pl.col(c).cast(pl.String) for c in key_columns])
+            .with_columns(row_group)
+            .unpivot(index="row_group", on=key_columns, value_name="key")
+            .select(["key", "row_group"])
+            .drop_nulls()
+            .unique(maintain_order=True)
+            .group_by("key", maintain_order=True)
+            .agg(pl.col("row_group").alias("row_groups"))
+            .with_columns(pl.lit(os.path.relpath(parquet_path, self.base_dir)).alias("file"))
+            .select(["key", "file", "row_groups"])
+        )
+
+    def _month_dirs(self):
+        return sorted(p for p in glob.glob(os.path.join(self.index_dir, "[0-9]*")) if os.path.isdir(p))
+
+    def _run_paths(self, month_dir=None, level=None):
+        months = [month_dir] if month_dir else self._month_dirs()
+        pattern = f"L{level}_*.parquet" if level is not None else "L*.parquet"
+        return sorted(p for m in months for p in glob.glob(os.path.join(m, pattern)))
+
+    @staticmethod
+    def _level(run_path):
+        return int(os.path.basename(run_path)[1:].split("_", 1)[0])
+
+    # --- READ SIDE ---
+
+    def locate(self, key):
+        """
+        Input: SKU or ASIN
+        Output: dict {absolute silver path: [row_group, ...]}
+        """
+        sources = self._run_paths()
+        if not sources:
+            return {}
+        hits = (
+            pl.scan_parquet(sources)
+            .filter(pl.col("key") == str(key))
+            .select(["file", pl.col("row_groups").alias("row_group")])
+            .explode("row_group")
+            .unique()
+            .collect()
+        )
+        locations = {}
+        for relative_path, rg in hits.sort(["file", "row_group"]).iter_rows():
+            locations.setdefault(os.path.join(self.base_dir, relative_path), []).append(rg)
+        return locations
+
+    def history(self, key, columns=None, latest_only=False):
+        """
+        Scenario: "history for this SKU/ASIN".
+        Reads only the row groups the index points at.
+        Args:
+            key (str): SKU or ASIN.
+            columns (list): Optional projection (key/date/ingestion columns are always kept).
+            latest_only (bool): Keep only the latest ingestion per SKU + Report_Date.
+        Returns:
+            pl.DataFrame sorted by Report_Date, ingestion_time.
+        """
+        frames = []
+        for path, row_groups in self.locate(key).items():
+            if not os.path.exists(path):
+                continue  # file removed since indexing (e.g. compaction)
+            parquet_file = pq.ParquetFile(path)
+            available = parquet_file.schema_arrow.names
+            wanted = None
+            if columns:
+                keep = list(dict.fromkeys(list(self.KEY_COLUMNS) + ["Report_Date", "ingestion_time"] + list(columns)))
+                wanted = [c for c in keep if c in available]
+            df = pl.from_arrow(parquet_file.read_row_groups(row_groups, columns=wanted))
+            key_filter = pl.lit(False)
+            for c in self.KEY_COLUMNS:
+                if c in df.columns:
+                    key_filter = key_filter | (pl.col(c).cast(pl.String) == str(key))
+            frames.append(df.filter(key_filter))
+
+        if not frames:
+            return pl.DataFrame()
+
+        # Files written across schema drift do not share an exact schema
+        df = pl.concat(frames, how="diagonal_relaxed")
+        sort_cols = [c for c in ("Report_Date", "ingestion_time") if c in df.columns]
+        if latest_only and sort_cols == ["Report_Date", "ingestion_time"]:
+            subset = [c for c in ("SKU", "Report_Date") if c in df.columns]
+            df = df.sort(ingestion_time_utc(), maintain_order=True).unique(subset=subset, keep="last")
+        return df.sort(sort_cols) if sort_cols else df
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 3:
+        print("Usage: python lake_index.py <silver_dir> rebuild | <silver_dir> <SKU/ASIN>")
+        sys.exit(1)
+
+    index = SkuIndex(sys.argv[1])
+    if sys.argv[2] == "rebuild":
+        start = time.perf_counter()
+        index.rebuild()
+        print(f"Index rebuilt in {time.perf_counter() - start:.2f}s")
+    else:
+        start = time.perf_counter()
+        result = index.history(sys.argv[2])
+        print(result)
+        print(f"{result.height} rows in {(time.perf_counter() - start) * 1000:.1f} ms")
@@ -0,0 +1,112 @@
+import os
+import re
+import glob
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+# Sidecar data (indexes, rollups...) lives under <base_dir>/_meta so it never
+# matches the YYYY/MM partition glob used by readers.
+META_DIR_NAME = "_meta"
+
+SILVER_FILE_PATTERN = re.compile(
+    r"^ppc_(?P<start>[^_]+)_(?P<end>[^_]+)_ingest_(?P<ts>\d{20})\.parquet$"
+)
+
+
+def meta_dir(base_dir, *parts):
+    """
+    Input: lake root + sub folders (e.g. 'sku_index')
+    Output: Path string (e.g., './silver_data/_meta/sku_index')
+    Action: Creates directory if not exists.
+    """
+    target_path = os.path.join(base_dir, META_DIR_NAME, *parts)
+    os.makedirs(target_path, exist_ok=True)
+    return target_path
+
+
+def list_partition_files(base_dir, start_date=None, end_date=None):
+    """
+    Lists Silver parquet files (base_dir/YYYY/MM/*.parquet), sorted.
+    start_date/end_date (YYYY-MM-DD) prune whole month folders only;
+    rows still have to be filtered by the caller.
+    """
+    paths = glob.glob(os.path.join(base_dir, "[0-9][0-9][0-9][0-9]", "[0-9][0-9]", "*.parquet"))
+    if start_date or end_date:
+        first = start_date[:7] if start_date else "0000-00"
+        last = end_date[:7] if end_date else "9999-99"
+        paths = [p for p in paths if first <= partition_month(p) <= last]
+    return sorted(paths)
+
+
+def partition_month(path):
+    """'./silver_data/2025/10/x.parquet' -> '2025-10'"""
+    month_dir = os.path.dirname(path)
+    return f"{os.path.basename(os.path.dirname(month_dir))}-{os.path.basename(month_dir)}"
+
+
+def parse_silver_filename(path):
+    """
+    Decodes the ingester naming strategy.
+    Output: dict(start_date, end_date, ingested_at: datetime) or None if foreign file.
+    """
+    match = SILVER_FILE_PATTERN.match(os.path.basename(path))
+    if not match:
+        return None
+    return {
+        "start_date": match.group("start"),
+        "end_date": match.group("end"),
+        "ingested_at": datetime.strptime(match.group("ts"), "%Y%m%d%H%M%S%f"),
+    }
+
+
+@lru_cache(maxsize=1)
+def naive_time_zone():
+    """
+    Zone of naive timestamps (the ingester stamps datetime.now(), host-local):
+    the host's IANA zone ($TZ or /etc/localtime), else its current UTC offset ('+07:00').
+    """
+    name = os.environ.get("TZ", "").lstrip(":")
+    if not name:
+        target = os.path.realpath("/etc/localtime")
+        name = target.split("zoneinfo/", 1)[1] if "zoneinfo/" in target else ""
+    try:
+        ZoneInfo(name)
+        return name
+    except (ValueError, OSError):
+        offset = datetime.now().astimezone().strftime("%z")
+        return f"{offset[:3]}:{offset[3:]}"
+
+
+def _naive_tzinfo():
+    name = naive_time_zone()
+    if name[0] in "+-":
+        sign = -1 if name[0] == "-" else 1
+        return timezone(sign * timedelta(hours=int(name[1:3]), minutes=int(name[4:6])))
+    return ZoneInfo(name)
+
+
+def to_utc(value):
+    """datetime or ISO string (offset, 'Z' or naive = host-local) -> aware datetime in UTC."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=_naive_tzinfo())
+    return value.astimezone(timezone.utc)
+
+
+def ingestion_time_utc():
+    """
+    ingestion_time as Datetime(UTC). Stamps may mix offsets ('+07:00', 'Z') and
+    naive host-local values, so text comparison would misorder them.
+    """
+    import polars as pl  # only the query/sidecar side needs it; keeps planning imports light
+
+    text = pl.col("ingestion_time").cast(pl.String).str.replace(r"Z$", "+00:00")
+    aware = text.str.to_datetime("%Y-%m-%dT%H:%M:%S%.f%z", strict=False, time_zone="UTC")
+    naive = (
+        text.str.to_datetime("%Y-%m-%dT%H:%M:%S%.f", strict=False)
+        .dt.replace_time_zone(naive_time_zone(), ambiguous="earliest", non_existent="null")
+        .dt.convert_time_zone("UTC")
+    )
+    return pl.coalesce(aware, naive)
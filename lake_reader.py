@@ -0,0 +1,311 @@
+import os
+import json
+import base64
+from datetime import datetime, time, timezone
+
+import polars as pl
+import pyarrow.parquet as pq
+
+from lake_layout import list_partition_files, meta_dir, parse_silver_filename, ingestion_time_utc, to_utc
+from query_cache import QueryCache
+from rollups import RollupStore
+
+
+def normalize_as_of(as_of):
+    """
+    Cutoff for as-of reads, as a timezone-aware datetime in UTC.
+    Accepts a datetime or an ISO string, with or without offset (naive = host-local);
+    a bare date ('2025-10-14') means the end of that day. Raises ValueError on anything else.
+    """
+    try:
+        if isinstance(as_of, str) and len(as_of) == 10:
+            as_of = datetime.combine(datetime.strptime(as_of, "%Y-%m-%d"), time.max)
+        return to_utc(as_of)
+    except (AttributeError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid as_of: {as_of}") from e
+
+
+def months_between(start_date, end_date):
+    """'2025-11-15', '2026-01-02' -> ['2025-11', '2025-12', '2026-01']"""
+    current = datetime.strptime(start_date[:7], "%Y-%m")
+    last = datetime.strptime(end_date[:7], "%Y-%m")
+    months = []
+    while current <= last:
+        months.append(current.strftime("%Y-%m"))
+        current = current.replace(year=current.year + current.month // 12, month=current.month % 12 + 1)
+    return months
+
+
+class LakeReader:
+    """
+    Read API over the Silver lake for BI / AI-analysis consumers.
+    Philosophy: Read-time dedup (latest ingestion_time), cached per lake version.
+
+    Every read also takes as_of (time travel): the lake as it was at that
+    ingestion time. Files ingested after the cutoff are skipped from their
+    name or footer statistics, before any row is read.
+    """
+    KEYS = ["SKU", "Report_Date"]
+
+    def __init__(self, base_dir, cache=None, disk_cache=False):
+        self.base_dir = base_dir
+        self.cache = cache or QueryCache(
+            base_dir, disk_dir=meta_dir(base_dir, "query_cache") if disk_cache else None
+        )
+        self.rollups = RollupStore(base_dir)
+        # path -> (min, max) ingestion_time from the footer; silver files are immutable
+        self._ingestion_bounds_cache = {}
+
+    def scan_range(self, start_date, end_date, skus=None, columns=None, latest_only=True, as_of=None):
+        """
+        Lazy version of read_range (uncached).
+        Returns None when no partition overlaps the range.
+        """
+        if as_of is not None:
+            as_of = normalize_as_of(as_of)
+            paths = self.list_files_as_of(start_date, end_date, as_of)
+        else:
+            paths = list_partition_files(self.base_dir, start_date, end_date)
+        if not paths:
+            return None
+
+        # Files across schema drift do not share an exact schema
+        lf = pl.concat([pl.scan_parquet(p) for p in paths], how="diagonal_relaxed")
+        lf = lf.filter(pl.col("Report_Date").is_between(pl.lit(start_date), pl.lit(end_date)))
+        if as_of is not None:
+            lf = lf.filter(ingestion_time_utc() <= pl.lit(as_of))
+        if skus:
+            lf = lf.filter(pl.col("SKU").cast(pl.String).is_in([str(s) for s in skus]))
+        if latest_only:
+            lf = lf.sort(ingestion_time_utc()).unique(subset=self.KEYS, keep="last", maintain_order=True)
+        if columns:
+            keep = list(dict.fromkeys(self.KEYS + list(columns) + ["ingestion_time"]))
+            available = lf.collect_schema().names()
+            lf = lf.select([c for c in keep if c in available])
+        return lf.sort(self.KEYS)
+
+    def read_range(self, start_date, end_date, skus=None, columns=None, latest_only=True, as_of=None):
+        """
+        Args:
+            start_date, end_date (str): Report_Date range, YYYY-MM-DD, inclusive.
+            skus (list): Optional SKU filter.
+            columns (list): Optional projection (SKU/Report_Date/ingestion_time always kept).
+            latest_only (bool): Keep only the latest ingestion per SKU + Report_Date.
+            as_of (str | datetime): Optional cutoff on ingestion_time (see normalize_as_of).
+                With latest_only: the report as it looked at that time.
+        Returns:
+            pl.DataFrame
+        """
+        as_of = normalize_as_of(as_of) if as_of is not None else None
+        params = {"start_date": start_date, "end_date": end_date, "skus": skus, "columns": columns,
+                  "latest_only": latest_only, "as_of": as_of.isoformat() if as_of else None}
+
+        def compute():
+            lf = self.scan_range(start_date, end_date, skus, columns, latest_only, as_of)
+            return lf.collect() if lf is not None else pl.DataFrame()
+
+        return self.cache.get_or_compute(
+            "read_range", params, months_between(start_date, end_date), compute
+        )
+
+    def read_as_of(self, as_of, start_date, end_date, skus=None, columns=None):
+        """
+        Scenario: Audit / reconciliation ("October as of last Tuesday").
+        Latest row per SKU + Report_Date among ingestions up to as_of.
+        """
+        return self.read_range(start_date, end_date, skus, columns, latest_only=True, as_of=as_of)
+
+    def list_files_as_of(self, start_date, end_date, as_of):
+        """
+        Partition files of the range holding at least one ingestion <= as_of.
+        Ingester file names carry the write time, which is never earlier than
+        the rows' ingestion_time: older names are kept without any IO; newer
+        and foreign names are decided from the footer min(ingestion_time).
+        """
+        as_of = normalize_as_of(as_of)
+        kept = []
+        for path in list_partition_files(self.base_dir, start_date, end_date):
+            info = parse_silver_filename(path)
+            if info and to_utc(info["ingested_at"]) <= as_of:
+                kept.append(path)
+                continue
+            bounds = self._ingestion_bounds(path)
+            if bounds is None or bounds[0] <= as_of:
+                kept.append(path)  # unknown bounds: keep, the row filter decides
+        return kept
+
+    def _ingestion_bounds(self, path):
+        """(min, max) ingestion_time of a file as UTC datetimes, from parquet statistics. None if unknown."""
+        if path in self._ingestion_bounds_cache:
+            return self._ingestion_bounds_cache[path]
+        bounds = None
+        try:
+            metadata = pq.ParquetFile(path).metadata
+            names = [metadata.schema.column(i).name for i in range(metadata.num_columns)]
+            if "ingestion_time" in names and metadata.num_row_groups:
+                column = names.index("ingestion_time")
+                stats = [metadata.row_group(rg).column(column).statistics for rg in range(metadata.num_row_groups)]
+                if all(st is not None and st.has_min_max for st in stats):
+                    # Parsed per row group: text min/max would misorder mixed offsets
+                    bounds = (min(to_utc(str(st.min)) for st in stats), max(to_utc(str(st.max)) for st in stats))
+        except Exception:
+            bounds = None
+        self._ingestion_bounds_cache[path] = bounds
+        return bounds
+
+    # --- STREAMING (API /query) ---
+
+    @staticmethod
+    def encode_cursor(relative_path, row, as_of=None):
+        payload = {"file": relative_path, "row": row}
+        if as_of is not None:
+            payload["as_of"] = as_of.isoformat()
+        return base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """(file, row, as_of or None). Raises ValueError on a malformed cursor."""
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+            as_of = normalize_as_of(payload["as_of"]) if payload.get("as_of") else None
+            return payload["file"], int(payload["row"]), as_of
+        except Exception as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+
+    def plan_stream(self, start_date, end_date, skus=None, columns=None, latest_only=False,
+                    cursor=None, limit=None, as_of=None):
+        """
+        Prepares a paginated streaming read without reading any data rows.
+        Returns:
+            dict: files, output schema, start position, latest keys and the
+            cursor of the next page (None if this page reaches the end).
+        Paginated latest_only reads pin the first page's time in the cursor: every
+        page dedups against the same snapshot, and the latest keys are computed once.
+        """
+        cursor_file, start_row = None, 0
+        if cursor:
+            cursor_file, start_row, pinned = self.decode_cursor(cursor)
+            as_of = pinned or as_of
+        elif latest_only and limit and as_of is None:
+            as_of = datetime.now(timezone.utc)
+        if as_of is not None:
+            as_of = normalize_as_of(as_of)
+            files = self.list_files_as_of(start_date, end_date, as_of)
+        else:
+            files = list_partition_files(self.base_dir, start_date, end_date)
+        schemas = {p: pl.read_parquet_schema(p) for p in files}
+        files = [p for p in files if "Report_Date" in schemas[p]]
+
+        # One schema for the whole stream: union of columns, supertype per column
+        union = pl.concat([pl.DataFrame(schema=schemas[p]) for p in files], how="diagonal_relaxed").schema \
+            if files else {}
+        names = [c for c in columns if c in union] if columns else list(union)
+        schema = {name: union[name] for name in names}
+
+        # Dedup over the whole range: a superseding file may sort before the cursor file
+        latest_keys = None
+        if latest_only and files:
+            params = {"start_date": start_date, "end_date": end_date, "skus": skus,
+                      "as_of": as_of.isoformat() if as_of else None}
+            latest_keys = self.cache.get_or_compute(
+                "latest_keys", params, months_between(start_date, end_date),
+                lambda: self._latest_keys(files, start_date, end_date, skus, as_of)
+            )
+
+        if cursor:
+            files = [p for p in files if os.path.relpath(p, self.base_dir) >= cursor_file]
+            if files and os.path.relpath(files[0], self.base_dir) != cursor_file:
+                start_row = 0  # cursor file vanished (e.g. compaction): resume at the next one
+
+        next_cursor = None
+        if limit:
+            remaining = limit
+            for i, path in enumerate(files):
+                offset = start_row if i == 0 else 0
+                available = self._scan_file(path, start_date, end_date, skus, latest_keys, as_of) \
+                    .select(pl.len()).collect().item() - offset
+                if available <= 0:
+                    continue
+                # Page full: the next page starts at the next file that still has rows (none -> last page)
+                if available > remaining or remaining == 0:
+                    next_cursor = self.encode_cursor(os.path.relpath(path, self.base_dir), offset + remaining,
+                                                     as_of if latest_only else None)
+                    break
+                remaining -= available
+
+        return {"files": files, "schema": schema, "start_row": start_row,
+                "latest_keys": latest_keys, "limit": limit, "next_cursor": next_cursor,
+                "start_date": start_date, "end_date": end_date, "skus": skus, "as_of": as_of}
+
+    def iter_batches(self, plan, batch_size=50_000):
+        """
+        Yields pl.DataFrame batches conforming to plan['schema'].
+        Memory is bounded by one file's filtered rows, never the whole result.
+        """
+        remaining = plan["limit"]
+        for i, path in enumerate(plan["files"]):
+            lf = self._scan_file(path, plan["start_date"], plan["end_date"], plan["skus"], plan["latest_keys"],
+                                 plan.get("as_of"))
+            if i == 0 and plan["start_row"]:
+                lf = lf.slice(plan["start_row"])
+            if remaining is not None:
+                lf = lf.head(remaining)
+            available = lf.collect_schema().names()
+            df = lf.select([c for c in plan["schema"] if c in available]).collect()
+            if df.height == 0:
+                continue
+            df = self._conform(df, plan["schema"])
+            for batch in df.iter_slices(batch_size):
+                yield batch
+            if remaining is not None:
+                remaining -= df.height
+                if remaining <= 0:
+                    return
+
+    def _scan_file(self, path, start_date, end_date, skus, latest_keys, as_of=None):
+        lf = pl.scan_parquet(path).filter(
+            pl.col("Report_Date").cast(pl.String).is_between(pl.lit(start_date), pl.lit(end_date))
+        )
+        if as_of is not None:
+            lf = lf.filter(ingestion_time_utc() <= pl.lit(as_of))
+        if skus:
+            lf = lf.filter(pl.col("SKU").cast(pl.String).is_in([str(s) for s in skus]))
+        if latest_keys is not None:
+            lf = lf.join(
+                latest_keys.lazy(),
+                left_on=[pl.col("SKU").cast(pl.String), pl.col("Report_Date").cast(pl.String),
+                         pl.col("ingestion_time").cast(pl.String)],
+                right_on=self.KEYS + ["ingestion_time"],
+                how="semi",
+                maintain_order="left",
+            )
+        return lf
+
+    def _latest_keys(self, files, start_date, end_date, skus, as_of=None):
+        """(SKU, Report_Date) -> latest ingestion_time, from key columns only."""
+        frames = []
+        for path in files:
+            lf = self._scan_file(path, start_date, end_date, skus, None, as_of)
+            frames.append(lf.select([pl.col(c).cast(pl.String) for c in self.KEYS + ["ingestion_time"]]))
+        return (
+            pl.concat(frames)
+            .group_by(self.KEYS)
+            .agg(pl.col("ingestion_time").sort_by(ingestion_time_utc()).last())
+            .collect()
+        )
+
+    @staticmethod
+    def _conform(df, schema):
+        return df.select([
+            pl.col(name).cast(dtype) if name in df.columns else pl.lit(None, dtype=dtype).alias(name)
+            for name, dtype in schema.items()
+        ])
+
+    def rollup(self, start_date, end_date, granularity="week", skus=None):
+        """Cached RollupStore.query (see rollups.py)."""
+        params = {"start_date": start_date, "end_date": end_date,
+                  "granularity": granularity, "skus": skus}
+        return self.cache.get_or_compute(
+            "rollup", params, months_between(start_date, end_date),
+            lambda: self.rollups.query(start_date, end_date, granularity, skus)
+        )
@@ -0,0 +1,224 @@
+import argparse
+import io
+import math
+import random
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import openpyxl
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Same shape as the real market export (header row + trailing blank spacer column)
+TEXT_COLUMNS = ["SKU", "ASIN", "Product Name", "Product Type", "Main Niche", "Hint"]
+METRIC_COLUMNS = [
+    "FBA Stock", "Price", "Phase", "Unit sold (Actual)", "Revenue (Actual)", "TACOS",
+    "CR (Actual)", "CR (Avg)", "CPC (Actual)", "CPC (Avg)", "ORG (Actual)", "ORG (Avg)",
+    "Price Plan", "Refund", "Ads Spend (Actual)", "Priority Score", "Listing Score",
+]
+
+
+class MockExportServer:
+    """
+    Local stand-in for config.API_BASE_URL (the PPC market export).
+    Philosophy: Exercise the real HTTP + xlsx + ingest path, offline and reproducibly.
+
+    GET <url>/api/dashboard/market/export?fromDate=...&toDate=...&page=N
+      200  xlsx workbook, one row per SKU, header 'X-Total-Pages' when paginated
+      401  wrong/missing Bearer token, or randomly (unauthorized_rate)
+      429  randomly (throttle_rate), with 'Retry-After'
+      500  randomly (error_rate)
+    Workbooks are deterministic per (range, page, seed): a re-fetch returns the same numbers.
+    """
+    EXPORT_PATH = "/api/dashboard/market/export"
+
+    def __init__(self, host="127.0.0.1", port=0, token=None, n_skus=2000, page_size=None,
+                 latency_ms=0, latency_jitter_ms=0, error_rate=0.0, throttle_rate=0.0,
+                 unauthorized_rate=0.0, retry_after=1, seed=42):
+        self.token = token
+        self.n_skus = n_skus
+        self.page_size = page_size
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.unauthorized_rate = unauthorized_rate
+        self.retry_after = retry_after
+        self.seed = seed
+
+        self.stats = Counter()  # HTTP status -> count
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        # Building a workbook costs more than serving it: keep recent ones
+        self._workbooks = OrderedDict()
+        self._max_cached_workbooks = 64
+
+        self.httpd = ThreadingHTTPServer((host, port), _ExportHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.mock = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}{self.EXPORT_PATH}"
+
+    @property
+    def total_pages(self):
+        return math.ceil(self.n_skus / self.page_size) if self.page_size else 1
+
+    def start(self):
+        """Serves in a background thread. Output: export URL (use as PPCHarvester base_url)."""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    # --- RESPONSES ---
+
+    def decide(self, authorization):
+        """Status code for one request (auth first, then the random faults)."""
+        if self.token and authorization != f"Bearer {self.token}":
+            return 401
+        with self._lock:
+            draw = self._rng.random()
+        for status, rate in ((401, self.unauthorized_rate), (429, self.throttle_rate), (500, self.error_rate)):
+            if draw < rate:
+                return status
+            draw -= rate
+        return 200
+
+    def delay(self):
+        if not self.latency_ms and not self.latency_jitter_ms:
+            return
+        with self._lock:
+            jitter = self._rng.uniform(-self.latency_jitter_ms, self.latency_jitter_ms)
+        time.sleep(max(self.latency_ms + jitter, 0) / 1000)
+
+    def record(self, status):
+        with self._lock:
+            self.stats[status] += 1
+
+    def workbook(self, start_date, end_date, page=1):
+        """xlsx bytes for one page of one export range."""
+        key = (start_date, end_date, page)
+        with self._lock:
+            if key in self._workbooks:
+                self._workbooks.move_to_end(key)
+                return self._workbooks[key]
+
+        first = (page - 1) * self.page_size if self.page_size else 0
+        last = min(first + self.page_size, self.n_skus) if self.page_size else self.n_skus
+        rng = random.Random(zlib.crc32(f"{self.seed}|{start_date}|{end_date}|{page}".encode()))
+
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet()
+        ws.append(TEXT_COLUMNS + METRIC_COLUMNS + [None])
+        for i in range(first, last):
+            ws.append(
+                [f"SKU-{i:06d}", f"B0{i:08d}", f"Product {i}", "FBA", f"Niche {i % 20}", "keep"]
+                + [round(rng.uniform(0, 500), 2) for _ in METRIC_COLUMNS]
+                + [None]
+            )
+        buffer = io.BytesIO()
+        wb.save(buffer)
+        body = buffer.getvalue()
+
+        with self._lock:
+            self._workbooks[key] = body
+            while len(self._workbooks) > self._max_cached_workbooks:
+                self._workbooks.popitem(last=False)
+        return body
+
+
+class _ExportHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive: harvesters reuse their connection
+
+    def do_GET(self):
+        mock = self.server.mock
+        url = urlparse(self.path)
+        if url.path != mock.EXPORT_PATH:
+            return self._reply(mock, 404, b"Not Found")
+
+        mock.delay()
+        status = mock.decide(self.headers.get("Authorization"))
+        if status == 429:
+            return self._reply(mock, 429, b"Too Many Requests", {"Retry-After": str(mock.retry_after)})
+        if status != 200:
+            return self._reply(mock, status, b"Unauthorized" if status == 401 else b"Internal Server Error")
+
+        query = parse_qs(url.query)
+        try:
+            start_date = query["fromDate"][0][:10]
+            end_date = query["toDate"][0][:10]
+            page = int(query.get("page", ["1"])[0])
+        except (KeyError, ValueError):
+            return self._reply(mock, 400, b"fromDate, toDate and page are required")
+        if not 1 <= page <= mock.total_pages:
+            return self._reply(mock, 400, b"page out of range")
+
+        body = mock.workbook(start_date, end_date, page)
+        self._reply(mock, 200, body, {"Content-Type": XLSX_MEDIA_TYPE, "X-Total-Pages": str(mock.total_pages)})
+
+    def _reply(self, mock, status, body, headers=None):
+        mock.record(status)
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # one line per request would dominate a load test
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the PPC export API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--token", help="Only accept this Bearer token (default: any)")
+    parser.add_argument("--skus", type=int, default=2000, help="Rows per export")
+    parser.add_argument("--page-size", type=int, help="Rows per page (default: no pagination)")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of 500 responses")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of 429 responses")
+    parser.add_argument("--unauthorized-rate", type=float, default=0.0, help="Share of 401 responses")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    server = MockExportServer(
+        args.host, args.port, token=args.token, n_skus=args.skus, page_size=args.page_size,
+        latency_ms=args.latency_ms, latency_jitter_ms=args.latency_jitter_ms, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, unauthorized_rate=args.unauthorized_rate, seed=args.seed,
+    )
+    print(f"Mock export API on {server.url}")
+    print(f"Harvest against it: PPCHarvester(token, base_url='{server.url}', request_delay=0)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(f"Responses: {dict(server.stats)}")
+
+
+if __name__ == "__main__":
+    main()
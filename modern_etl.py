@@ -1,10 +1,21 @@
 import os
+import glob
 import logging
 import datetime
+import threading
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import fastexcel
 import polars as pl
+import pyarrow.parquet as pq
+
+from cdc import ChangeCapture
+from coordination import FileLock
+from lake_index import SkuIndex
+from lake_layout import meta_dir, partition_month, list_partition_files
+from query_cache import LakeVersion
+from rollups import RollupStore
 
 # Config constants (Temporary placement, ideally should come from config.py)
 SILVER_DATA_DIR = "./silver_data"
@@ -67,22 +78,141 @@ class PartitionManager:
         return target_path
 
 
+class ExcelParsePlanner:
+    """
+    Caches how to parse an export, keyed by its header signature.
+    Philosophy: Infer once, then tell fastexcel exactly what to load.
+
+    A plan holds the header row, the columns worth loading and the dtypes
+    that are safe to pin. Plans are looked up optimistically by source (e.g. daily vs
+    monthly export) so a cache hit costs a single sheet parse; the header
+    signature of the parsed sheet is verified and the plan is rebuilt on drift.
+    """
+    # Columns we never keep: blank headers (fastexcel names them __UNNAMED__N)
+    IGNORED_PREFIXES = ("__UNNAMED__",)
+    # Only dtypes every cell converts to without loss are pinned: fastexcel turns a
+    # cell that doesn't fit a pinned float/int/date into null, silently.
+    PINNED_DTYPES = ("string",)
+    HEADER_SCAN_ROWS = 20
+
+    _plans = {}
+    _plan_by_source = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def clear_cache(cls):
+        with cls._lock:
+            cls._plans.clear()
+            cls._plan_by_source.clear()
+
+    @classmethod
+    def load(cls, raw_file_path, source_key=None):
+        """
+        Input: raw_file_path (.xlsx), source_key (hashable, e.g. (source_type, step))
+        Output: pyarrow.Table of the first sheet.
+        """
+        reader = fastexcel.read_excel(raw_file_path)
+
+        with cls._lock:
+            plan = cls._plans.get(cls._plan_by_source.get(source_key))
+
+        if plan is not None:
+            try:
+                sheet = reader.load_sheet(
+                    0,
+                    header_row=plan["header_row"],
+                    use_columns=lambda col: col.name in plan["columns"],
+                    dtypes=plan["dtypes"],
+                )
+                signature = tuple(col.name for col in sheet.available_columns())
+                if signature == plan["signature"]:
+                    return sheet.to_arrow()
+            except fastexcel.FastExcelError:
+                # Plan no longer fits this file (e.g. header row moved) -> fall back to inference
+                pass
+
+        sheet, header_row = cls._load_inferred(reader)
+        plan = cls._build_plan(sheet, header_row)
+        with cls._lock:
+            cls._plans[plan["signature"]] = plan
+            cls._plan_by_source[source_key] = plan["signature"]
+
+        table = sheet.to_arrow()
+        return table.select([name for name in table.column_names if name in plan["columns"]])
+
+    @classmethod
+    def _load_inferred(cls, reader):
+        """
+        Cache-miss path: lets fastexcel infer types. If row 0 is a title
+        banner rather than a header, scans for the first fully labelled row.
+        """
+        sheet = reader.load_sheet(0)
+        if not cls._is_blank_header(sheet.available_columns()):
+            return sheet, 0
+
+        preview = reader.load_sheet(0, header_row=None, n_rows=cls.HEADER_SCAN_ROWS).to_arrow()
+        widths = [
+            sum(1 for col in preview.columns if col[i].is_valid and str(col[i].as_py()).strip())
+            for i in range(preview.num_rows)
+        ]
+        if not widths or max(widths) == 0:
+            return sheet, 0
+        header_row = widths.index(max(widths))
+        return reader.load_sheet(0, header_row=header_row), header_row
+
+    @classmethod
+    def _is_blank_header(cls, columns):
+        unnamed = sum(1 for col in columns if col.name.startswith(cls.IGNORED_PREFIXES))
+        return len(columns) > 1 and unnamed * 2 > len(columns)
+
+    @classmethod
+    def _build_plan(cls, sheet, header_row):
+        available = sheet.available_columns()
+        columns = frozenset(
+            col.name for col in available if not col.name.startswith(cls.IGNORED_PREFIXES)
+        )
+        return {
+            "signature": tuple(col.name for col in available),
+            "header_row": header_row,
+            "columns": columns,
+            # Other columns keep per-file inference, so a drifted cell ('x' in a float
+            # column) widens the column instead of being nulled
+            "dtypes": {col.name: col.dtype for col in available
+                       if col.name in columns and col.dtype in cls.PINNED_DTYPES},
+        }
+
+
 class RawToSilverIngester:
     """
     The 'Stamping' Worker.
     Responsibility: Read Raw -> Add Metadata (Ingestion Time) -> Write Parquet.
     Constraint: Never overwrite, always append/create new file.
     """
+    # Small row groups keep single-SKU reads cheap (one ~2k-row group per file); SKU-sorted files make them selective
+    ROW_GROUP_SIZE = 2048
+    # Inputs at least this big skip eager reads and are sunk lazily (csv/parquet only)
+    STREAMING_THRESHOLD_BYTES = 256 * 1024 * 1024
+    # Lake-wide mutex file (under _meta) for sidecar updates
+    SIDECAR_LOCK_NAME = "sidecars.lock"
+    # Silver files whose sidecar update missed the lock, replayed by the next writer
+    PENDING_SIDECARS_DIR = "pending_sidecars"
+    LAZY_SCANNERS = {
+        '.csv': pl.scan_csv,
+        '.parquet': pl.scan_parquet,
+    }
+
     def __init__(self, logger=None):
         self.logger = logger or ETLLogger()
 
-    def ingest_file(self, raw_file_path, metadata_dict):
+    def ingest_file(self, raw_file_path, metadata_dict, streaming=None):
         """
         Args:
-            raw_file_path (str): Path to .xlsx or .csv
+            raw_file_path (str): Path to .xlsx, .csv or .parquet
             metadata_dict (dict): Context data (start_date, end_date, sku_prefix...)
                 - Must contain: 'end_date' (YYYY-MM-DD) for partitioning.
                 - Optional: 'base_dir' to override default storage.
+            streaming (bool|None): Out-of-core mode for .csv/.parquet inputs.
+                None = automatic, above STREAMING_THRESHOLD_BYTES.
         Returns:
             str: Path to the generated parquet file, or None if failed.
         """
@@ -91,23 +221,16 @@ class RawToSilverIngester:
                 self.logger.log_error("Ingest", raw_file_path, FileNotFoundError("File not found"))
                 return None
 
-            # --- STEP 1: READ DATA ---
-            # Determine logic based on extension
             file_ext = os.path.splitext(raw_file_path)[1].lower()
-            
-            if file_ext == '.xlsx':
-                # Use fastexcel for reading Excel
-                excel_reader = fastexcel.read_excel(raw_file_path)
-                arrow_table = excel_reader.load_sheet(0).to_arrow()
-                df = pl.from_arrow(arrow_table)
-            elif file_ext == '.csv':
-                df = pl.read_csv(raw_file_path)
-            else:
-                self.logger.log_error("Ingest", raw_file_path, ValueError(f"Unsupported format: {file_ext}"))
-                return None
+            if streaming is None:
+                streaming = os.path.getsize(raw_file_path) >= self.STREAMING_THRESHOLD_BYTES
+            if streaming and file_ext in self.LAZY_SCANNERS:
+                lf = self.LAZY_SCANNERS[file_ext](raw_file_path)
+                return self._stream_and_write(lf, metadata_dict, source_name=raw_file_path)
 
-            if df.height == 0:
-                self.logger.log_success("Ingest", raw_file_path, "Skipped empty file.")
+            # --- STEP 1: READ DATA ---
+            df = self._read_raw_file(raw_file_path, metadata_dict)
+            if df is None:
                 return None
 
             # Delegate to shared processing logic
@@ -117,52 +240,310 @@ class RawToSilverIngester:
             self.logger.log_error("Ingest", raw_file_path, e)
             return None
 
+    def ingest_files(self, jobs, max_workers=4):
+        """
+        Batch version of ingest_file for backfills.
+        Args:
+            jobs (list): [(raw_file_path, metadata_dict), ...]
+            max_workers (int): Parallel parsers. fastexcel releases the GIL while
+                parsing, so sheets are parsed in a thread pool; writes stay in
+                the calling thread, in job order.
+        Returns:
+            list: Output parquet path (or None) per job, in job order.
+        """
+        results = []
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            # Bounded window: at most max_workers parsed frames held in memory
+            pending = []
+            for job in jobs:
+                pending.append((job, pool.submit(self._read_raw_file_safe, *job)))
+                if len(pending) >= max_workers:
+                    results.append(self._write_parsed(*pending.pop(0)))
+            while pending:
+                results.append(self._write_parsed(*pending.pop(0)))
+        return results
+
+    def ingest_pages(self, raw_file_paths, metadata_dict):
+        """
+        Scenario: One export downloaded in several pages.
+        All pages land as ONE silver file (one ingestion), so the harvest planner,
+        CDC and read-time dedup see a single harvest of the range.
+        Returns:
+            str: Path to the generated parquet file, or None if any page failed
+            (a partial harvest would look like deleted rows).
+        """
+        frames = [self._read_raw_file_safe(p, metadata_dict) for p in raw_file_paths]
+        if not frames or any(df is None for df in frames):
+            return None
+        # Pages may disagree on dtypes (e.g. an all-empty column on the last page)
+        df = pl.concat(frames, how="diagonal_relaxed")
+        return self._process_and_write(df, metadata_dict, source_name=raw_file_paths[0])
+
+    def _read_raw_file_safe(self, raw_file_path, metadata_dict):
+        try:
+            if not os.path.exists(raw_file_path):
+                self.logger.log_error("Ingest", raw_file_path, FileNotFoundError("File not found"))
+                return None
+            return self._read_raw_file(raw_file_path, metadata_dict)
+        except Exception as e:
+            self.logger.log_error("Ingest", raw_file_path, e)
+            return None
+
+    def _write_parsed(self, job, future):
+        raw_file_path, metadata_dict = job
+        df = future.result()
+        if df is None:
+            return None
+        return self._process_and_write(df, metadata_dict, source_name=raw_file_path)
+
+    def _read_raw_file(self, raw_file_path, metadata_dict):
+        """
+        Reads a raw export into a DataFrame.
+        Returns None (and logs) for unsupported or empty files.
+        """
+        # Determine logic based on extension
+        file_ext = os.path.splitext(raw_file_path)[1].lower()
+
+        if file_ext == '.xlsx':
+            # fastexcel with a cached parse plan (projection + explicit dtypes)
+            source_key = (metadata_dict.get("source_type"), metadata_dict.get("step"))
+            df = pl.from_arrow(ExcelParsePlanner.load(raw_file_path, source_key))
+        elif file_ext == '.csv':
+            df = pl.read_csv(raw_file_path)
+        elif file_ext == '.parquet':
+            df = pl.read_parquet(raw_file_path)
+        else:
+            self.logger.log_error("Ingest", raw_file_path, ValueError(f"Unsupported format: {file_ext}"))
+            return None
+
+        if df.height == 0:
+            self.logger.log_success("Ingest", raw_file_path, "Skipped empty file.")
+            return None
+
+        return df
+
     def _process_and_write(self, df, metadata_dict, source_name="unknown"):
         """
         Internal method: Stamps -> Partitions -> Writes.
         Used by both file ingestion and memory ingestion.
         """
+        tmp_path = None
         try:
             # --- STEP 2: STAMPING (METADATA INJECTION) ---
-            # 1. Ingestion Time (The Source of Truth)
-            ingestion_ts = datetime.now().isoformat()
-            df = df.with_columns(pl.lit(ingestion_ts).alias("ingestion_time"))
-
-            # 2. Business Metadata (Start Date, End Date...)
-            if "start_date" in metadata_dict:
-                 df = df.with_columns(pl.lit(metadata_dict["start_date"]).alias("Date_Start"))
-            if "end_date" in metadata_dict:
-                 df = df.with_columns(pl.lit(metadata_dict["end_date"]).alias("Date_End"))
-                 df = df.with_columns(pl.lit(metadata_dict["end_date"]).alias("Report_Date"))
-
-            # --- STEP 3: PARTITIONING ---
-            end_date_str = metadata_dict.get("end_date", datetime.now().strftime("%Y-%m-%d"))
-            try:
-                date_obj = datetime.strptime(end_date_str, "%Y-%m-%d")
-            except ValueError:
-                date_obj = datetime.now()
+            df = df.with_columns(self._stamp_expressions(metadata_dict))
 
-            base_dir = metadata_dict.get("base_dir", SILVER_DATA_DIR)
-            target_dir = PartitionManager.ensure_partition_exists(base_dir, date_obj)
-
-            # --- STEP 4: NAMING STRATEGY ---
-            start = metadata_dict.get("start_date", "unknown")
-            end = metadata_dict.get("end_date", "unknown")
-            safe_ts = datetime.now().strftime("%Y%m%d%H%M%S%f")
-            
-            filename = f"ppc_{start}_{end}_ingest_{safe_ts}.parquet"
-            output_path = os.path.join(target_dir, filename)
+            # --- STEP 3 & 4: PARTITIONING + NAMING ---
+            output_path = self._resolve_output_path(metadata_dict)
 
             # --- STEP 5: WRITE ---
-            df.write_parquet(output_path, compression="zstd")
+            # Clustered by SKU with per-row-group stats so point lookups can skip row groups
+            if "SKU" in df.columns:
+                df = df.sort("SKU")
+            # Temp name + rename: other nodes reading the shared lake never see a half-written file
+            tmp_path = output_path + ".tmp"
+            df.write_parquet(
+                tmp_path, compression="zstd", statistics=True, row_group_size=self.ROW_GROUP_SIZE
+            )
+            os.replace(tmp_path, output_path)
+            tmp_path = None
             
             self.logger.log_success("Ingest", source_name, f"Successfully stamped and saved to {output_path}")
+            self._after_write(output_path, metadata_dict, source_name)
             return output_path
             
         except Exception as e:
+            self._discard_tmp(tmp_path)
             self.logger.log_error("Process & Write", source_name, e)
             return None
 
+    def _stream_and_write(self, lf, metadata_dict, source_name="unknown"):
+        """
+        Out-of-core twin of _process_and_write.
+        Stamping stays lazy and the plan is sunk straight into the partition,
+        so peak memory is bounded by Polars' streaming batches, not the input.
+        """
+        tmp_path = None
+        try:
+            # No SKU sort here: a global sort buffers the whole input and defeats streaming.
+            # Files keep input order; the SKU index still maps each SKU to its row groups.
+            lf = lf.with_columns(self._stamp_expressions(metadata_dict))
+            output_path = self._resolve_output_path(metadata_dict)
+
+            # Sink under a temp name: readers globbing *.parquet never see a half-written file
+            tmp_path = output_path + ".tmp"
+            lf.sink_parquet(
+                tmp_path, compression="zstd", statistics=True, row_group_size=self.ROW_GROUP_SIZE
+            )
+
+            if pq.ParquetFile(tmp_path).metadata.num_rows == 0:
+                os.remove(tmp_path)
+                self.logger.log_success("Ingest", source_name, "Skipped empty file.")
+                return None
+
+            os.replace(tmp_path, output_path)
+            tmp_path = None
+            self.logger.log_success("Ingest", source_name, f"Successfully streamed and saved to {output_path}")
+            self._after_write(output_path, metadata_dict, source_name)
+            return output_path
+
+        except Exception as e:
+            self._discard_tmp(tmp_path)
+            self.logger.log_error("Stream & Write", source_name, e)
+            return None
+
+    def _after_write(self, output_path, metadata_dict, source_name="unknown"):
+        """
+        Keeps lake sidecars in sync with a newly landed file.
+        The parquet file is the source of truth: a sidecar failure is logged,
+        never turned into a failed ingestion (sidecars can be rebuilt).
+        On a lock timeout the file is queued under _meta/pending_sidecars and picked
+        up by the next writer (or catch_up_sidecars()); the partition version is
+        bumped right away so cached reads never outlive the new file.
+        """
+        base_dir = metadata_dict.get("base_dir", SILVER_DATA_DIR)
+        # Several harvester nodes may land files at once: sidecar read-modify-writes are serialized lake-wide
+        try:
+            with FileLock(os.path.join(meta_dir(base_dir), self.SIDECAR_LOCK_NAME)):
+                self._drain_pending_sidecars(base_dir)
+                self._update_sidecars(base_dir, output_path, source_name)
+        except TimeoutError as e:
+            self.logger.log_error("Sidecar Lock", source_name, e)
+            self._queue_pending_sidecars(base_dir, output_path)
+            try:
+                LakeVersion(base_dir).bump(partition_month(output_path))
+            except Exception as e:
+                self.logger.log_error("Lake Version", source_name, e)
+
+    def catch_up_sidecars(self, base_dir=None):
+        """
+        Scenario: Sidecar lock timed out and no ingestion followed yet.
+        Applies the queued sidecar updates now.
+        Output: Number of silver files caught up.
+        """
+        base_dir = base_dir or SILVER_DATA_DIR
+        with FileLock(os.path.join(meta_dir(base_dir), self.SIDECAR_LOCK_NAME)):
+            return self._drain_pending_sidecars(base_dir)
+
+    def rebuild_sidecars(self, base_dir=None):
+        """
+        Scenario: Silver files landed without the ingester (gen_big_data, manual copy, restore).
+        Rebuilds the SKU index, rollups and CDC from the whole lake, then bumps every
+        partition so cached query results are recomputed. Meant for offline use: the
+        sidecar lock is held throughout, concurrent ingestions queue their updates.
+        Output: Partition months bumped.
+        """
+        base_dir = base_dir or SILVER_DATA_DIR
+        with FileLock(os.path.join(meta_dir(base_dir), self.SIDECAR_LOCK_NAME)):
+            # The full rebuild covers whatever was queued
+            for marker in glob.glob(os.path.join(meta_dir(base_dir, self.PENDING_SIDECARS_DIR), "*.pending")):
+                os.remove(marker)
+            SkuIndex(base_dir).rebuild()
+            bumped = set(RollupStore(base_dir).rebuild())
+            ChangeCapture(base_dir).rebuild()
+            months = {partition_month(p) for p in list_partition_files(base_dir)}
+            versions = LakeVersion(base_dir)
+            for month in sorted(months - bumped):
+                versions.bump(month)
+            return sorted(months | bumped)
+
+    def _queue_pending_sidecars(self, base_dir, output_path):
+        # One marker per file: created without the lock, names never collide
+        relative_path = os.path.relpath(output_path, base_dir)
+        marker = os.path.join(meta_dir(base_dir, self.PENDING_SIDECARS_DIR),
+                              relative_path.replace(os.sep, "__") + ".pending")
+        with open(marker, "w") as f:
+            f.write(relative_path)
+
+    def _drain_pending_sidecars(self, base_dir):
+        """Caller holds the sidecar lock. Oldest queued file first."""
+        done = 0
+        for marker in sorted(glob.glob(os.path.join(meta_dir(base_dir, self.PENDING_SIDECARS_DIR), "*.pending"))):
+            with open(marker) as f:
+                silver_path = os.path.join(base_dir, f.read().strip())
+            if os.path.exists(silver_path):
+                self._update_sidecars(base_dir, silver_path, silver_path)
+                done += 1
+            os.remove(marker)
+        return done
+
+    def _update_sidecars(self, base_dir, output_path, source_name):
+        try:
+            SkuIndex(base_dir).update(output_path)
+        except Exception as e:
+            self.logger.log_error("Index SKU", source_name, e)
+        try:
+            RollupStore(base_dir).update(output_path)
+        except Exception as e:
+            self.logger.log_error("Rollup", source_name, e)
+        try:
+            ChangeCapture(base_dir).capture(output_path)
+        except Exception as e:
+            self.logger.log_error("CDC", source_name, e)
+        # Last: cached query results over this partition become stale only once sidecars are current
+        try:
+            LakeVersion(base_dir).bump(partition_month(output_path))
+        except Exception as e:
+            self.logger.log_error("Lake Version", source_name, e)
+
+    @staticmethod
+    def _stamp_expressions(metadata_dict):
+        """
+        Returns the metadata columns as Polars expressions, usable on both
+        DataFrames and LazyFrames.
+        """
+        # 1. Ingestion Time (The Source of Truth)
+        ingestion_ts = datetime.now().isoformat()
+        exprs = [pl.lit(ingestion_ts).alias("ingestion_time")]
+
+        # 2. Business Metadata (Start Date, End Date...)
+        if "start_date" in metadata_dict:
+            exprs.append(pl.lit(metadata_dict["start_date"]).alias("Date_Start"))
+        if "end_date" in metadata_dict:
+            exprs.append(pl.lit(metadata_dict["end_date"]).alias("Date_End"))
+            exprs.append(pl.lit(metadata_dict["end_date"]).alias("Report_Date"))
+        return exprs
+
+    @staticmethod
+    def _resolve_output_path(metadata_dict):
+        """
+        Partition folder (by end_date) + unique file name for one ingestion.
+        Also reserves '<path>.tmp' (empty): the caller writes there, then renames.
+        """
+        end_date_str = metadata_dict.get("end_date", datetime.now().strftime("%Y-%m-%d"))
+        try:
+            date_obj = datetime.strptime(end_date_str, "%Y-%m-%d")
+        except ValueError:
+            date_obj = datetime.now()
+
+        base_dir = metadata_dict.get("base_dir", SILVER_DATA_DIR)
+        target_dir = PartitionManager.ensure_partition_exists(base_dir, date_obj)
+
+        start = metadata_dict.get("start_date", "unknown")
+        end = metadata_dict.get("end_date", "unknown")
+        while True:
+            safe_ts = datetime.now().strftime("%Y%m%d%H%M%S%f")
+            filename = f"ppc_{start}_{end}_ingest_{safe_ts}.parquet"
+            output_path = os.path.join(target_dir, filename)
+            # Reserve the temp name atomically: the same range ingested in the same
+            # microsecond by another thread/node must never overwrite this file
+            try:
+                open(output_path + ".tmp", "x").close()
+            except FileExistsError:
+                continue
+            if os.path.exists(output_path):
+                os.remove(output_path + ".tmp")
+                continue
+            return output_path
+
+    @staticmethod
+    def _discard_tmp(tmp_path):
+        """
+        Removes the reserved/half-written '<path>.tmp' of a failed write,
+        so failures don't leave orphan temp files in the partition.
+        """
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
     def ingest_from_folder(self, folder_path, pattern="*", metadata_dict=None):
         """
         [SKELETON] Scenario: Backfill from Local Dump.
@@ -0,0 +1,203 @@
+import os
+import json
+import glob
+import hashlib
+import threading
+from collections import OrderedDict
+
+import polars as pl
+import pyarrow as pa
+
+from lake_layout import meta_dir
+
+
+class LakeVersion:
+    """
+    Monotonic write counter per partition (YYYY-MM).
+    Philosophy: A write only invalidates what it could have changed.
+
+    Stored as a small JSON file in <base_dir>/_meta; bumped by the ingester
+    after each silver file lands.
+    """
+    _lock = threading.Lock()
+
+    def __init__(self, base_dir):
+        self.path = os.path.join(meta_dir(base_dir), "lake_version.json")
+
+    def bump(self, partition):
+        """
+        Input: partition key 'YYYY-MM'
+        Output: New version number of that partition.
+        """
+        with self._lock:
+            versions = self.read()
+            versions[partition] = versions.get(partition, 0) + 1
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(versions, f, sort_keys=True)
+            os.replace(tmp_path, self.path)
+            return versions[partition]
+
+    def read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def snapshot(self, partitions):
+        """Versions of the given partitions, as a dict (missing -> 0)."""
+        versions = self.read()
+        return {p: versions.get(p, 0) for p in sorted(partitions)}
+
+
+class QueryCache:
+    """
+    Result cache for lake queries.
+    Philosophy: Key = normalized query, validity = lake versions it read.
+
+    - Memory tier: LRU bounded by estimated bytes.
+    - Disk tier (optional): Arrow IPC files, memory-mapped on read, so a
+      restarted API worker starts warm.
+    An entry is served only while every partition it depends on still has
+    the version recorded at compute time.
+    """
+    # Params whose order carries no meaning are sorted before hashing
+    UNORDERED_PARAMS = ("skus",)
+
+    def __init__(self, base_dir, max_bytes=256 * 1024 * 1024, disk_dir=None, max_disk_bytes=2 * 1024 ** 3):
+        self.versions = LakeVersion(base_dir)
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+        self._entries = OrderedDict()  # key -> (df, versions, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def normalize_params(cls, params):
+        normalized = {}
+        for name, value in params.items():
+            if value is None:
+                continue
+            if isinstance(value, (list, tuple, set)):
+                value = [str(v) for v in value]
+                if name in cls.UNORDERED_PARAMS or isinstance(value, set):
+                    value = sorted(set(value))
+            normalized[name] = value
+        return normalized
+
+    def make_key(self, query_name, params):
+        payload = json.dumps([query_name, self.normalize_params(params)], sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def get_or_compute(self, query_name, params, partitions, compute_fn):
+        """
+        Args:
+            query_name (str): Logical query (e.g. 'read_range', 'rollup').
+            params (dict): Query parameters (normalized before hashing).
+            partitions (iterable): Partition keys (YYYY-MM) the query reads.
+            compute_fn (callable): Produces the pl.DataFrame on a miss.
+        Returns:
+            pl.DataFrame
+        """
+        key = self.make_key(query_name, params)
+        current = self.versions.snapshot(partitions)
+
+        df = self._get_memory(key, current)
+        if df is None and self.disk_dir:
+            df = self._get_disk(key, current)
+            if df is not None:
+                self._put_memory(key, df, current)
+        if df is not None:
+            self.hits += 1
+            return df
+
+        self.misses += 1
+        df = compute_fn()
+        self._put_memory(key, df, current)
+        if self.disk_dir:
+            self._put_disk(key, df, current)
+        return df
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.disk_dir:
+            for path in glob.glob(os.path.join(self.disk_dir, "*.arrow")):
+                os.remove(path)
+
+    # --- MEMORY TIER ---
+
+    def _get_memory(self, key, current):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            df, versions, size = entry
+            if versions != current:
+                # Stale: a partition it read has been written since
+                del self._entries[key]
+                self._bytes -= size
+                return None
+            self._entries.move_to_end(key)
+            return df
+
+    def _put_memory(self, key, df, versions):
+        size = df.estimated_size()
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (df, versions, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    # --- DISK TIER ---
+
+    def _get_disk(self, key, current):
+        path = os.path.join(self.disk_dir, f"{key}.arrow")
+        try:
+            with pa.memory_map(path) as source:
+                table = pa.ipc.open_file(source).read_all()
+        except (FileNotFoundError, pa.ArrowInvalid):
+            return None
+
+        metadata = table.schema.metadata or {}
+        versions = json.loads(metadata.get(b"lake_versions", b"null"))
+        if versions != current:
+            os.remove(path)
+            return None
+        os.utime(path)  # LRU order on disk = mtime
+        return pl.from_arrow(table.replace_schema_metadata(None))
+
+    def _put_disk(self, key, df, versions):
+        table = df.to_arrow()
+        table = table.replace_schema_metadata({"lake_versions": json.dumps(versions, sort_keys=True)})
+        path = os.path.join(self.disk_dir, f"{key}.arrow")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+        self._evict_disk()
+
+    def _evict_disk(self):
+        files = [(os.path.getmtime(p), os.path.getsize(p), p)
+                 for p in glob.glob(os.path.join(self.disk_dir, "*.arrow"))]
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            os.remove(path)
+            total -= size
@@ -0,0 +1,214 @@
+import os
+import glob
+from itertools import groupby
+
+import polars as pl
+import pyarrow.parquet as pq
+
+from lake_layout import meta_dir, list_partition_files, partition_month, ingestion_time_utc
+from query_cache import LakeVersion
+
+
+class RollupStore:
+    """
+    Pre-aggregated SKU metrics by day / week / month.
+    Philosophy: Dedup once at write time, so reports never touch raw rows.
+
+    Layout (under <base_dir>/_meta/rollups):
+        daily/YYYY-MM.parquet   one row per (SKU, Report_Date): latest ingestion wins
+        week/YYYY.parquet       sums per (SKU, week starting Monday)
+        month/YYYY.parquet      sums per (SKU, month)
+    An ingestion only rewrites the daily months, weeks and months it touched.
+    Only single-day ingestions (Date_Start == Date_End) are rolled up: a month/total
+    export is one figure per SKU for the whole range, not a day's worth.
+    """
+    METRICS = ["Revenue (Actual)", "Ads Spend (Actual)", "Unit sold (Actual)"]
+    KEYS = ["SKU", "Report_Date"]
+    PERIODS = {"week": "1w", "month": "1mo"}
+
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        self.root = meta_dir(base_dir, "rollups")
+
+    # --- WRITE SIDE ---
+
+    def update(self, parquet_path):
+        """
+        Input: path of a freshly written silver file.
+        Action: Merges it into the daily rollup (latest ingestion_time per key),
+                then recomputes the touched weeks and months.
+        Output: Number of (SKU, Report_Date) keys touched.
+        """
+        daily_new = self._daily_from_file(parquet_path)
+        if daily_new is None or daily_new.height == 0:
+            return 0
+        self._merge_daily(daily_new)
+        self._refresh_periods(daily_new["Report_Date"].unique().to_list())
+        return daily_new.height
+
+    def rebuild(self):
+        """
+        Recomputes every rollup from the whole lake, one partition month at a time
+        (memory is bounded by a month of daily keys, not the lake).
+        Output: Months rebuilt or dropped; their lake version is bumped so cached
+        rollup answers are not served from the old tables.
+        """
+        months = {os.path.basename(p)[:7] for p in glob.glob(os.path.join(self.root, "daily", "*.parquet"))}
+        for path in glob.glob(os.path.join(self.root, "*", "*.parquet")):
+            os.remove(path)
+        # Sorted paths: each YYYY/MM folder is one contiguous group
+        for month, paths in groupby(list_partition_files(self.base_dir), key=partition_month):
+            frames = [f for f in (self._daily_from_file(p) for p in paths) if f is not None and f.height]
+            if not frames:
+                continue
+            daily_new = pl.concat(frames)
+            self._merge_daily(daily_new)
+            # Weeks straddling the month end are recomputed again with the next month
+            self._refresh_periods(daily_new["Report_Date"].unique().to_list())
+            months.add(month)
+
+        versions = LakeVersion(self.base_dir)
+        for month in sorted(months):
+            versions.bump(month)
+        return sorted(months)
+
+    def _daily_from_file(self, parquet_path):
+        available = pq.ParquetFile(parquet_path).schema_arrow.names
+        if not all(c in available for c in self.KEYS + ["ingestion_time"]):
+            return None
+
+        metrics = [
+            (pl.col(m).cast(pl.Float64, strict=False) if m in available else pl.lit(None, dtype=pl.Float64)).alias(m)
+            for m in self.METRICS
+        ]
+        lf = pl.scan_parquet(parquet_path)
+        if "Date_Start" in available and "Date_End" in available:
+            # Multi-day ranges (step=month/total) would be booked on Report_Date = end date
+            lf = lf.filter(pl.col("Date_Start").cast(pl.String) == pl.col("Date_End").cast(pl.String))
+        return (
+            lf
+            .select([pl.col("SKU").cast(pl.String), pl.col("Report_Date").cast(pl.String),
+                     pl.col("ingestion_time").cast(pl.String)] + metrics)
+            .group_by(self.KEYS)
+            .agg([pl.col("ingestion_time").sort_by(ingestion_time_utc()).last()] + [pl.col(m).sum() for m in self.METRICS])
+            .collect()
+        )
+
+    def _merge_daily(self, daily_new):
+        daily_new = daily_new.with_columns(pl.col("Report_Date").str.slice(0, 7).alias("_month"))
+        for (month,), part in daily_new.group_by(["_month"]):
+            path = os.path.join(meta_dir(self.base_dir, "rollups", "daily"), f"{month}.parquet")
+            part = part.drop("_month")
+            if os.path.exists(path):
+                part = pl.concat([pl.read_parquet(path), part])
+            # Stamps may carry different offsets: order by instant, not by text
+            merged = (
+                part.sort(ingestion_time_utc(), maintain_order=True)
+                .unique(subset=self.KEYS, keep="last")
+                .sort(self.KEYS)
+            )
+            self._atomic_write(merged, path)
+
+    def _refresh_periods(self, report_dates):
+        dates = pl.Series("Report_Date", report_dates).str.to_date()
+        for granularity, every in self.PERIODS.items():
+            periods = dates.dt.truncate(every).unique().sort()
+            # Daily months needed to cover every touched period in full
+            first, last = periods.min(), periods.max()
+            span_end = pl.Series([last]).dt.offset_by(every).dt.offset_by("-1d")[0]
+            daily = self._scan_daily(first.isoformat(), span_end.isoformat())
+            if daily is None:
+                continue
+            fresh = (
+                self._aggregate(daily, granularity)
+                .filter(pl.col("period").is_in(periods.implode()))
+                .collect()
+            )
+            fresh = fresh.with_columns(pl.col("period").dt.year().alias("_year"))
+            for (year,), part in fresh.group_by(["_year"]):
+                path = os.path.join(meta_dir(self.base_dir, "rollups", granularity), f"{year}.parquet")
+                part = part.drop("_year")
+                if os.path.exists(path):
+                    kept = pl.read_parquet(path).filter(~pl.col("period").is_in(periods.implode()))
+                    part = pl.concat([kept, part])
+                self._atomic_write(part.sort(["period", "SKU"]), path)
+
+    @staticmethod
+    def _atomic_write(df, path):
+        df.write_parquet(path + ".tmp", statistics=True)
+        os.replace(path + ".tmp", path)
+
+    # --- READ SIDE ---
+
+    def _scan_daily(self, start_date, end_date):
+        paths = sorted(glob.glob(os.path.join(self.root, "daily", "*.parquet")))
+        paths = [p for p in paths if start_date[:7] <= os.path.basename(p)[:7] <= end_date[:7]]
+        if not paths:
+            return None
+        return pl.scan_parquet(paths).filter(pl.col("Report_Date").is_between(pl.lit(start_date), pl.lit(end_date)))
+
+    def _aggregate(self, lf, granularity):
+        every = self.PERIODS[granularity]
+        return (
+            lf.with_columns(pl.col("Report_Date").str.to_date().dt.truncate(every).alias("period"))
+            .group_by(["SKU", "period"])
+            .agg([pl.col(m).sum() for m in self.METRICS])
+        )
+
+    def query(self, start_date, end_date, granularity="week", skus=None):
+        """
+        Scenario: Dashboard / AI analysis report.
+        Args:
+            start_date, end_date (str): YYYY-MM-DD, inclusive.
+            granularity (str): 'day', 'week' or 'month'.
+            skus (list): Optional SKU filter.
+        Returns:
+            pl.DataFrame [SKU, period, metrics..., ROAS]. Answered from the week/month
+            tables when the range covers whole periods, otherwise from the daily rollup
+            (partial first/last periods only count the requested days).
+        """
+        if granularity == "day":
+            lf = self._scan_daily(start_date, end_date)
+            if lf is None:
+                return pl.DataFrame()
+            lf = lf.select(["SKU", pl.col("Report_Date").str.to_date().alias("period")] + self.METRICS)
+        elif granularity in self.PERIODS:
+            lf = self._scan_period_table(start_date, end_date, granularity)
+            if lf is None:
+                lf = self._scan_daily(start_date, end_date)
+                if lf is None:
+                    return pl.DataFrame()
+                lf = self._aggregate(lf, granularity)
+        else:
+            raise ValueError(f"Unsupported granularity: {granularity}")
+
+        if skus:
+            lf = lf.filter(pl.col("SKU").is_in(list(skus)))
+
+        revenue, spend = self.METRICS[0], self.METRICS[1]
+        return (
+            lf.with_columns(
+                pl.when(pl.col(spend) != 0).then(pl.col(revenue) / pl.col(spend)).otherwise(0.0)
+                .round(2).alias("ROAS")
+            )
+            .sort(["period", "SKU"])
+            .collect()
+        )
+
+    def _scan_period_table(self, start_date, end_date, granularity):
+        """Rollup table scan, or None when the range does not cover whole periods."""
+        every = self.PERIODS[granularity]
+        bounds = pl.Series([start_date, end_date]).str.to_date()
+        first = bounds.dt.truncate(every)[0]
+        last_end = pl.Series([bounds.dt.truncate(every)[1]]).dt.offset_by(every).dt.offset_by("-1d")[0]
+        if bounds[0] != first or bounds[1] != last_end:
+            return None
+
+        paths = [
+            os.path.join(self.root, granularity, f"{year}.parquet")
+            for year in range(first.year, bounds[1].year + 1)
+        ]
+        paths = [p for p in paths if os.path.exists(p)]
+        if not paths:
+            return None
+        return pl.scan_parquet(paths).filter(pl.col("period").is_between(bounds[0], bounds[1]))
@@ -0,0 +1,381 @@
+import os
+import re
+import json
+import hashlib
+import argparse
+import threading
+
+import fastexcel
+import polars as pl
+
+import config
+
+RULES_WORKBOOK = "../notes/RULE LẤY DỮ LIỆU PPC TOOL (FBA&FBM&KDP).xlsx"
+
+# Header aliases accepted in the rules sheet (English / Vietnamese)
+RULE_COLUMNS = {
+    "output": ["Output", "Field", "Trường", "Cột"],
+    "condition": ["Condition", "Rule", "Điều kiện"],
+    "value": ["Value", "Result", "Giá trị", "Kết quả"],
+    "mode": ["Mode", "Cách tính"],
+    "order": ["Order", "Thứ tự"],
+}
+
+
+class RuleSyntaxError(ValueError):
+    pass
+
+
+class ExpressionParser:
+    """
+    Compiles one rule cell into a Polars expression.
+    Philosophy: A tiny safe grammar, never eval().
+
+    Grammar (case-insensitive keywords):
+        expr    := or
+        or      := and (OR and)*
+        and     := not (AND not)*
+        not     := NOT not | compare
+        compare := sum ((= | == | != | <> | < | <= | > | >=) sum
+                        | IS [NOT] NULL | [NOT] IN (literal, ...))?
+        sum     := term ((+ | -) term)*
+        term    := unary ((* | /) unary)*
+        unary   := - unary | atom
+        atom    := number | 'text' | "text" | column | [Column Name] | ( expr )
+    """
+    TOKEN_RE = re.compile(r"""
+        \s*(?:
+            (?P<number>\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+          | (?P<string>'[^']*'|"[^"]*")
+          | (?P<bracket>\[[^\]]+\])
+          | (?P<op><=|>=|!=|<>|==|=|<|>|\+|-|\*|/|\(|\)|,)
+          | (?P<word>[A-Za-z_][A-Za-z0-9_.%]*)
+        )""", re.VERBOSE)
+    KEYWORDS = {"AND", "OR", "NOT", "IS", "NULL", "IN", "TRUE", "FALSE"}
+    COMPARATORS = {
+        "=": "__eq__", "==": "__eq__", "!=": "__ne__", "<>": "__ne__",
+        "<": "__lt__", "<=": "__le__", ">": "__gt__", ">=": "__ge__",
+    }
+
+    def __init__(self, text, columns):
+        self.text = str(text)
+        self.columns = list(columns)
+        self.tokens = self._tokenize(self.text)
+        self.pos = 0
+
+    @classmethod
+    def compile(cls, text, columns):
+        parser = cls(text, columns)
+        expr = parser._or()
+        if parser.pos != len(parser.tokens):
+            raise RuleSyntaxError(f"Unexpected '{parser.tokens[parser.pos][1]}' in rule: {text}")
+        return expr
+
+    def _tokenize(self, text):
+        tokens, pos = [], 0
+        text = text.strip()
+        while pos < len(text):
+            match = self.TOKEN_RE.match(text, pos)
+            if not match or match.end() == pos:
+                raise RuleSyntaxError(f"Cannot parse rule near '{text[pos:pos + 15]}': {text}")
+            kind = match.lastgroup
+            value = match.group(kind)
+            if kind == "word" and value.upper() in self.KEYWORDS:
+                kind, value = "kw", value.upper()
+            tokens.append((kind, value))
+            pos = match.end()
+        return tokens
+
+    def _peek(self, kind=None, value=None):
+        if self.pos >= len(self.tokens):
+            return False
+        tok_kind, tok_value = self.tokens[self.pos]
+        return (kind is None or tok_kind == kind) and (value is None or tok_value == value)
+
+    def _take(self, kind=None, value=None):
+        if not self._peek(kind, value):
+            found = self.tokens[self.pos][1] if self.pos < len(self.tokens) else "end of rule"
+            raise RuleSyntaxError(f"Expected {value or kind}, found '{found}' in rule: {self.text}")
+        self.pos += 1
+        return self.tokens[self.pos - 1][1]
+
+    def _or(self):
+        expr = self._and()
+        while self._peek("kw", "OR"):
+            self._take()
+            expr = expr | self._and()
+        return expr
+
+    def _and(self):
+        expr = self._not()
+        while self._peek("kw", "AND"):
+            self._take()
+            expr = expr & self._not()
+        return expr
+
+    def _not(self):
+        if self._peek("kw", "NOT"):
+            self._take()
+            return ~self._not()
+        return self._compare()
+
+    def _compare(self):
+        left = self._sum()
+        if self._peek("op") and self.tokens[self.pos][1] in self.COMPARATORS:
+            method = self.COMPARATORS[self._take()]
+            return getattr(left, method)(self._sum())
+        if self._peek("kw", "IS"):
+            self._take()
+            negate = self._peek("kw", "NOT") and self._take()
+            self._take("kw", "NULL")
+            return left.is_not_null() if negate else left.is_null()
+        negate = False
+        if self._peek("kw", "NOT") and self.pos + 1 < len(self.tokens) and self.tokens[self.pos + 1] == ("kw", "IN"):
+            self._take()
+            negate = True
+        if self._peek("kw", "IN"):
+            self._take()
+            self._take("op", "(")
+            values = [self._literal()]
+            while self._peek("op", ","):
+                self._take()
+                values.append(self._literal())
+            self._take("op", ")")
+            expr = left.is_in(values)
+            return ~expr if negate else expr
+        return left
+
+    def _sum(self):
+        expr = self._term()
+        while self._peek("op", "+") or self._peek("op", "-"):
+            expr = expr + self._term() if self._take() == "+" else expr - self._term()
+        return expr
+
+    def _term(self):
+        expr = self._unary()
+        while self._peek("op", "*") or self._peek("op", "/"):
+            expr = expr * self._unary() if self._take() == "*" else expr / self._unary()
+        return expr
+
+    def _unary(self):
+        if self._peek("op", "-"):
+            self._take()
+            return -self._unary()
+        return self._atom()
+
+    def _atom(self):
+        if self._peek("op", "("):
+            self._take()
+            expr = self._or()
+            self._take("op", ")")
+            return expr
+        if self._peek("word") or self._peek("bracket"):
+            return pl.col(self._resolve_column(self._take()))
+        return pl.lit(self._literal())
+
+    def _literal(self):
+        if self._peek("number"):
+            value = self._take()
+            return float(value) if any(c in value for c in ".eE") else int(value)
+        if self._peek("string"):
+            return self._take()[1:-1]
+        if self._peek("kw", "TRUE") or self._peek("kw", "FALSE"):
+            return self._take() == "TRUE"
+        if self._peek("op", "-"):
+            self._take()
+            return -self._literal()
+        found = self.tokens[self.pos][1] if self.pos < len(self.tokens) else "end of rule"
+        raise RuleSyntaxError(f"Expected a value, found '{found}' in rule: {self.text}")
+
+    def _resolve_column(self, name):
+        name = name[1:-1] if name.startswith("[") else name
+        if name in self.columns:
+            return name
+        matches = [c for c in self.columns if c.lower() == name.lower()]
+        if len(matches) == 1:
+            return matches[0]
+        raise RuleSyntaxError(f"Unknown column '{name}' in rule: {self.text}")
+
+
+class RuleEngine:
+    """
+    Vectorized PPC rule engine compiled from the rules workbook.
+    Philosophy: Parse the workbook once, compile once per schema, evaluate in bulk.
+
+    Rules sheet layout (one row per rule; see RULE_COLUMNS for header aliases):
+        Output     target column (priorityScore, hint, listingScore, phase...)
+        Condition  e.g. `ROAS >= 3 AND [Revenue (Actual)] > 1000`; empty / ELSE = default
+        Value      literal result, or `=expression` (e.g. `=[Revenue (Actual)] / 100`)
+        Mode       'first' (default): first matching rule wins, by Order
+                   'sum': add the Value of every matching rule (score cards)
+        Order      evaluation order within an Output (optional, sheet order otherwise)
+    """
+    _compiled = {}
+    _lock = threading.Lock()
+
+    def __init__(self, rules, digest=None):
+        self.rules = rules
+        self.digest = digest or hashlib.sha1(json.dumps(rules, sort_keys=True, default=str).encode()).hexdigest()
+
+    # --- PARSE (once per workbook content) ---
+
+    @classmethod
+    def from_workbook(cls, workbook_path=RULES_WORKBOOK, cache_dir=None):
+        """
+        Reads every sheet that looks like a rules table.
+        The parsed rules are cached as JSON keyed by the workbook's content hash,
+        so later runs never open the Excel file again until it changes.
+        """
+        with open(workbook_path, "rb") as f:
+            digest = hashlib.sha1(f.read()).hexdigest()
+
+        cache_dir = cache_dir or os.path.join(config.OUTPUT_DIR, "rule_cache")
+        cache_path = os.path.join(cache_dir, f"{digest}.json")
+        if os.path.exists(cache_path):
+            with open(cache_path, encoding="utf-8") as f:
+                return cls(json.load(f), digest=digest)
+
+        rules = []
+        reader = fastexcel.read_excel(workbook_path)
+        for sheet_name in reader.sheet_names:
+            rows = pl.from_arrow(reader.load_sheet(sheet_name).to_arrow()).to_dicts()
+            rules.extend(cls._rules_from_rows(rows, sheet_name))
+        if not rules:
+            raise ValueError(f"No rules table found in {workbook_path} (expected columns: "
+                             f"{', '.join(v[0] for v in RULE_COLUMNS.values())})")
+
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_path, "w", encoding="utf-8") as f:
+            json.dump(rules, f, ensure_ascii=False, indent=1, default=str)
+        return cls(rules, digest=digest)
+
+    @staticmethod
+    def _rules_from_rows(rows, sheet_name):
+        if not rows:
+            return []
+        headers = {h.strip().lower(): h for h in rows[0].keys() if isinstance(h, str)}
+        mapping = {}
+        for field, aliases in RULE_COLUMNS.items():
+            for alias in aliases:
+                if alias.lower() in headers:
+                    mapping[field] = headers[alias.lower()]
+                    break
+        if not all(k in mapping for k in ("output", "condition", "value")):
+            return []
+
+        rules = []
+        for i, row in enumerate(rows):
+            output = row.get(mapping["output"])
+            if output is None or not str(output).strip():
+                continue
+            order = row.get(mapping["order"]) if "order" in mapping else None
+            rules.append({
+                "output": str(output).strip(),
+                "condition": (str(row.get(mapping["condition"]) or "")).strip(),
+                "value": row.get(mapping["value"]),
+                "mode": (str(row.get(mapping["mode"]) or "first")).strip().lower() if "mode" in mapping else "first",
+                "order": float(order) if isinstance(order, (int, float)) else float(i),
+                "source": f"{sheet_name}!{i + 2}",
+            })
+        return rules
+
+    # --- COMPILE (once per workbook x input schema) ---
+
+    def compile(self, columns):
+        """
+        Input: column names of the frame the rules will run on.
+        Output: list of pl.Expr, one per Output field.
+        """
+        key = (self.digest, tuple(columns))
+        with self._lock:
+            if key in self._compiled:
+                return self._compiled[key]
+
+        by_output = {}
+        for rule in sorted(self.rules, key=lambda r: r["order"]):
+            by_output.setdefault(rule["output"], []).append(rule)
+
+        exprs = []
+        for output, rules in by_output.items():
+            try:
+                exprs.append(self._compile_output(output, rules, columns))
+            except RuleSyntaxError as e:
+                raise RuleSyntaxError(f"{e} (rules for '{output}')") from e
+
+        with self._lock:
+            self._compiled[key] = exprs
+        return exprs
+
+    def _compile_output(self, output, rules, columns):
+        default = None
+        branches = []
+        for rule in rules:
+            value = self._value_expr(rule["value"], columns)
+            if rule["condition"].upper() in ("", "ELSE", "DEFAULT"):
+                default = value
+            else:
+                branches.append((ExpressionParser.compile(rule["condition"], columns), value))
+
+        if rules[0]["mode"] == "sum":
+            total = default if default is not None else pl.lit(0)
+            for condition, value in branches:
+                total = total + pl.when(condition).then(value).otherwise(0)
+            return total.alias(output)
+
+        if not branches:
+            return (default if default is not None else pl.lit(None)).alias(output)
+        chain = pl.when(branches[0][0]).then(branches[0][1])
+        for condition, value in branches[1:]:
+            chain = chain.when(condition).then(value)
+        return chain.otherwise(default if default is not None else pl.lit(None)).alias(output)
+
+    @staticmethod
+    def _value_expr(value, columns):
+        if isinstance(value, str) and value.strip().startswith("="):
+            return ExpressionParser.compile(value.strip()[1:], columns)
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        return pl.lit(value)
+
+    # --- EVALUATE ---
+
+    def apply(self, frame):
+        """
+        Input: pl.DataFrame or pl.LazyFrame
+        Output: same type, with one column per rule Output.
+        """
+        columns = frame.collect_schema().names() if isinstance(frame, pl.LazyFrame) else frame.columns
+        return frame.with_columns(self.compile(columns))
+
+    def score_lake(self, base_dir, start_date, end_date, output_path):
+        """
+        Scenario: Recompute scores for the whole history in one batch.
+        Reads latest rows per SKU + Report_Date and sinks the scored result.
+        """
+        from lake_reader import LakeReader
+
+        lf = LakeReader(base_dir).scan_range(start_date, end_date, latest_only=True)
+        if lf is None:
+            return None
+        self.apply(lf).sink_parquet(output_path, compression="zstd")
+        return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the PPC rules workbook and score Silver data locally")
+    parser.add_argument("--rules", default=RULES_WORKBOOK, help="Rules workbook (.xlsx)")
+    parser.add_argument("--silver", default=config.SILVER_DATA_DIR, help="Silver lake root")
+    parser.add_argument("--start", required=True, help="Start Report_Date (YYYY-MM-DD)")
+    parser.add_argument("--end", required=True, help="End Report_Date (YYYY-MM-DD)")
+    parser.add_argument("--out", default=os.path.join(config.OUTPUT_DIR, "scored_ppc.parquet"))
+    args = parser.parse_args()
+
+    config.ensure_directories()
+    engine = RuleEngine.from_workbook(args.rules)
+    print(f"Loaded {len(engine.rules)} rules for {len({r['output'] for r in engine.rules})} fields.")
+    result = engine.score_lake(args.silver, args.start, args.end, args.out)
+    print(f"✅ Scored data saved to {result}" if result else "No silver data in range.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,16 @@
 import argparse
-import calendar
 import json
 import os
 import re
 import subprocess
 import sys
 import time
-from datetime import datetime, timedelta
-
-import polars as pl
-import requests
-from dotenv import load_dotenv
-from playwright.sync_api import sync_playwright
 
 import config
-from modern_etl import RawToSilverIngester, ETLLogger
+from harvest_planner import HarvestPlanner, iter_chunks
 
-# Load environment variables from .env file
-load_dotenv()
+# Heavy dependencies (Playwright, requests, Polars via modern_etl, dotenv) are
+# imported on first use so --dry-run, cached-token runs and the API boot stay fast.
 
 class AutoLogin:
     def __init__(self, username, password):
@@ -36,6 +29,9 @@ class AutoLogin:
             return None
 
         print(f"Attempting login for user: {self.username}...")
+
+        from playwright.sync_api import sync_playwright
+        config.ensure_directories()  # debug screenshots go to OUTPUT_DIR
         
         with sync_playwright() as p:
             browser = None
@@ -149,122 +145,269 @@ class PPCHarvester:
     Worker 1: Chuyên trách việc cào dữ liệu từ Web UI/API của PPC Tool hiện tại.
     Output: Đẩy thẳng vào Ingester để đóng dấu & lưu Parquet.
     """
-    def __init__(self, token, logger=None):
+    def __init__(self, token, logger=None, base_url=None, request_delay=1, max_retries=None, retry_backoff=None):
+        """
+        base_url: Export endpoint (default config.API_BASE_URL; mock_export_server.py for load tests).
+        request_delay: Pause (seconds) between two chunks, to stay polite with the upstream API.
+        max_retries / retry_backoff: Retries of a request answered 429/5xx or failing at network level.
+        """
         self.headers = config.get_headers(token)
-        self.logger = logger or ETLLogger()
-        # Initialize the Modern Ingester
-        self.ingester = RawToSilverIngester(logger=self.logger)
-
-    def fetch_data(self, start_date_str, end_date_str, step="day", dry_run=False, debug=False):
+        self.base_url = base_url or config.API_BASE_URL
+        self.request_delay = request_delay
+        self.max_retries = config.HARVEST_MAX_RETRIES if max_retries is None else max_retries
+        self.retry_backoff = config.HARVEST_RETRY_BACKOFF_SECONDS if retry_backoff is None else retry_backoff
+        self._logger = logger
+        self._ingester = None
+        self._session = None
+
+    @property
+    def logger(self):
+        if self._logger is None:
+            from modern_etl import ETLLogger
+            self._logger = ETLLogger()
+        return self._logger
+
+    @property
+    def ingester(self):
+        # Initialize the Modern Ingester on first real download
+        if self._ingester is None:
+            from modern_etl import RawToSilverIngester
+            self._ingester = RawToSilverIngester(logger=self.logger)
+        return self._ingester
+
+    @property
+    def session(self):
+        # One keep-alive connection per harvester instead of a TLS handshake per chunk
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        return self._session
+
+    def fetch_data(self, start_date_str, end_date_str, step="day", dry_run=False, debug=False, force=False):
         """
         Iterates through date range based on granularity (step) and downloads reports.
         step: 'day', 'month', 'year', 'total'
+        force: Skip the lake-aware planning and download every chunk of the range.
         """
-        start_date = datetime.strptime(start_date_str, "%Y-%m-%d")
-        end_date = datetime.strptime(end_date_str, "%Y-%m-%d")
-        
-        current = start_date
-        request_count = 0
-
         print(f"🚀 START HARVEST. Range: {start_date_str} to {end_date_str}. Step: {step}")
         if dry_run:
             print("⚠️ WARNING: DRY-RUN MODE. No HTTP requests will be sent.")
 
-        while current <= end_date:
-            request_count += 1
-            
-            # Determine chunk end date based on step
-            if step == "day":
-                chunk_end = current
-            elif step == "month":
-                _, last_day = calendar.monthrange(current.year, current.month)
-                chunk_end = current.replace(day=last_day)
-            elif step == "year":
-                chunk_end = current.replace(month=12, day=31)
-            else: # total
-                chunk_end = end_date
-
-            # Clamp chunk_end to global end_date
-            if chunk_end > end_date:
-                chunk_end = end_date
-            
-            # Format dates for API
-            c_start_iso = current.strftime("%Y-%m-%d")
-            c_end_iso = chunk_end.strftime("%Y-%m-%d")
-            
-            print(f"[{request_count}] Processing range: {c_start_iso} to {c_end_iso}")
+        chunks = self.plan_chunks(start_date_str, end_date_str, step, force)
+        # The plan can go stale while earlier chunks download (overlapping runs): re-check each chunk
+        planner = None if force or dry_run else self._planner()
 
-            params = {
-                "page": 1,
-                "period": "custom",
-                "timeFrame": "custom",
-                "fromDate": f"{c_start_iso}T00:00:00.000Z",
-                "toDate": f"{c_end_iso}T23:59:59.000Z",
-                "flag": 1,
-                "fields": config.DEFAULT_FIELDS,
-            }
+        if not dry_run and chunks:
+            config.ensure_directories()
 
-            if debug:
-                print(f"   [DEBUG] Params: {params}")
+        for request_count, (c_start_iso, c_end_iso) in enumerate(chunks, start=1):
+            print(f"[{request_count}] Processing range: {c_start_iso} to {c_end_iso}")
 
             if dry_run:
+                if debug:
+                    print(f"   [DEBUG] Params: {self._export_params(c_start_iso, c_end_iso)}")
                 print(f"   [DRY-RUN] Would fetch and ingest: {c_start_iso} - {c_end_iso}")
-            else:
-                try:
-                    response = requests.get(
-                        config.API_BASE_URL, headers=self.headers, params=params, timeout=60
-                    )
-
-                    if response.status_code == 200:
-                        # 1. Save Raw File (Audit Trail)
-                        xlsx_filename = f"raw_ppc_{c_start_iso}_{c_end_iso}.xlsx"
-                        xlsx_path = os.path.join(config.RAW_DATA_DIR, xlsx_filename)
-                        
-                        with open(xlsx_path, "wb") as f:
-                            f.write(response.content)
-                        
-                        # 2. Ingest to Silver Layer (Modern Logic)
-                        metadata = {
-                            "start_date": c_start_iso,
-                            "end_date": c_end_iso,
-                            "source_type": "api_harvest",
-                            "step": step
-                        }
-                        # Calling the modern ingester!
-                        result_path = self.ingester.ingest_file(xlsx_path, metadata)
-                        
-                        if result_path:
-                            print(f"   ✅ Ingested: {os.path.basename(result_path)}")
-                        else:
-                            print(f"   ❌ Ingest Failed for {xlsx_filename}")
-
-                    elif response.status_code == 401:
-                        print("   ❌ Token expired during fetch!")
-                        self.logger.log_error("Fetch", "API", "Token Expired")
-                        return False
-                    else:
-                        print(f"   ❌ Error: Status Code {response.status_code}")
-
-                except Exception as e:
-                    print(f"   Exception: {str(e)}")
-                    self.logger.log_error("Fetch", "API", e)
-
-            # Advance current date
-            if step == "total":
-                break 
-            
-            current = chunk_end + timedelta(days=1)
-            if not dry_run:
-                time.sleep(1) 
+            elif planner and not planner.still_needed(c_start_iso, c_end_iso):
+                print("   ⏭️ Already harvested by another run since planning. Skipped.")
+                continue
+            elif self._fetch_chunk(self.session, c_start_iso, c_end_iso, step, debug) == "unauthorized":
+                return False
+
+            if not dry_run and request_count < len(chunks):
+                time.sleep(self.request_delay)
 
         return True
 
+    def plan_chunks(self, start_date_str, end_date_str, step="day", force=False):
+        """
+        Chunks of the range that need a download: [(start, end), ...].
+        force: Every chunk, skipping the lake-aware planning.
+        """
+        chunks = list(iter_chunks(start_date_str, end_date_str, step))
+        if force:
+            return chunks
+
+        plan = self._planner().plan(start_date_str, end_date_str, step)
+        stale = sum(1 for c in plan if c["reason"] == "stale")
+        print(f"📋 Plan: {len(plan)}/{len(chunks)} chunks to fetch "
+              f"({len(plan) - stale} missing, {stale} stale). Fresh chunks skipped.")
+        return [(c["start"], c["end"]) for c in plan]
+
+    @staticmethod
+    def _planner():
+        return HarvestPlanner(
+            config.SILVER_DATA_DIR,
+            settle_days=config.HARVEST_SETTLE_DAYS,
+            min_refresh_hours=config.HARVEST_MIN_REFRESH_HOURS,
+        )
+
+    def run_worker(self, store, worker_id=None, debug=False, poll_interval=10, request_delay=None):
+        """
+        Scenario: Multi-node backfill. Several harvesters (hosts/containers) share
+        one silver_data/raw_data volume and one LeaseStore (see coordination.py).
+        Loop: lease a chunk -> heartbeat while downloading + ingesting -> complete/fail.
+        Chunks of a dead node come back once their lease expires, and idle workers
+        pick them up. The worker exits when no chunk is pending or leased.
+        Returns:
+            dict: chunks done/failed/lost by this worker, or False if the token expired.
+            'lost': the lease expired and another node took the chunk over while this
+            worker was still on it (the chunk may have been ingested twice).
+        """
+        from coordination import Heartbeat, default_worker_id
+
+        worker_id = worker_id or default_worker_id()
+        request_delay = self.request_delay if request_delay is None else request_delay
+        config.ensure_directories()
+
+        summary = {"worker_id": worker_id, "done": 0, "failed": 0, "lost": 0}
+        while True:
+            chunk = store.acquire(worker_id)
+            if chunk is None:
+                if store.outstanding() == 0:
+                    break
+                # Other nodes still hold leases: wait in case one dies and its chunk comes back
+                time.sleep(poll_interval)
+                continue
+
+            print(f"[{worker_id}] Leased {chunk['start']} to {chunk['end']} (attempt {chunk['attempts']})")
+            with Heartbeat(store, worker_id, chunk):
+                status = self._fetch_chunk(self.session, chunk["start"], chunk["end"], chunk["step"], debug)
+
+            if status == "unauthorized":
+                # Not the chunk's fault: hand it back untouched for a node with a valid token
+                store.fail(worker_id, chunk, "Token Expired", retry=False)
+                return False
+            # complete/fail only apply while we still own the lease
+            if status == "ok":
+                owned = store.complete(worker_id, chunk)
+            else:
+                owned = store.fail(worker_id, chunk, status)
+            if not owned:
+                summary["lost"] += 1
+                self.logger.log_error("Lease", worker_id,
+                                      f"Lease lost on {chunk['start']}..{chunk['end']} ({status}): "
+                                      "another node owns the chunk, this run may have ingested it twice")
+            elif status == "ok":
+                summary["done"] += 1
+            else:
+                summary["failed"] += 1
+
+            time.sleep(request_delay)
+
+        print(f"🏁 Worker {worker_id}: {summary['done']} done, {summary['failed']} failed, {summary['lost']} lost.")
+        return summary
+
+    @staticmethod
+    def _export_params(c_start_iso, c_end_iso, page=1):
+        return {
+            "page": page,
+            "period": "custom",
+            "timeFrame": "custom",
+            "fromDate": f"{c_start_iso}T00:00:00.000Z",
+            "toDate": f"{c_end_iso}T23:59:59.000Z",
+            "flag": 1,
+            "fields": config.DEFAULT_FIELDS,
+        }
+
+    def _get_with_retry(self, http, params):
+        """
+        GET with retries on 429 / 5xx / network errors.
+        Waits Retry-After when the server sends it, else exponential backoff.
+        Returns the last response (raises the last network error if every attempt failed).
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = http.get(self.base_url, headers=self.headers, params=params, timeout=60)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                print(f"   ⚠️ {type(e).__name__}, retry {attempt + 1}/{self.max_retries}")
+                time.sleep(self.retry_backoff * 2 ** attempt)
+                continue
+
+            if response.status_code != 429 and response.status_code < 500:
+                return response
+            if attempt == self.max_retries:
+                return response
+            retry_after = response.headers.get("Retry-After", "")
+            wait = float(retry_after) if retry_after.isdigit() else self.retry_backoff * 2 ** attempt
+            print(f"   ⚠️ Status {response.status_code}, retry {attempt + 1}/{self.max_retries} in {wait:.1f}s")
+            time.sleep(min(wait, 60))
+        return response
+
+    def _fetch_chunk(self, http, c_start_iso, c_end_iso, step, debug=False):
+        """
+        Downloads one chunk (all its pages) and ingests it as one silver file.
+        http: requests module or Session.
+        Returns: 'ok', 'unauthorized', or a short failure reason.
+        """
+        raw_paths = []
+        total_pages = 1
+        page = 1
+        try:
+            while page <= total_pages:
+                params = self._export_params(c_start_iso, c_end_iso, page)
+                if debug:
+                    print(f"   [DEBUG] Params: {params}")
+
+                response = self._get_with_retry(http, params)
+
+                if response.status_code == 401:
+                    print("   ❌ Token expired during fetch!")
+                    self.logger.log_error("Fetch", "API", "Token Expired")
+                    return "unauthorized"
+                if response.status_code != 200:
+                    print(f"   ❌ Error: Status Code {response.status_code}")
+                    return f"http {response.status_code}"
+
+                # 1. Save Raw File (Audit Trail)
+                suffix = "" if page == 1 else f"_p{page}"
+                xlsx_filename = f"raw_ppc_{c_start_iso}_{c_end_iso}{suffix}.xlsx"
+                xlsx_path = os.path.join(config.RAW_DATA_DIR, xlsx_filename)
+
+                # Temp name + rename: raw_data may be shared with other nodes
+                tmp_path = f"{xlsx_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(response.content)
+                os.replace(tmp_path, xlsx_path)
+                raw_paths.append(xlsx_path)
+
+                # Paginated export: the first page announces how many there are
+                if page == 1:
+                    total_pages = int(response.headers.get("X-Total-Pages") or 1)
+                page += 1
+
+            # 2. Ingest to Silver Layer (Modern Logic)
+            metadata = {
+                "start_date": c_start_iso,
+                "end_date": c_end_iso,
+                "source_type": "api_harvest",
+                "step": step
+            }
+            # Calling the modern ingester! (all pages of one chunk -> one silver file)
+            if len(raw_paths) == 1:
+                result_path = self.ingester.ingest_file(raw_paths[0], metadata)
+            else:
+                result_path = self.ingester.ingest_pages(raw_paths, metadata)
+
+            if result_path:
+                print(f"   ✅ Ingested: {os.path.basename(result_path)}")
+                return "ok"
+            print(f"   ❌ Ingest Failed for {os.path.basename(raw_paths[0])}")
+            return "ingest failed"
+
+        except Exception as e:
+            print(f"   Exception: {str(e)}")
+            self.logger.log_error("Fetch", "API", e)
+            return f"exception: {e}"
+
 class DBSourceFetcher:
     """
     [SKELETON] Worker 2: Chuyên trách việc lấy data từ Database cũ (SQL hoặc API Wrapper).
     Output: Đẩy thẳng vào Ingester (dùng ingest_memory_data).
     """
     def __init__(self, connection_string=None, api_url=None, logger=None):
+        from modern_etl import RawToSilverIngester, ETLLogger
         self.logger = logger or ETLLogger()
         self.ingester = RawToSilverIngester(logger=self.logger)
         self.conn_str = connection_string
@@ -299,9 +442,19 @@ def main():
     parser.add_argument("--mode", choices=["full", "offline"], default="full", help="Operation Mode")
     parser.add_argument("--dry-run", action="store_true", help="Simulate run without making API requests")
     parser.add_argument("--debug", action="store_true", help="Enable verbose logging")
+    parser.add_argument("--force", action="store_true", help="Re-download every chunk, even if the lake already has fresh data")
+    parser.add_argument("--coordinator", nargs="?", const=config.HARVEST_COORDINATOR_DB, default=None,
+                        help="Share the harvest with other nodes through this lease database (SQLite on the shared volume)")
+    parser.add_argument("--worker-id", help="Worker name in the lease database (default: <hostname>-<pid>)")
+    parser.add_argument("--run-id", help="With --coordinator --force: id shared by the nodes of one forced run "
+                                         "(default: range + step + today's date)")
     
     args = parser.parse_args()
 
+    # Load environment variables from .env file
+    from dotenv import load_dotenv
+    load_dotenv()
+
     # Get Credentials
     user = os.getenv("PPC_USER")
     password = os.getenv("PPC_PASS")
@@ -330,7 +483,19 @@ def main():
         step = args.step
 
         harvester = PPCHarvester(token)
-        harvester.fetch_data(start_date, end_date, step=step, dry_run=args.dry_run, debug=args.debug)
+        if args.coordinator and not args.dry_run:
+            from coordination import LeaseStore
+            store = LeaseStore(args.coordinator, lease_seconds=config.HARVEST_LEASE_SECONDS)
+            # Every node enqueues the same plan (idempotent), then all of them drain the queue.
+            # Forced runs: a node joining late must not re-queue chunks this run already finished
+            run_id = None
+            if args.force:
+                run_id = args.run_id or f"force:{start_date}:{end_date}:{step}:{time.strftime('%Y-%m-%d')}"
+            queued = store.enqueue(harvester.plan_chunks(start_date, end_date, step, args.force), step, run_id)
+            print(f"🤝 Coordinator {args.coordinator}: {queued} chunks queued, status {store.stats()}")
+            harvester.run_worker(store, worker_id=args.worker_id, debug=args.debug)
+        else:
+            harvester.fetch_data(start_date, end_date, step=step, dry_run=args.dry_run, debug=args.debug, force=args.force)
 
     print("\n🏁 Operation Completed. Check 'silver_data' for results.")
 
@@ -0,0 +1,146 @@
+import unittest
+import sys
+import os
+import glob
+import io
+import shutil
+import time
+import polars as pl
+import pyarrow as pa
+from fastapi.testclient import TestClient
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import api_server
+from modern_etl import RawToSilverIngester, ETLLogger
+from lake_reader import LakeReader
+
+class TestQueryEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.test_silver_dir = "./test_silver_data"
+        if not os.path.exists(self.test_silver_dir):
+            os.makedirs(self.test_silver_dir)
+        ingester = RawToSilverIngester(logger=ETLLogger("test_etl.log"))
+        for day, skus in [("2025-10-01", ["A1", "B2", "C3"]), ("2025-10-02", ["A1", "B2"])]:
+            rows = [{"SKU": s, "Revenue": float(i), "Phase": i} for i, s in enumerate(skus)]
+            ingester.ingest_memory_data(rows, {"start_date": day, "end_date": day, "base_dir": self.test_silver_dir})
+            time.sleep(0.01)
+        # Schema drift: Phase arrives as text, re-harvest of 2025-10-01 for A1
+        ingester.ingest_memory_data([{"SKU": "A1", "Revenue": 99.0, "Phase": "launch"}],
+                                    {"start_date": "2025-10-01", "end_date": "2025-10-01", "base_dir": self.test_silver_dir})
+
+        self._original_reader = api_server._reader
+        api_server._reader = LakeReader(self.test_silver_dir)
+        self.client = TestClient(api_server.app)
+
+    def tearDown(self):
+        api_server._reader = self._original_reader
+        if os.path.exists(self.test_silver_dir):
+            shutil.rmtree(self.test_silver_dir)
+        if os.path.exists("test_etl.log"):
+            os.remove("test_etl.log")
+
+    def _params(self, **extra):
+        return {"start_date": "2025-10-01", "end_date": "2025-10-31", **extra}
+
+    def test_arrow_stream(self):
+        resp = self.client.get("/query", params=self._params(columns="SKU,Revenue,Phase"))
+        self.assertEqual(resp.status_code, 200)
+        table = pa.ipc.open_stream(io.BytesIO(resp.content)).read_all()
+        self.assertEqual(table.column_names, ["SKU", "Revenue", "Phase"])
+        self.assertEqual(table.num_rows, 6)
+
+    def test_ndjson_latest_only_and_sku_filter(self):
+        resp = self.client.get("/query", params=self._params(format="ndjson", latest_only="true", skus=["A1"]))
+        df = pl.read_ndjson(io.BytesIO(resp.content))
+        self.assertEqual(sorted(zip(df["Report_Date"], df["Revenue"])), [("2025-10-01", 99.0), ("2025-10-02", 0.0)])
+
+    def test_csv_pagination(self):
+        seen = []
+        cursor = None
+        pages = 0
+        while True:
+            params = self._params(format="csv", limit=2, columns="SKU")
+            if cursor:
+                params["cursor"] = cursor
+            resp = self.client.get("/query", params=params)
+            seen.extend(pl.read_csv(io.BytesIO(resp.content))["SKU"].to_list())
+            pages += 1
+            cursor = resp.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+        self.assertEqual(pages, 3)
+        self.assertEqual(sorted(seen), ["A1", "A1", "A1", "B2", "B2", "C3"])
+
+    def test_latest_only_pagination_across_reharvest(self):
+        """Pages never return superseded rows, even when the superseding file sorts first"""
+        ingester = RawToSilverIngester(logger=ETLLogger("test_etl.log"))
+        ingester.ingest_memory_data([{"SKU": "A1", "Revenue": 1.0, "Phase": 1}],
+                                    {"start_date": "2025-10-31", "end_date": "2025-10-31", "base_dir": self.test_silver_dir})
+        time.sleep(0.01)
+        # Month export ingested later: its file name sorts before the 2025-10-31 day file it supersedes
+        ingester.ingest_memory_data([{"SKU": "A1", "Revenue": 31.0, "Phase": 1}],
+                                    {"start_date": "2025-10-01", "end_date": "2025-10-31", "base_dir": self.test_silver_dir})
+
+        rows, pages, cursor = [], 0, None
+        while True:
+            params = self._params(format="ndjson", latest_only="true", limit=2, columns="SKU,Report_Date,Revenue")
+            if cursor:
+                params["cursor"] = cursor
+            resp = self.client.get("/query", params=params)
+            rows.extend(pl.read_ndjson(io.BytesIO(resp.content)).iter_rows(named=True))
+            pages += 1
+            cursor = resp.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+
+        keys = [(r["SKU"], r["Report_Date"]) for r in rows]
+        self.assertEqual(len(keys), len(set(keys)))
+        self.assertEqual(len(keys), 6)
+        # The day file's only row is superseded: no trailing empty page
+        self.assertEqual(pages, 3)
+        self.assertIn({"SKU": "A1", "Report_Date": "2025-10-31", "Revenue": 31.0},
+                      [{k: r[k] for k in ("SKU", "Report_Date", "Revenue")} for r in rows])
+
+    def test_as_of(self):
+        """Before the A1 re-harvest, 2025-10-01 still reads the first export"""
+        first = pl.read_parquet(sorted(glob.glob(os.path.join(self.test_silver_dir, "2025", "10", "*.parquet")))[0])
+        cutoff = first["ingestion_time"][0]
+        resp = self.client.get("/query", params=self._params(format="ndjson", latest_only="true", skus=["A1"],
+                                                             as_of=cutoff))
+        df = pl.read_ndjson(io.BytesIO(resp.content))
+        self.assertEqual(list(zip(df["Report_Date"], df["Revenue"])), [("2025-10-01", 0.0)])
+        self.assertEqual(self.client.get("/query", params=self._params(as_of="yesterday")).status_code, 400)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get("/query", params=self._params(format="xml")).status_code, 400)
+        self.assertEqual(self.client.get("/query", params=self._params(cursor="!!")).status_code, 400)
+        for start, end in [("2025-13-01", "2025-10-31"), ("10/01/2025", "2025-10-31"), ("2025-10-31", "2025-10-01")]:
+            self.assertEqual(self.client.get("/query", params={"start_date": start, "end_date": end}).status_code, 400)
+
+    def test_latest_only_pages_share_one_snapshot(self):
+        """Latest keys are computed once per pagination; later ingestions do not leak into later pages"""
+        reader = api_server._reader
+        params = self._params(format="ndjson", latest_only="true", limit=2, columns="SKU,Report_Date,Revenue")
+        first = self.client.get("/query", params=params)
+        misses = reader.cache.misses
+
+        time.sleep(0.01)
+        RawToSilverIngester(logger=ETLLogger("test_etl.log")).ingest_memory_data(
+            [{"SKU": "C3", "Revenue": 7.0, "Phase": 1}],
+            {"start_date": "2025-10-02", "end_date": "2025-10-02", "base_dir": self.test_silver_dir})
+
+        rows, cursor = pl.read_ndjson(io.BytesIO(first.content)).rows(), first.headers["X-Next-Cursor"]
+        while cursor:
+            resp = self.client.get("/query", params={**params, "cursor": cursor})
+            rows.extend(pl.read_ndjson(io.BytesIO(resp.content)).rows())
+            cursor = resp.headers.get("X-Next-Cursor")
+        self.assertEqual(len(rows), 5)
+        self.assertNotIn("C3", [r[0] for r in rows if r[1] == "2025-10-02"])
+        # The new ingestion bumped 2025-10: one recompute, not one per page
+        self.assertLessEqual(reader.cache.misses - misses, 1)
+
+if __name__ == '__main__':
+    unittest.main()
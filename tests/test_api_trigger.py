@@ -0,0 +1,64 @@
+import unittest
+import sys
+import os
+import shutil
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import api_server
+import config
+import scrape_bot
+from modern_etl import ETLLogger
+
+class TestTriggerScrape(unittest.TestCase):
+
+    def setUp(self):
+        self.test_silver_dir = "./test_silver_data"
+        os.makedirs(self.test_silver_dir, exist_ok=True)
+        self.patches = [
+            patch.object(config, "SILVER_DATA_DIR", self.test_silver_dir),
+            patch.object(api_server, "_logger", ETLLogger("test_etl.log")),
+            patch.object(scrape_bot.AutoLogin, "get_token", return_value="t0k"),
+        ]
+        for p in self.patches:
+            p.start()
+        self.client = TestClient(api_server.app)
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        if os.path.exists(self.test_silver_dir):
+            shutil.rmtree(self.test_silver_dir)
+        if os.path.exists("test_etl.log"):
+            os.remove("test_etl.log")
+
+    def test_accepted_request_schedules_the_harvest(self):
+        """The background task runs PPCHarvester.fetch_data with the request's range, step and force"""
+        for force in (False, True):
+            with patch.object(scrape_bot.PPCHarvester, "fetch_data", return_value=True) as fetch_data:
+                resp = self.client.post("/trigger/scrape", json={
+                    "start_date": "2025-10-01", "end_date": "2025-10-02", "step": "day", "force": force})
+
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(resp.json()["status"], "accepted")
+            self.assertEqual(len(resp.json()["planned"]), 2)
+            fetch_data.assert_called_once_with("2025-10-01", "2025-10-02", "day", force=force)
+
+    def test_no_token_aborts_without_harvesting(self):
+        with patch.object(scrape_bot.AutoLogin, "get_token", return_value=None), \
+                patch.object(scrape_bot.PPCHarvester, "fetch_data") as fetch_data:
+            resp = self.client.post("/trigger/scrape", json={"start_date": "2025-10-01", "end_date": "2025-10-01"})
+        self.assertEqual(resp.json()["status"], "accepted")
+        fetch_data.assert_not_called()
+
+    def test_bad_dates_schedule_nothing(self):
+        with patch.object(api_server, "run_scrape_job") as job:
+            resp = self.client.post("/trigger/scrape", json={"start_date": "2025-13-01", "end_date": "2025-10-01"})
+        self.assertEqual(resp.status_code, 400)
+        job.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
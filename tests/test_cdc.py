@@ -0,0 +1,131 @@
+import unittest
+import sys
+import os
+import glob
+import shutil
+import time
+from unittest.mock import patch
+import polars as pl
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modern_etl import RawToSilverIngester, ETLLogger
+from cdc import ChangeCapture
+
+class TestChangeCapture(unittest.TestCase):
+
+    def setUp(self):
+        self.test_silver_dir = "./test_silver_data"
+        if not os.path.exists(self.test_silver_dir):
+            os.makedirs(self.test_silver_dir)
+        self.ingester = RawToSilverIngester(logger=ETLLogger("test_etl.log"))
+
+    def tearDown(self):
+        if os.path.exists(self.test_silver_dir):
+            shutil.rmtree(self.test_silver_dir)
+        if os.path.exists("test_etl.log"):
+            os.remove("test_etl.log")
+
+    def _ingest(self, rows, day="2025-10-06"):
+        metadata = {"start_date": day, "end_date": day, "base_dir": self.test_silver_dir}
+        path = self.ingester.ingest_memory_data(rows, metadata)
+        time.sleep(0.01)  # distinct ingestion_time
+        return path
+
+    def _cdc_for(self, silver_path):
+        name = "cdc_" + os.path.basename(silver_path)[len("ppc_"):]
+        return pl.read_parquet(os.path.join(os.path.dirname(silver_path), "_cdc", name))
+
+    def test_first_ingestion_is_all_inserts(self):
+        path = self._ingest([{"SKU": "A1", "Revenue": 10.0}, {"SKU": "B2", "Revenue": 5.0}])
+        changes = self._cdc_for(path)
+        self.assertEqual(changes["op"].to_list(), ["I", "I"])
+        self.assertTrue(changes["prev_ingestion_time"].is_null().all())
+
+    def test_reharvest_emits_only_changes(self):
+        """Unchanged rows are dropped; updates, inserts and deletes are tagged"""
+        first = self._ingest([
+            {"SKU": "A1", "Revenue": 10.0},
+            {"SKU": "B2", "Revenue": 5.0},
+            {"SKU": "C3", "Revenue": 7.0},
+        ])
+        second = self._ingest([
+            {"SKU": "A1", "Revenue": 10.0},  # unchanged
+            {"SKU": "B2", "Revenue": 6.0},   # updated
+            {"SKU": "D4", "Revenue": 1.0},   # inserted (C3 deleted)
+        ])
+
+        changes = self._cdc_for(second)
+        ops = dict(zip(changes["SKU"].to_list(), changes["op"].to_list()))
+        self.assertEqual(ops, {"B2": "U", "C3": "D", "D4": "I"})
+
+        prior_time = pl.read_parquet(first)["ingestion_time"][0]
+        new_time = pl.read_parquet(second)["ingestion_time"][0]
+        updated = changes.filter(pl.col("SKU") == "B2")
+        self.assertEqual(updated["Revenue"][0], 6.0)
+        self.assertEqual(updated["prev_ingestion_time"][0], prior_time)
+        deleted = changes.filter(pl.col("SKU") == "C3")
+        self.assertEqual(deleted["Revenue"][0], 7.0)  # last known values
+        self.assertEqual(deleted["ingestion_time"][0], new_time)
+
+    def test_capture_scans_lazily(self):
+        """Neither ingestion is read eagerly: only keys + hashes, then the changed rows"""
+        self._ingest([{"SKU": "A1", "Revenue": 10.0}, {"SKU": "C3", "Revenue": 5.0}])
+        second = self._ingest([{"SKU": "A1", "Revenue": 10.0}, {"SKU": "B2", "Revenue": 1.0}])
+        os.remove(os.path.join(os.path.dirname(second), "_cdc",
+                               "cdc_" + os.path.basename(second)[len("ppc_"):]))
+
+        with patch.object(pl, "read_parquet", side_effect=AssertionError("eager read")):
+            ChangeCapture(self.test_silver_dir).capture(second)
+        changes = self._cdc_for(second)
+        self.assertEqual(changes.select("op", "SKU", "Revenue").rows(), [("I", "B2", 1.0), ("D", "C3", 5.0)])
+
+    def test_rebuild_restores_missed_captures(self):
+        self._ingest([{"SKU": "A1", "Revenue": 10.0}])
+        second = self._ingest([{"SKU": "A1", "Revenue": 11.0}])
+        expected = self._cdc_for(second)
+        os.remove(os.path.join(os.path.dirname(second), "_cdc", "cdc_" + os.path.basename(second)[len("ppc_"):]))
+
+        self.assertEqual(ChangeCapture(self.test_silver_dir).rebuild(), 2)
+        self.assertTrue(self._cdc_for(second).equals(expected))
+
+    def test_other_ranges_are_not_compared(self):
+        """A different day is never the 'prior' ingestion"""
+        self._ingest([{"SKU": "A1", "Revenue": 10.0}], day="2025-10-06")
+        path = self._ingest([{"SKU": "A1", "Revenue": 10.0}], day="2025-10-07")
+        self.assertEqual(self._cdc_for(path)["op"].to_list(), ["I"])
+
+    def test_dtype_drift_is_not_a_change(self):
+        old = pl.DataFrame({"SKU": ["A1"], "Report_Date": ["2025-10-06"], "Clicks": [3]})
+        new = pl.DataFrame({"SKU": ["A1"], "Report_Date": ["2025-10-06"], "Clicks": [3.0]})
+        self.assertEqual(ChangeCapture(self.test_silver_dir).diff(old, new).height, 0)
+
+    def test_read_changes_since(self):
+        self._ingest([{"SKU": "A1", "Revenue": 10.0}])
+        checkpoint = ChangeCapture(self.test_silver_dir).read_changes()["ingestion_time"].max()
+        self._ingest([{"SKU": "A1", "Revenue": 11.0}])
+
+        changes = ChangeCapture(self.test_silver_dir).read_changes(since=checkpoint)
+        self.assertEqual(changes.select("op", "SKU", "Revenue").rows(), [("U", "A1", 11.0)])
+
+    def test_read_changes_since_compares_instants(self):
+        """since and stamps in different offsets are compared in UTC, not as text"""
+        cdc_dir = os.path.join(os.path.dirname(self._ingest([{"SKU": "A1", "Revenue": 10.0}])), "_cdc")
+        for name, stamp in [("cdc_a.parquet", "2025-10-10T08:00:00+07:00"),   # 01:00Z
+                            ("cdc_b.parquet", "2025-10-10T03:00:00Z")]:       # 03:00Z
+            pl.DataFrame({"op": ["U"], "SKU": ["B2"], "Report_Date": ["2025-10-06"], "Revenue": [1.0],
+                          "ingestion_time": [stamp]}).write_parquet(os.path.join(cdc_dir, name))
+
+        changes = ChangeCapture(self.test_silver_dir).read_changes(since="2025-10-10T09:45:00+07:00")
+        self.assertEqual(changes.filter(pl.col("SKU") == "B2")["ingestion_time"].to_list(), ["2025-10-10T03:00:00Z"])
+        self.assertEqual(changes["SKU"].to_list(), ["B2", "A1"])  # ordered by instant: 03:00Z, then today
+
+    def test_cdc_files_stay_out_of_the_silver_glob(self):
+        self._ingest([{"SKU": "A1", "Revenue": 10.0}])
+        silver = glob.glob(os.path.join(self.test_silver_dir, "[0-9]*", "*", "*.parquet"))
+        self.assertEqual(len(silver), 1)
+        self.assertTrue(all("_cdc" not in p for p in silver))
+
+if __name__ == '__main__':
+    unittest.main()
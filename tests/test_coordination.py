@@ -0,0 +1,250 @@
+import unittest
+import sys
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from cdc import ChangeCapture
+from coordination import FileLock, LeaseStore, Heartbeat
+from lake_reader import LakeReader
+from modern_etl import RawToSilverIngester, ETLLogger
+from rollups import RollupStore
+from scrape_bot import PPCHarvester
+
+class TestCoordination(unittest.TestCase):
+
+    def setUp(self):
+        self.test_silver_dir = "./test_silver_data"
+        if not os.path.exists(self.test_silver_dir):
+            os.makedirs(self.test_silver_dir)
+        self.db_path = os.path.join(self.test_silver_dir, "_meta", "leases.db")
+
+    def tearDown(self):
+        if os.path.exists(self.test_silver_dir):
+            shutil.rmtree(self.test_silver_dir)
+        if os.path.exists("test_etl.log"):
+            os.remove("test_etl.log")
+
+    def _chunks(self, n):
+        first = datetime(2025, 10, 1)
+        return [((first + timedelta(days=i)).strftime("%Y-%m-%d"),) * 2 for i in range(n)]
+
+    # --- FILE LOCK ---
+
+    def test_file_lock_is_exclusive(self):
+        lock_path = os.path.join(self.test_silver_dir, "x.lock")
+        inside, overlaps = [0], []
+
+        def critical():
+            with FileLock(lock_path, poll_interval=0.001):
+                inside[0] += 1
+                overlaps.append(inside[0])
+                time.sleep(0.002)
+                inside[0] -= 1
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(lambda _: critical(), range(20)))
+        self.assertEqual(max(overlaps), 1)
+        self.assertFalse(os.path.exists(lock_path))
+
+    def test_file_lock_timeout_and_stale_break(self):
+        lock_path = os.path.join(self.test_silver_dir, "x.lock")
+        FileLock(lock_path).acquire()  # never released: a dead process
+        with self.assertRaises(TimeoutError):
+            FileLock(lock_path, timeout=0.05).acquire()
+
+        old = time.time() - 3600
+        os.utime(lock_path, (old, old))
+        with FileLock(lock_path, timeout=0.05, stale_after=60):
+            self.assertTrue(os.path.exists(lock_path))
+
+    def test_file_lock_release_keeps_a_lock_taken_over(self):
+        """A holder whose lock was broken as stale must not delete the new owner's lock"""
+        lock_path = os.path.join(self.test_silver_dir, "x.lock")
+        slow = FileLock(lock_path).acquire()
+        old = time.time() - 3600
+        os.utime(lock_path, (old, old))
+
+        fresh = FileLock(lock_path, timeout=0.05, stale_after=60).acquire()
+        slow.release()
+        self.assertTrue(os.path.exists(lock_path))
+        with self.assertRaises(TimeoutError):
+            FileLock(lock_path, timeout=0.05).acquire()
+        fresh.release()
+        self.assertFalse(os.path.exists(lock_path))
+
+    # --- LEASES ---
+
+    def test_enqueue_is_idempotent(self):
+        store = LeaseStore(self.db_path)
+        self.assertEqual(store.enqueue(self._chunks(3)), 3)
+        self.assertEqual(store.enqueue(self._chunks(3)), 0)  # second node, same plan
+        chunk = store.acquire("w1")
+        store.complete("w1", chunk)
+        self.assertEqual(store.enqueue(self._chunks(3)), 1)  # done chunk re-planned (stale)
+        self.assertEqual(store.stats(), {"pending": 3})
+        self.assertEqual(store.outstanding(), 3)
+
+    def test_forced_run_is_enqueued_once(self):
+        """Nodes joining a forced run late don't re-queue the chunks it already finished"""
+        store = LeaseStore(self.db_path)
+        store.enqueue(self._chunks(2))  # pending from an earlier, planner-driven run
+        self.assertEqual(store.enqueue(self._chunks(3), run_id="r1"), 1)
+
+        while True:
+            chunk = store.acquire("w1")
+            if chunk is None:
+                break
+            store.complete("w1", chunk)
+        self.assertEqual(store.enqueue(self._chunks(3), run_id="r1"), 0)  # late node, same run
+        self.assertEqual(store.stats(), {"done": 3})
+        self.assertEqual(store.enqueue(self._chunks(3), run_id="r2"), 3)  # next forced run
+
+    def test_no_chunk_leased_twice(self):
+        store = LeaseStore(self.db_path)
+        store.enqueue(self._chunks(30))
+        taken = []
+
+        def drain(worker_id):
+            worker_store = LeaseStore(self.db_path)
+            while (chunk := worker_store.acquire(worker_id)) is not None:
+                taken.append(chunk["start"])
+                worker_store.complete(worker_id, chunk)
+
+        threads = [threading.Thread(target=drain, args=(f"w{i}",)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(sorted(taken), [c[0] for c in self._chunks(30)])
+        self.assertEqual(store.stats(), {"done": 30})
+
+    def test_expired_lease_is_stolen(self):
+        """A dead node's chunk goes to the next idle worker; the dead node can't complete it anymore"""
+        store = LeaseStore(self.db_path, lease_seconds=0.05)
+        store.enqueue(self._chunks(1))
+        dead = store.acquire("dead-node")
+        self.assertIsNone(store.acquire("w2"))  # lease still live
+
+        time.sleep(0.1)
+        stolen = store.acquire("w2")
+        self.assertEqual((stolen["start"], stolen["attempts"]), (dead["start"], 2))
+        self.assertFalse(store.heartbeat("dead-node", dead))
+        self.assertFalse(store.complete("dead-node", dead))
+        self.assertTrue(store.complete("w2", stolen))
+
+    def test_heartbeat_keeps_lease(self):
+        store = LeaseStore(self.db_path, lease_seconds=0.1)
+        store.enqueue(self._chunks(1))
+        chunk = store.acquire("w1")
+        with Heartbeat(store, "w1", chunk, interval=0.02) as heartbeat:
+            time.sleep(0.3)
+            self.assertIsNone(store.acquire("w2"))
+        self.assertFalse(heartbeat.lost)
+
+    def test_failures_retry_then_park(self):
+        store = LeaseStore(self.db_path, max_attempts=2)
+        store.enqueue(self._chunks(1))
+        store.fail("w1", store.acquire("w1"), "http 500")
+        self.assertEqual(store.stats(), {"pending": 1})
+        store.fail("w1", store.acquire("w1"), "http 500")
+        self.assertEqual(store.stats(), {"failed": 1})
+
+        store.enqueue(self._chunks(1))
+        chunk = store.acquire("w1")
+        store.fail("w1", chunk, "Token Expired", retry=False)  # not counted
+        self.assertEqual(store.acquire("w2")["attempts"], 1)
+
+    # --- WORKERS ---
+
+    def test_workers_split_the_backfill(self):
+        """Each chunk is fetched exactly once across workers"""
+        store = LeaseStore(self.db_path)
+        store.enqueue(self._chunks(12))
+        fetched = []
+
+        def fake_fetch(requests, start, end, step, debug=False):
+            fetched.append(start)
+            time.sleep(0.005)
+            return "ok"
+
+        def worker(worker_id):
+            harvester = PPCHarvester("token")
+            harvester._fetch_chunk = fake_fetch
+            return harvester.run_worker(LeaseStore(self.db_path), worker_id, poll_interval=0.01, request_delay=0)
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            summaries = list(pool.map(worker, ["w1", "w2", "w3"]))
+        self.assertEqual(sorted(fetched), [c[0] for c in self._chunks(12)])
+        self.assertEqual(sum(s["done"] for s in summaries), 12)
+
+    def test_lost_lease_is_not_counted_done(self):
+        """A chunk taken over by another node while we fetched it is reported as lost"""
+        store = LeaseStore(self.db_path)
+        store.enqueue(self._chunks(1))
+
+        def fetch_then_get_overtaken(requests, start, end, step, debug=False):
+            # Our lease expired meanwhile: node-b took the chunk over and finished it
+            with store._connect() as conn:
+                conn.execute("UPDATE chunks SET owner = 'node-b', status = 'done'")
+            return "ok"
+
+        harvester = PPCHarvester("token", logger=ETLLogger("test_etl.log"))
+        harvester._fetch_chunk = fetch_then_get_overtaken
+        summary = harvester.run_worker(store, "w1", poll_interval=0.01, request_delay=0)
+        self.assertEqual((summary["done"], summary["failed"], summary["lost"]), (0, 0, 1))
+
+    def test_parallel_ingestion_keeps_sidecars_whole(self):
+        """Concurrent writers into one lake: no lost rollup update"""
+        def ingest(day):
+            ingester = RawToSilverIngester(logger=ETLLogger("test_etl.log"))
+            rows = [{"SKU": "A1", "Revenue (Actual)": 1.0, "Ads Spend (Actual)": 1.0, "Unit sold (Actual)": 1}]
+            return ingester.ingest_memory_data(rows, {"start_date": day, "end_date": day,
+                                                      "base_dir": self.test_silver_dir})
+
+        days = [c[0] for c in self._chunks(8)]
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            paths = list(pool.map(ingest, days))
+        self.assertEqual(len(set(paths)), 8)
+        daily = RollupStore(self.test_silver_dir).query(days[0], days[-1], granularity="day")
+        self.assertEqual(daily.height, 8)
+
+    def test_sidecar_lock_timeout_is_caught_up(self):
+        """A write that misses the sidecar lock still invalidates caches and is indexed later"""
+        ingester = RawToSilverIngester(logger=ETLLogger("test_etl.log"))
+        metadata = {"start_date": "2025-10-01", "end_date": "2025-10-01", "base_dir": self.test_silver_dir}
+
+        def ingest(revenue):
+            rows = [{"SKU": "A1", "Revenue (Actual)": revenue, "Ads Spend (Actual)": 1.0, "Unit sold (Actual)": 1}]
+            path = ingester.ingest_memory_data(rows, metadata)
+            time.sleep(0.01)
+            return path
+
+        ingest(1.0)
+        reader = LakeReader(self.test_silver_dir, disk_cache=True)
+        self.assertEqual(reader.read_range("2025-10-01", "2025-10-01")["Revenue (Actual)"].to_list(), [1.0])
+
+        with patch.object(FileLock, "acquire", side_effect=TimeoutError("busy")):
+            second = ingest(2.0)
+        self.assertIsNotNone(second)
+        # Version bumped outside the lock: neither this reader nor a restarted one serves the old rows
+        self.assertEqual(reader.read_range("2025-10-01", "2025-10-01")["Revenue (Actual)"].to_list(), [2.0])
+        restarted = LakeReader(self.test_silver_dir, disk_cache=True)
+        self.assertEqual(restarted.read_range("2025-10-01", "2025-10-01")["Revenue (Actual)"].to_list(), [2.0])
+
+        self.assertEqual(ingester.catch_up_sidecars(self.test_silver_dir), 1)
+        self.assertEqual(ingester.catch_up_sidecars(self.test_silver_dir), 0)
+        changes = ChangeCapture(self.test_silver_dir).read_changes()
+        self.assertEqual(changes.select("op", "Revenue (Actual)").rows(), [("I", 1.0), ("U", 2.0)])
+        daily = RollupStore(self.test_silver_dir).query("2025-10-01", "2025-10-01", granularity="day")
+        self.assertEqual(daily["Revenue (Actual)"].to_list(), [2.0])
+
+if __name__ == '__main__':
+    unittest.main()
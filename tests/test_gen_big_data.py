@@ -0,0 +1,95 @@
+import unittest
+import sys
+import os
+import shutil
+from collections import Counter
+import polars as pl
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gen_big_data import generate_partitioned_lake
+from lake_layout import list_partition_files, parse_silver_filename, partition_month
+from lake_index import SkuIndex
+from rollups import RollupStore
+from cdc import ChangeCapture
+from query_cache import LakeVersion
+
+class TestPartitionedLakeGenerator(unittest.TestCase):
+
+    def setUp(self):
+        self.test_silver_dir = "./test_silver_data"
+
+    def tearDown(self):
+        if os.path.exists(self.test_silver_dir):
+            shutil.rmtree(self.test_silver_dir)
+
+    def _generate(self, base_dir=None, seed=7):
+        return generate_partitioned_lake(
+            base_dir=base_dir or self.test_silver_dir, n_skus=20,
+            start_date="2025-09-25", end_date="2025-10-14", seed=seed,
+            reharvest_rate=0.5, drift_rate=0.5,
+        )
+
+    def test_layout_and_row_counts(self):
+        total_rows = self._generate()
+        files = list_partition_files(self.test_silver_dir)
+
+        # One YYYY/MM folder per Report_Date month, ingester file names only
+        self.assertEqual({partition_month(p) for p in files}, {"2025-09", "2025-10"})
+        infos = [parse_silver_filename(p) for p in files]
+        self.assertTrue(all(infos))
+        for path, info in zip(files, infos):
+            self.assertEqual(info["start_date"], info["end_date"])
+            self.assertEqual(partition_month(path), info["end_date"][:7])
+
+        days = Counter(info["end_date"] for info in infos)
+        self.assertEqual(len(days), 20)
+        rows = sum(pl.read_parquet(p).height for p in files)
+        self.assertEqual(rows, total_rows)
+        self.assertEqual(rows, 20 * len(files))
+
+    def test_reharvests_and_drift_show_up(self):
+        self._generate()
+        files = list_partition_files(self.test_silver_dir)
+        by_day = {}
+        for path in files:
+            by_day.setdefault(parse_silver_filename(path)["end_date"], []).append(path)
+
+        # Re-harvested days: several files, later ingestion_time, revised numbers
+        reharvested = [paths for paths in by_day.values() if len(paths) > 1]
+        self.assertTrue(reharvested)
+        first, second = (pl.read_parquet(p) for p in sorted(reharvested[0])[:2])
+        self.assertLess(first["ingestion_time"][0], second["ingestion_time"][0])
+        self.assertFalse(first["Revenue (Actual)"].equals(second["Revenue (Actual)"]))
+
+        # Schema drift: not every file carries the same columns/dtypes
+        schemas = {tuple(pl.read_parquet_schema(p).items()) for p in files}
+        self.assertGreater(len(schemas), 1)
+
+    def test_reproducible(self):
+        self._generate()
+        other_dir = self.test_silver_dir + "_b"
+        try:
+            self._generate(base_dir=other_dir)
+            left = [os.path.relpath(p, self.test_silver_dir) for p in list_partition_files(self.test_silver_dir)]
+            right = [os.path.relpath(p, other_dir) for p in list_partition_files(other_dir)]
+            self.assertEqual(left, right)
+            self.assertTrue(pl.read_parquet(os.path.join(self.test_silver_dir, left[0])).equals(
+                pl.read_parquet(os.path.join(other_dir, right[0]))))
+        finally:
+            shutil.rmtree(other_dir, ignore_errors=True)
+
+    def test_sidecars_are_built(self):
+        """Generated files bypass the ingester: index, rollups, CDC and versions are rebuilt at the end"""
+        self._generate()
+        files = list_partition_files(self.test_silver_dir)
+        sku = pl.read_parquet(files[0], columns=["SKU"])["SKU"][0]
+
+        self.assertIn(files[0], SkuIndex(self.test_silver_dir).locate(sku))
+        self.assertGreater(RollupStore(self.test_silver_dir).query("2025-10-01", "2025-10-14", granularity="day").height, 0)
+        self.assertGreater(ChangeCapture(self.test_silver_dir).read_changes().height, 0)
+        self.assertEqual(sorted(LakeVersion(self.test_silver_dir).read()), ["2025-09", "2025-10"])
+
+if __name__ == '__main__':
+    unittest.main()
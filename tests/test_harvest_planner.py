@@ -0,0 +1,78 @@
+import unittest
+import sys
+import os
+import shutil
+from datetime import datetime
+import polars as pl
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modern_etl import PartitionManager
+from harvest_planner import HarvestPlanner, iter_chunks
+
+class TestHarvestPlanner(unittest.TestCase):
+
+    def setUp(self):
+        self.test_silver_dir = "./test_silver_data"
+        if not os.path.exists(self.test_silver_dir):
+            os.makedirs(self.test_silver_dir)
+        self.planner = HarvestPlanner(self.test_silver_dir, settle_days=3, min_refresh_hours=12)
+
+    def tearDown(self):
+        if os.path.exists(self.test_silver_dir):
+            shutil.rmtree(self.test_silver_dir)
+
+    def _touch(self, start, end, ingested_at):
+        """Planner only needs the file name written by the ingester"""
+        folder = PartitionManager.ensure_partition_exists(self.test_silver_dir, datetime.strptime(end, "%Y-%m-%d"))
+        name = f"ppc_{start}_{end}_ingest_{ingested_at.strftime('%Y%m%d%H%M%S%f')}.parquet"
+        open(os.path.join(folder, name), "wb").close()
+
+    def test_iter_chunks(self):
+        self.assertEqual(list(iter_chunks("2025-01-30", "2025-02-02", "month")),
+                         [("2025-01-30", "2025-01-31"), ("2025-02-01", "2025-02-02")])
+        self.assertEqual(len(list(iter_chunks("2025-01-01", "2025-01-10", "day"))), 10)
+        self.assertEqual(list(iter_chunks("2025-01-01", "2025-03-10", "total")), [("2025-01-01", "2025-03-10")])
+
+    def test_missing_fresh_and_stale(self):
+        now = datetime(2025, 10, 20, 12, 0)
+        self._touch("2025-10-01", "2025-10-01", datetime(2025, 10, 10, 2, 0))  # settled -> fresh
+        self._touch("2025-10-18", "2025-10-18", datetime(2025, 10, 19, 2, 0))  # early, 34h old -> stale
+        self._touch("2025-10-19", "2025-10-19", datetime(2025, 10, 20, 2, 0))  # early, 10h old -> fresh
+
+        plan = self.planner.plan("2025-10-01", "2025-10-19", "day", now=now)
+        by_date = {c["start"]: c["reason"] for c in plan}
+
+        self.assertNotIn("2025-10-01", by_date)
+        self.assertEqual(by_date["2025-10-18"], "stale")
+        self.assertNotIn("2025-10-19", by_date)
+        self.assertEqual(by_date["2025-10-02"], "missing")
+        self.assertEqual(len(plan), 17)
+
+    def test_latest_ingestion_counts(self):
+        """An older early capture does not count once a settled re-harvest exists"""
+        self._touch("2025-10-01", "2025-10-01", datetime(2025, 10, 2, 2, 0))
+        self._touch("2025-10-01", "2025-10-01", datetime(2025, 10, 6, 2, 0))
+        self.assertEqual(self.planner.plan("2025-10-01", "2025-10-01", "day", now=datetime(2025, 11, 1)), [])
+
+    def test_step_must_match_chunk(self):
+        """Daily files do not satisfy a monthly harvest (different report granularity)"""
+        self._touch("2025-09-01", "2025-09-01", datetime(2025, 10, 10))
+        plan = self.planner.plan("2025-09-01", "2025-09-30", "month", now=datetime(2025, 11, 1))
+        self.assertEqual(plan, [{"start": "2025-09-01", "end": "2025-09-30", "reason": "missing"}])
+
+    def test_foreign_file_with_offset(self):
+        """Offset-aware ingestion_time of a foreign file compares with naive dates and now"""
+        folder = PartitionManager.ensure_partition_exists(self.test_silver_dir, datetime(2025, 10, 18))
+        pl.DataFrame({
+            "Date_Start": ["2025-10-18"], "Date_End": ["2025-10-18"],
+            "ingestion_time": ["2025-10-19T02:00:00+00:00"],
+        }).write_parquet(os.path.join(folder, "legacy_export.parquet"), statistics=True)
+
+        plan = self.planner.plan("2025-10-18", "2025-10-18", "day", now=datetime(2025, 10, 20, 12, 0))
+        self.assertEqual(plan, [{"start": "2025-10-18", "end": "2025-10-18", "reason": "stale"}])
+        self.assertIsNone(self.planner.still_needed("2025-10-18", "2025-10-18", now=datetime(2025, 10, 19, 12, 0)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,13 +3,15 @@ import sys
 import os
 import shutil
 import polars as pl
+import openpyxl
 from datetime import datetime
 import time
+from unittest.mock import patch
 
 # Add parent directory to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from modern_etl import RawToSilverIngester, ETLLogger
+from modern_etl import RawToSilverIngester, ETLLogger, ExcelParsePlanner
 
 class TestIngestion(unittest.TestCase):
     
@@ -92,5 +94,156 @@ class TestIngestion(unittest.TestCase):
         self.assertTrue(os.path.exists(path1))
         self.assertTrue(os.path.exists(path2))
 
+    def test_streaming_matches_eager(self):
+        """Streaming (lazy scan + sink) must produce the same rows and stamps as eager mode"""
+        metadata = {
+            "start_date": "2025-10-01",
+            "end_date": "2025-10-02",
+            "base_dir": self.test_silver_dir
+        }
+
+        eager_path = self.ingester.ingest_file(self.dummy_csv, metadata, streaming=False)
+        stream_path = self.ingester.ingest_file(self.dummy_csv, metadata, streaming=True)
+
+        self.assertIsNotNone(stream_path)
+        self.assertFalse(os.path.exists(stream_path + ".tmp"))
+        df_eager = pl.read_parquet(eager_path)
+        df_stream = pl.read_parquet(stream_path)
+        self.assertEqual(df_eager.columns, df_stream.columns)
+        self.assertTrue(df_eager.drop("ingestion_time").equals(df_stream.drop("ingestion_time")))
+
+    def test_failed_write_leaves_no_tmp(self):
+        """A write that fails midway must not leave the reserved '.tmp' in the partition"""
+        metadata = {"start_date": "2025-10-01", "end_date": "2025-10-02", "base_dir": self.test_silver_dir}
+        failing = [
+            (False, patch.object(pl.DataFrame, "write_parquet", side_effect=OSError("disk full"))),
+            (True, patch.object(pl.LazyFrame, "sink_parquet", side_effect=OSError("disk full"))),
+        ]
+        for streaming, failure in failing:
+            with failure:
+                self.assertIsNone(self.ingester.ingest_file(self.dummy_csv, metadata, streaming=streaming))
+
+        leftovers = [name for _, _, names in os.walk(self.test_silver_dir) for name in names]
+        self.assertEqual([name for name in leftovers if name.endswith(".tmp")], [])
+
+    def test_parquet_input(self):
+        """Parquet dumps are accepted in both eager and streaming mode"""
+        parquet_path = os.path.join(self.test_raw_dir, "dump.parquet")
+        pl.read_csv(self.dummy_csv).write_parquet(parquet_path)
+        metadata = {"start_date": "2025-10-01", "end_date": "2025-10-02", "base_dir": self.test_silver_dir}
+
+        for streaming in (False, True):
+            output_path = self.ingester.ingest_file(parquet_path, metadata, streaming=streaming)
+            self.assertIsNotNone(output_path)
+            df_result = pl.read_parquet(output_path)
+            self.assertEqual(df_result["SKU"].to_list(), ["A1", "B2"])
+            self.assertEqual(df_result["Report_Date"][0], "2025-10-02")
+
+    def test_streaming_empty_file_skipped(self):
+        """An empty input writes nothing in streaming mode"""
+        empty_csv = os.path.join(self.test_raw_dir, "empty.csv")
+        with open(empty_csv, "w") as f:
+            f.write("SKU,Revenue\n")
+        metadata = {"end_date": "2025-10-02", "base_dir": self.test_silver_dir}
+
+        self.assertIsNone(self.ingester.ingest_file(empty_csv, metadata, streaming=True))
+        self.assertEqual(os.listdir(os.path.join(self.test_silver_dir, "2025", "10")), [])
+
+
+class TestExcelParsePlan(unittest.TestCase):
+
+    def setUp(self):
+        self.test_raw_dir = "./test_raw_data"
+        self.test_silver_dir = "./test_silver_data"
+        for d in [self.test_raw_dir, self.test_silver_dir]:
+            if not os.path.exists(d):
+                os.makedirs(d)
+        ExcelParsePlanner.clear_cache()
+        self.ingester = RawToSilverIngester(logger=ETLLogger("test_etl.log"))
+
+    def tearDown(self):
+        for d in [self.test_raw_dir, self.test_silver_dir]:
+            if os.path.exists(d):
+                shutil.rmtree(d)
+        if os.path.exists("test_etl.log"):
+            os.remove("test_etl.log")
+
+    def _make_xlsx(self, name, header, rows, banner=None):
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        if banner:
+            ws.append([banner])
+        ws.append(header)
+        for row in rows:
+            ws.append(row)
+        path = os.path.join(self.test_raw_dir, name)
+        wb.save(path)
+        return path
+
+    def test_plan_cached_and_unnamed_columns_dropped(self):
+        """Same header -> one cached plan; blank header columns are not loaded"""
+        header = ["SKU", "Revenue (Actual)", None]
+        p1 = self._make_xlsx("a.xlsx", header, [["A1", 10.5, None], ["B2", 20.0, None]])
+        p2 = self._make_xlsx("b.xlsx", header, [["C3", 1.0, None]])
+
+        t1 = ExcelParsePlanner.load(p1, ("api_harvest", "day"))
+        t2 = ExcelParsePlanner.load(p2, ("api_harvest", "day"))
+
+        self.assertEqual(t1.column_names, ["SKU", "Revenue (Actual)"])
+        self.assertEqual(t2.column_names, ["SKU", "Revenue (Actual)"])
+        self.assertEqual(t2.num_rows, 1)
+        self.assertEqual(len(ExcelParsePlanner._plans), 1)
+
+    def test_schema_drift_rebuilds_plan(self):
+        """A new column in the export must not be silently dropped"""
+        p1 = self._make_xlsx("a.xlsx", ["SKU", "Revenue (Actual)"], [["A1", 10.5]])
+        p2 = self._make_xlsx("b.xlsx", ["SKU", "Revenue (Actual)", "TACOS"], [["A1", 10.5, 0.2]])
+
+        ExcelParsePlanner.load(p1, ("api_harvest", "day"))
+        table = ExcelParsePlanner.load(p2, ("api_harvest", "day"))
+
+        self.assertIn("TACOS", table.column_names)
+        self.assertEqual(len(ExcelParsePlanner._plans), 2)
+
+    def test_cached_plan_never_nulls_drifted_cells(self):
+        """A value that doesn't fit the planned type is kept, not turned into null"""
+        header = ["SKU", "Revenue (Actual)"]
+        p1 = self._make_xlsx("a.xlsx", header, [["A1", 10.5], ["B2", 20.0]])
+        p2 = self._make_xlsx("b.xlsx", header, [["A1", 10.5], ["B2", "x"]])
+
+        ExcelParsePlanner.load(p1, ("api_harvest", "day"))
+        table = ExcelParsePlanner.load(p2, ("api_harvest", "day"))  # cache hit
+
+        self.assertEqual(len(ExcelParsePlanner._plans), 1)
+        self.assertEqual(table.column("Revenue (Actual)").null_count, 0)
+        self.assertEqual(table.column("Revenue (Actual)").to_pylist()[1], "x")
+
+    def test_title_banner_header_detection(self):
+        """Exports with a title row above the header still parse by column name"""
+        path = self._make_xlsx(
+            "banner.xlsx", ["SKU", "ASIN", "Revenue (Actual)"], [["A1", "B001", 10.5]],
+            banner="PPC Export 2025-10-01"
+        )
+        table = ExcelParsePlanner.load(path, ("api_harvest", "day"))
+        self.assertEqual(table.column_names, ["SKU", "ASIN", "Revenue (Actual)"])
+        self.assertEqual(table.column("SKU").to_pylist(), ["A1"])
+
+    def test_ingest_files_keeps_job_order(self):
+        """Parallel parsing still returns one result per job, in order"""
+        header = ["SKU", "Revenue (Actual)"]
+        jobs = []
+        for i in range(3):
+            path = self._make_xlsx(f"f{i}.xlsx", header, [[f"S{i}", float(i)]])
+            jobs.append((path, {"start_date": "2025-10-01", "end_date": "2025-10-01",
+                                "base_dir": self.test_silver_dir}))
+        jobs.append((os.path.join(self.test_raw_dir, "missing.xlsx"), {"base_dir": self.test_silver_dir}))
+
+        results = self.ingester.ingest_files(jobs, max_workers=2)
+
+        self.assertEqual(len(results), 4)
+        self.assertIsNone(results[3])
+        for i, path in enumerate(results[:3]):
+            self.assertEqual(pl.read_parquet(path)["SKU"][0], f"S{i}")
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+import sys
+import os
+import shutil
+import time
+import polars as pl
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modern_etl import RawToSilverIngester, ETLLogger
+from lake_index import SkuIndex
+
+class TestSkuIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.test_silver_dir = "./test_silver_data"
+        if not os.path.exists(self.test_silver_dir):
+            os.makedirs(self.test_silver_dir)
+        self.ingester = RawToSilverIngester(logger=ETLLogger("test_etl.log"))
+
+    def tearDown(self):
+        if os.path.exists(self.test_silver_dir):
+            shutil.rmtree(self.test_silver_dir)
+        if os.path.exists("test_etl.log"):
+            os.remove("test_etl.log")
+
+    def _ingest(self, day, revenue_a):
+        rows = [
+            {"SKU": "B2", "ASIN": "B0002", "Revenue": 5.0},
+            {"SKU": "A1", "ASIN": "B0001", "Revenue": revenue_a},
+        ]
+        metadata = {"start_date": day, "end_date": day, "base_dir": self.test_silver_dir}
+        return self.ingester.ingest_memory_data(rows, metadata)
+
+    def test_silver_file_sorted_by_sku(self):
+        """Writer clusters rows by SKU"""
+        path = self._ingest("2025-10-01", 1.0)
+        self.assertEqual(pl.read_parquet(path)["SKU"].to_list(), ["A1", "B2"])
+
+    def test_history_reads_indexed_files(self):
+        """Index is updated on every write and points lookups at the right files"""
+        p1 = self._ingest("2025-10-01", 1.0)
+        p2 = self._ingest("2025-11-01", 2.0)
+
+        index = SkuIndex(self.test_silver_dir)
+        self.assertEqual(set(index.locate("A1")), {p1, p2})
+        self.assertEqual(index.locate("ZZZ"), {})
+
+        history = index.history("A1")
+        self.assertEqual(history["Revenue"].to_list(), [1.0, 2.0])
+        self.assertEqual(history["Report_Date"].to_list(), ["2025-10-01", "2025-11-01"])
+
+        # ASIN lookups share the same index
+        self.assertEqual(index.history("B0001").height, 2)
+
+    def test_history_latest_only(self):
+        """Re-harvest of the same date -> latest ingestion wins"""
+        self._ingest("2025-10-01", 1.0)
+        time.sleep(0.01)
+        self._ingest("2025-10-01", 9.0)
+
+        history = SkuIndex(self.test_silver_dir).history("A1", columns=["Revenue"], latest_only=True)
+        self.assertEqual(history["Revenue"].to_list(), [9.0])
+
+    def test_compact_and_rebuild(self):
+        """Compaction and full rebuild give the same answers as level-0 runs"""
+        self._ingest("2025-10-01", 1.0)
+        self._ingest("2025-10-02", 2.0)
+        index = SkuIndex(self.test_silver_dir)
+        before = index.locate("A1")
+        self.assertEqual(len(index._run_paths()), 2)
+
+        index.compact()
+        self.assertEqual(len(index._run_paths()), 1)
+        self.assertEqual(index.locate("A1"), before)
+
+        index.rebuild()
+        self.assertEqual(index.locate("A1"), before)
+
+    def test_runs_merge_per_month_and_tier(self):
+        """FANOUT runs of a month merge into one run; other months are never rewritten"""
+        index = SkuIndex(self.test_silver_dir)
+        september = self._ingest("2025-09-30", 1.0)
+        september_runs = index._run_paths()
+        for day in range(1, SkuIndex.FANOUT + 2):
+            self._ingest(f"2025-10-{day:02d}", float(day))
+
+        october = os.path.join(index.index_dir, "2025-10")
+        self.assertEqual(sorted(index._level(p) for p in index._run_paths(october)), [0, 1])
+        self.assertEqual([p for p in index._run_paths() if p not in index._run_paths(october)], september_runs)
+        self.assertEqual(len(index.locate("A1")), SkuIndex.FANOUT + 2)
+        self.assertIn(september, index.locate("B0001"))
+
+        # Aggregated: one entry per (key, file), whatever the number of row groups
+        entries = pl.read_parquet(index._run_paths(october))
+        self.assertEqual(entries.select(["key", "file"]).is_duplicated().sum(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
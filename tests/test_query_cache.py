@@ -0,0 +1,88 @@
+import unittest
+import sys
+import os
+import shutil
+import polars as pl
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modern_etl import RawToSilverIngester, ETLLogger
+from query_cache import QueryCache, LakeVersion
+from lake_reader import LakeReader, months_between
+
+class TestQueryCache(unittest.TestCase):
+
+    def setUp(self):
+        self.test_silver_dir = "./test_silver_data"
+        if not os.path.exists(self.test_silver_dir):
+            os.makedirs(self.test_silver_dir)
+        self.ingester = RawToSilverIngester(logger=ETLLogger("test_etl.log"))
+
+    def tearDown(self):
+        if os.path.exists(self.test_silver_dir):
+            shutil.rmtree(self.test_silver_dir)
+        if os.path.exists("test_etl.log"):
+            os.remove("test_etl.log")
+
+    def _ingest(self, day, revenue, sku="A1"):
+        metadata = {"start_date": day, "end_date": day, "base_dir": self.test_silver_dir}
+        return self.ingester.ingest_memory_data([{"SKU": sku, "Revenue": revenue}], metadata)
+
+    def test_write_bumps_only_its_partition(self):
+        self._ingest("2025-10-01", 1.0)
+        self._ingest("2025-10-02", 1.0)
+        self._ingest("2025-11-01", 1.0)
+        self.assertEqual(LakeVersion(self.test_silver_dir).read(), {"2025-10": 2, "2025-11": 1})
+
+    def test_hit_then_invalidated_by_write(self):
+        """Repeated query is served from cache until a write lands in its partition"""
+        self._ingest("2025-10-01", 1.0)
+        reader = LakeReader(self.test_silver_dir)
+
+        first = reader.read_range("2025-10-01", "2025-10-31")
+        second = reader.read_range("2025-10-01", "2025-10-31")
+        self.assertEqual((reader.cache.hits, reader.cache.misses), (1, 1))
+        self.assertIs(first, second)
+
+        # Write to another month: still a hit
+        self._ingest("2025-11-01", 5.0)
+        reader.read_range("2025-10-01", "2025-10-31")
+        self.assertEqual(reader.cache.hits, 2)
+
+        # Re-harvest inside the month: recomputed, latest ingestion wins
+        self._ingest("2025-10-01", 9.0)
+        result = reader.read_range("2025-10-01", "2025-10-31")
+        self.assertEqual(reader.cache.misses, 2)
+        self.assertEqual(result["Revenue"].to_list(), [9.0])
+
+    def test_sku_order_does_not_change_key(self):
+        cache = QueryCache(self.test_silver_dir)
+        self.assertEqual(cache.make_key("q", {"skus": ["B", "A"]}), cache.make_key("q", {"skus": ["A", "B"], "x": None}))
+
+    def test_lru_byte_budget(self):
+        df = pl.DataFrame({"x": list(range(1000))})
+        cache = QueryCache(self.test_silver_dir, max_bytes=df.estimated_size() * 2)
+        for i in range(3):
+            cache.get_or_compute("q", {"i": i}, [], lambda: df)
+        self.assertEqual(len(cache._entries), 2)
+        self.assertLessEqual(cache._bytes, cache.max_bytes)
+        # Oldest entry was evicted
+        cache.get_or_compute("q", {"i": 0}, [], lambda: df)
+        self.assertEqual(cache.misses, 4)
+
+    def test_disk_tier_survives_restart(self):
+        self._ingest("2025-10-01", 1.0)
+        disk_dir = os.path.join(self.test_silver_dir, "_meta", "query_cache")
+        LakeReader(self.test_silver_dir, disk_cache=True).read_range("2025-10-01", "2025-10-31")
+
+        restarted = LakeReader(self.test_silver_dir, cache=QueryCache(self.test_silver_dir, disk_dir=disk_dir))
+        result = restarted.read_range("2025-10-01", "2025-10-31")
+        self.assertEqual(restarted.cache.hits, 1)
+        self.assertEqual(result["Revenue"].to_list(), [1.0])
+
+    def test_months_between(self):
+        self.assertEqual(months_between("2025-11-15", "2026-01-02"), ["2025-11", "2025-12", "2026-01"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+import sys
+import os
+import shutil
+import time
+import polars as pl
+from datetime import date
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modern_etl import RawToSilverIngester, ETLLogger
+from rollups import RollupStore
+from query_cache import LakeVersion
+
+class TestRollups(unittest.TestCase):
+
+    def setUp(self):
+        self.test_silver_dir = "./test_silver_data"
+        if not os.path.exists(self.test_silver_dir):
+            os.makedirs(self.test_silver_dir)
+        self.ingester = RawToSilverIngester(logger=ETLLogger("test_etl.log"))
+
+    def tearDown(self):
+        if os.path.exists(self.test_silver_dir):
+            shutil.rmtree(self.test_silver_dir)
+        if os.path.exists("test_etl.log"):
+            os.remove("test_etl.log")
+
+    def _ingest(self, day, revenue, spend=10.0, sku="A1"):
+        rows = [{"SKU": sku, "Revenue (Actual)": revenue, "Ads Spend (Actual)": spend, "Unit sold (Actual)": 1}]
+        metadata = {"start_date": day, "end_date": day, "base_dir": self.test_silver_dir}
+        path = self.ingester.ingest_memory_data(rows, metadata)
+        time.sleep(0.01)  # distinct ingestion_time
+        return path
+
+    def test_weekly_rollup_incremental(self):
+        """Each ingestion lands in the week table; ROAS is derived from sums"""
+        # Mon 2025-10-06 .. Sun 2025-10-12
+        self._ingest("2025-10-06", 100.0)
+        self._ingest("2025-10-07", 50.0)
+
+        store = RollupStore(self.test_silver_dir)
+        df = store.query("2025-10-06", "2025-10-12", granularity="week")
+
+        self.assertEqual(df.height, 1)
+        self.assertEqual(df["period"][0], date(2025, 10, 6))
+        self.assertEqual(df["Revenue (Actual)"][0], 150.0)
+        self.assertEqual(df["ROAS"][0], 7.5)
+
+    def test_reharvest_latest_ingestion_wins(self):
+        """A re-harvest of a date replaces, not adds to, its numbers"""
+        self._ingest("2025-10-06", 100.0)
+        self._ingest("2025-10-06", 120.0)
+
+        df = RollupStore(self.test_silver_dir).query("2025-10-01", "2025-10-31", granularity="month")
+        self.assertEqual(df["Revenue (Actual)"].to_list(), [120.0])
+
+    def test_partial_period_uses_daily(self):
+        """Ranges not aligned to whole periods only count requested days"""
+        self._ingest("2025-10-06", 100.0)
+        self._ingest("2025-10-08", 50.0)
+
+        store = RollupStore(self.test_silver_dir)
+        self.assertIsNone(store._scan_period_table("2025-10-07", "2025-10-12", "week"))
+        df = store.query("2025-10-07", "2025-10-12", granularity="week")
+        self.assertEqual(df["Revenue (Actual)"].to_list(), [50.0])
+
+    def test_multi_day_ingestions_are_not_rolled_up(self):
+        """A step=month export is not booked as one day's numbers on its end date"""
+        self._ingest("2025-10-06", 100.0)
+        rows = [{"SKU": "A1", "Revenue (Actual)": 3000.0, "Ads Spend (Actual)": 300.0, "Unit sold (Actual)": 30}]
+        metadata = {"start_date": "2025-10-01", "end_date": "2025-10-31", "base_dir": self.test_silver_dir}
+        self.assertIsNotNone(self.ingester.ingest_memory_data(rows, metadata))
+
+        store = RollupStore(self.test_silver_dir)
+        for _ in range(2):  # incremental, then rebuilt
+            month = store.query("2025-10-01", "2025-10-31", granularity="month")
+            self.assertEqual(month["Revenue (Actual)"].to_list(), [100.0])
+            daily = store.query("2025-10-01", "2025-10-31", granularity="day")
+            self.assertEqual(daily["period"].to_list(), [date(2025, 10, 6)])
+            store.rebuild()
+
+    def test_rebuild_matches_incremental(self):
+        """Full rebuild from the lake equals the incrementally maintained tables"""
+        self._ingest("2025-09-30", 10.0)
+        self._ingest("2025-10-01", 20.0, sku="B2")
+        self._ingest("2025-10-01", 30.0, sku="B2")
+        store = RollupStore(self.test_silver_dir)
+        before = store.query("2025-09-29", "2025-10-05", granularity="week")
+
+        versions = LakeVersion(self.test_silver_dir)
+        before_versions = versions.read()
+        self.assertEqual(store.rebuild(), ["2025-09", "2025-10"])
+        for month in ("2025-09", "2025-10"):
+            self.assertEqual(versions.read()[month], before_versions[month] + 1)
+        after = store.query("2025-09-29", "2025-10-05", granularity="week")
+        self.assertTrue(before.equals(after))
+        self.assertEqual(after["Revenue (Actual)"].to_list(), [10.0, 30.0])
+
+    def test_latest_ingestion_is_the_latest_instant(self):
+        """Stamps with different offsets: the later instant wins, not the larger text"""
+        folder = os.path.join(self.test_silver_dir, "2025", "10")
+        os.makedirs(folder)
+        for name, stamp, revenue in [("a.parquet", "2025-10-10T08:00:00+07:00", 1.0),   # 01:00Z
+                                     ("b.parquet", "2025-10-10T03:00:00Z", 2.0)]:       # 03:00Z
+            pl.DataFrame({"SKU": ["A1"], "Report_Date": ["2025-10-06"], "Date_Start": ["2025-10-06"],
+                          "Date_End": ["2025-10-06"], "Revenue (Actual)": [revenue],
+                          "ingestion_time": [stamp]}).write_parquet(os.path.join(folder, name))
+
+        store = RollupStore(self.test_silver_dir)
+        store.rebuild()
+        daily = store.query("2025-10-06", "2025-10-06", granularity="day")
+        self.assertEqual(daily["Revenue (Actual)"].to_list(), [2.0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+import sys
+import os
+import shutil
+import openpyxl
+import polars as pl
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from rule_engine import RuleEngine, ExpressionParser, RuleSyntaxError
+
+class TestRuleEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = "./test_rules"
+        if not os.path.exists(self.test_dir):
+            os.makedirs(self.test_dir)
+        self.df = pl.DataFrame({
+            "SKU": ["A", "B", "C", "D"],
+            "ROAS": [5.0, 2.0, 0.5, None],
+            "Revenue (Actual)": [2000.0, 500.0, 50.0, 0.0],
+            "Phase": [3, 2, 1, 1],
+        })
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _eval(self, text):
+        return self.df.select(ExpressionParser.compile(text, self.df.columns).alias("r"))["r"].to_list()
+
+    def test_parser_grammar(self):
+        self.assertEqual(self._eval("ROAS >= 2 AND [Revenue (Actual)] > 100"), [True, True, False, False])
+        self.assertEqual(self._eval("NOT (phase = 1) OR roas IS NULL"), [True, True, False, True])
+        self.assertEqual(self._eval("SKU NOT IN ('A', 'B')"), [False, False, True, True])
+        self.assertEqual(self._eval("[Revenue (Actual)] / 100 - -1"), [21.0, 6.0, 1.5, 1.0])
+
+    def test_parser_rejects_bad_rules(self):
+        with self.assertRaises(RuleSyntaxError):
+            ExpressionParser.compile("ROAS >=", self.df.columns)
+        with self.assertRaises(RuleSyntaxError):
+            ExpressionParser.compile("Unknown > 1", self.df.columns)
+        with self.assertRaises(RuleSyntaxError):
+            ExpressionParser.compile("__import__('os')", self.df.columns)
+
+    def test_first_match_and_sum_modes(self):
+        rules = [
+            {"output": "hint", "condition": "ROAS >= 3", "value": "Scale up", "mode": "first", "order": 1},
+            {"output": "hint", "condition": "ROAS >= 1", "value": "Keep", "mode": "first", "order": 2},
+            {"output": "hint", "condition": "ELSE", "value": "Cut bids", "mode": "first", "order": 3},
+            {"output": "priorityScore", "condition": "ROAS >= 3", "value": 50.0, "mode": "sum", "order": 1},
+            {"output": "priorityScore", "condition": "[Revenue (Actual)] > 100", "value": 30, "mode": "sum", "order": 2},
+            {"output": "revPerPhase", "condition": "", "value": "=[Revenue (Actual)] / Phase", "mode": "first", "order": 1},
+        ]
+        result = RuleEngine(rules).apply(self.df)
+
+        self.assertEqual(result["hint"].to_list(), ["Scale up", "Keep", "Cut bids", "Cut bids"])
+        self.assertEqual(result["priorityScore"].to_list(), [80, 30, 0, 0])
+        self.assertEqual(result["revPerPhase"].to_list(), [2000 / 3, 250.0, 50.0, 0.0])
+        # Also works lazily
+        self.assertTrue(RuleEngine(rules).apply(self.df.lazy()).collect().equals(result))
+
+    def test_workbook_parsed_once_and_cached(self):
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.title = "Notes"
+        ws.append(["Just documentation"])
+        rules_ws = wb.create_sheet("Hint")
+        rules_ws.append(["Trường", "Điều kiện", "Giá trị", "Thứ tự"])
+        rules_ws.append(["hint", "ROAS < 1", "Cut bids", 1])
+        rules_ws.append(["hint", "ELSE", "OK", 2])
+        path = os.path.join(self.test_dir, "rules.xlsx")
+        wb.save(path)
+        cache_dir = os.path.join(self.test_dir, "cache")
+
+        engine = RuleEngine.from_workbook(path, cache_dir=cache_dir)
+        self.assertEqual(len(engine.rules), 2)
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+        cached = RuleEngine.from_workbook(path, cache_dir=cache_dir)
+        self.assertEqual(cached.rules, engine.rules)
+        self.assertIs(cached.compile(self.df.columns), engine.compile(self.df.columns))
+        self.assertEqual(cached.apply(self.df)["hint"].to_list(), ["OK", "OK", "Cut bids", "OK"])
+
+if __name__ == '__main__':
+    unittest.main()
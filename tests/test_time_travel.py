@@ -0,0 +1,119 @@
+import unittest
+import sys
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+import polars as pl
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modern_etl import RawToSilverIngester, ETLLogger
+from lake_reader import LakeReader, normalize_as_of
+
+class TestTimeTravel(unittest.TestCase):
+
+    def setUp(self):
+        self.test_silver_dir = "./test_silver_data"
+        if not os.path.exists(self.test_silver_dir):
+            os.makedirs(self.test_silver_dir)
+        self.ingester = RawToSilverIngester(logger=ETLLogger("test_etl.log"))
+
+    def tearDown(self):
+        if os.path.exists(self.test_silver_dir):
+            shutil.rmtree(self.test_silver_dir)
+        if os.path.exists("test_etl.log"):
+            os.remove("test_etl.log")
+
+    def _ingest(self, day, revenue, sku="A1"):
+        metadata = {"start_date": day, "end_date": day, "base_dir": self.test_silver_dir}
+        path = self.ingester.ingest_memory_data([{"SKU": sku, "Revenue": revenue}], metadata)
+        time.sleep(0.01)  # distinct ingestion_time
+        return path
+
+    def _checkpoint(self):
+        mark = datetime.now().isoformat()
+        time.sleep(0.01)
+        return mark
+
+    def test_read_as_of_sees_the_past(self):
+        self._ingest("2025-10-01", 10.0)
+        self._ingest("2025-10-02", 20.0)
+        before_reharvest = self._checkpoint()
+        self._ingest("2025-10-01", 11.0)  # re-harvest
+        self._ingest("2025-10-03", 30.0)  # new day
+
+        reader = LakeReader(self.test_silver_dir)
+        past = reader.read_as_of(before_reharvest, "2025-10-01", "2025-10-31")
+        self.assertEqual(list(zip(past["Report_Date"], past["Revenue"])),
+                         [("2025-10-01", 10.0), ("2025-10-02", 20.0)])
+
+        now = reader.read_range("2025-10-01", "2025-10-31")
+        self.assertEqual(now["Revenue"].to_list(), [11.0, 20.0, 30.0])
+
+    def test_newer_files_are_skipped_before_reading(self):
+        old = self._ingest("2025-10-01", 10.0)
+        cutoff = self._checkpoint()
+        self._ingest("2025-10-01", 11.0)
+        self._ingest("2025-10-02", 20.0)
+
+        reader = LakeReader(self.test_silver_dir)
+        self.assertEqual(reader.list_files_as_of("2025-10-01", "2025-10-31", cutoff), [old])
+
+    def test_foreign_files_use_footer_stats(self):
+        folder = os.path.join(self.test_silver_dir, "2025", "10")
+        os.makedirs(folder)
+        for name, stamp in [("old.parquet", "2025-10-05T08:00:00"), ("new.parquet", "2025-10-20T08:00:00")]:
+            pl.DataFrame({"SKU": ["A1"], "Report_Date": ["2025-10-01"], "Revenue": [1.0],
+                          "ingestion_time": [stamp]}).write_parquet(os.path.join(folder, name), statistics=True)
+
+        reader = LakeReader(self.test_silver_dir)
+        kept = reader.list_files_as_of("2025-10-01", "2025-10-31", "2025-10-10")
+        self.assertEqual([os.path.basename(p) for p in kept], ["old.parquet"])
+        self.assertEqual(reader.read_as_of("2025-10-10", "2025-10-01", "2025-10-31")["ingestion_time"].to_list(),
+                         ["2025-10-05T08:00:00"])
+
+    def test_as_of_is_part_of_the_cache_key(self):
+        self._ingest("2025-10-01", 10.0)
+        cutoff = self._checkpoint()
+        self._ingest("2025-10-01", 11.0)
+
+        reader = LakeReader(self.test_silver_dir)
+        self.assertEqual(reader.read_as_of(cutoff, "2025-10-01", "2025-10-01")["Revenue"].to_list(), [10.0])
+        self.assertEqual(reader.read_range("2025-10-01", "2025-10-01")["Revenue"].to_list(), [11.0])
+        self.assertEqual(reader.read_as_of(cutoff, "2025-10-01", "2025-10-01")["Revenue"].to_list(), [10.0])
+        self.assertEqual(reader.cache.hits, 1)
+
+    def test_mixed_offsets_compare_as_instants(self):
+        """Stamps and cutoff in different offsets/formats are compared in UTC, not as text"""
+        folder = os.path.join(self.test_silver_dir, "2025", "10")
+        os.makedirs(folder)
+        stamps = [("a.parquet", "2025-10-10T08:00:00+07:00", 1.0),   # 01:00Z
+                  ("b.parquet", "2025-10-10T03:00:00Z", 2.0),        # 03:00Z
+                  ("c.parquet", "2025-10-09T23:30:00-05:00", 3.0)]   # 04:30Z
+        for name, stamp, revenue in stamps:
+            pl.DataFrame({"SKU": ["A1"], "Report_Date": ["2025-10-01"], "Revenue": [revenue],
+                          "ingestion_time": [stamp]}).write_parquet(os.path.join(folder, name), statistics=True)
+
+        reader = LakeReader(self.test_silver_dir)
+        # 09:45+07:00 = 02:45Z: only a.parquet was ingested by then (as text, b and c sort before it too)
+        cutoff = "2025-10-10T09:45:00+07:00"
+        self.assertEqual([os.path.basename(p) for p in reader.list_files_as_of("2025-10-01", "2025-10-31", cutoff)],
+                         ["a.parquet"])
+        self.assertEqual(reader.read_as_of(cutoff, "2025-10-01", "2025-10-31")["Revenue"].to_list(), [1.0])
+        self.assertEqual(reader.read_as_of("2025-10-10T04:00:00Z", "2025-10-01", "2025-10-31")["Revenue"].to_list(),
+                         [2.0])
+
+    def test_normalize_as_of(self):
+        local_end_of_day = datetime(2025, 10, 14, 23, 59, 59, 999999).astimezone(timezone.utc)
+        self.assertEqual(normalize_as_of("2025-10-14"), local_end_of_day)
+        self.assertEqual(normalize_as_of("2025-10-14T06:30:00+07:00"),
+                         datetime(2025, 10, 13, 23, 30, tzinfo=timezone.utc))
+        self.assertEqual(normalize_as_of("2025-10-13T23:30:00Z"), normalize_as_of("2025-10-14T06:30:00+07:00"))
+        self.assertEqual(normalize_as_of(datetime(2025, 10, 14, 6, 30)).tzinfo, timezone.utc)
+        with self.assertRaises(ValueError):
+            normalize_as_of("last tuesday")
+
+if __name__ == '__main__':
+    unittest.main()